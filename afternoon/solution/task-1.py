@@ -7,12 +7,20 @@ from __future__ import annotations
 
 import math
 import pathlib
+import sys
 from os import PathLike
 from typing import Tuple, List
 
-DATA_PATH: pathlib.Path = pathlib.Path("../data/").resolve()
-OUT_PATH: pathlib.Path = pathlib.Path("../output/").resolve()
-EXAMPLE_PATH: pathlib.Path = pathlib.Path("../example/").resolve()
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from ccc import instrument, lazy, parser, streaming  # noqa: E402
+
+# The directories of the day, independent of the working directory
+DAY_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+DATA_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "data")
+OUT_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "output")
+EXAMPLE_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "example")
 
 
 class Dim:
@@ -34,57 +42,98 @@ class RoomManager:
     room_dimensions: List[Dim]
     room_count: int
     _room_table_count: List[int]
+    _table: parser.IntTable
+    _file: PathLike
+    _stream: bool
+    _bulk: bool
 
-    def __init__(self, file: PathLike):
+    def __init__(self, file: PathLike, stream: bool = False, bulk: bool = False):
         self.room_count = 0
         self.room_dimensions = []
         self._room_table_count = []
-        self._read_in_dimensions(file)
+        self._file = file
+        self._stream = stream
+        self._bulk = bulk
+        if not stream:
+            self._read_in_dimensions(file)
 
+    @instrument.phase("read")
     def _read_in_dimensions(self, file: PathLike) -> None:
         """
         Reads in the locations from the specified file.
         :param file: The file to read from.
         :return: Every location
         """
-        with open(file, "r+") as f:
-            content: List[str] = f.readlines()
+        table = parser.parse_int_table(file)
+        self.room_count = int(table.row(0)[0])
+        self._table = table
+        if self._bulk:
+            # The rooms are read straight from the table by _calculate_bulk
+            return
+
+        for row in table.rows(1):
+            x, y = (int(item) for item in row)
+            self.room_dimensions.append(Dim(x, y))
+
+    @instrument.phase("calculate", records="room_count")
+    def calculate(self, out_path: PathLike) -> None:
+        """
 
-            # Parse the last line
-            line_info = content[0].strip("\n").split(" ")
-            self.room_count = int(line_info[0])
+        :param out_path:
+        :return:
+        """
+        if self._stream:
+            self._calculate_streaming(out_path)
+            return
 
-            for line in content[1:]:
-                items = line.strip("\n").split(" ")
-                x = int(items[0])
-                y = int(items[1])
+        if self._bulk:
+            self._calculate_bulk(out_path)
+            return
 
-                self.room_dimensions.append(Dim(x, y))
+        for room in self.room_dimensions:
+            self._room_table_count.append(room.x * room.y // 3)
 
-    def calculate(self, out_path: PathLike) -> None:
+        self._write_out(out_path)
+
+    def _calculate_streaming(self, out_path: PathLike) -> None:
+        """
+        Calculates every room as soon as it is read and writes its result
+        straight away, without keeping the rooms in memory.
+        :param out_path: The file to write to.
+        :return:
         """
+        with open(self._file, "r") as f_in, open(out_path, "w+") as f_out:
+            self.room_count = streaming.read_header(f_in, 1)[0][0]
 
-        :param out_path:
+            with streaming.SeparatedWriter(f_out) as out:
+                for x, y in streaming.iter_records(f_in):
+                    out.write(f"{x * y // 3}")
+
+    def _calculate_bulk(self, out_path: PathLike) -> None:
+        """
+        Calculates every room at once on the columns of the parsed file,
+        without creating an object per room.
+        :param out_path: The file to write to.
         :return:
         """
-        for room in self.room_dimensions:
-            self._room_table_count.append(int(room.x * room.y / 3))
+        x, y = self._table.columns(1, 2)
+        if lazy.is_ndarray(x) and len(x) and int(x.max()) * int(y.max()) < 2 ** 63:
+            self._room_table_count = (x * y // 3).tolist()
+        else:
+            # Python integers, the products would overflow int64
+            self._room_table_count = [int(room_x) * int(room_y) // 3 for room_x, room_y in zip(x, y)]
 
         self._write_out(out_path)
 
+    @instrument.phase("write")
     def _write_out(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
-        with open(out_path, "w+") as f:
-            i = 0
-            for pos in self._room_table_count:
-                f.write(f"{pos}")
-                if i + 1 < len(self._room_table_count):
-                    f.write("\n")
-                i += 1
+        with open(out_path, "w+") as f, streaming.SeparatedWriter(f) as out:
+            out.write_all(map(str, self._room_table_count))
 
 
 
@@ -97,23 +146,23 @@ def first_task() -> None:
     print(f"-- Writing to {first_task_out}")
 
     # Process in the first file
-    mng = RoomManager(pathlib.Path(first_task_data, "level1_1.in"))
+    mng = RoomManager(pathlib.Path(first_task_data, "level1_1.in"), bulk=True)
     mng.calculate(pathlib.Path(first_task_out, "level1_1.out"))
 
     # Process in the second file
-    mng = RoomManager(pathlib.Path(first_task_data, "level1_2.in"))
+    mng = RoomManager(pathlib.Path(first_task_data, "level1_2.in"), bulk=True)
     mng.calculate(pathlib.Path(first_task_out, "level1_2.out"))
 
     # Process in the third file
-    mng = RoomManager(pathlib.Path(first_task_data, "level1_3.in"))
+    mng = RoomManager(pathlib.Path(first_task_data, "level1_3.in"), bulk=True)
     mng.calculate(pathlib.Path(first_task_out, "level1_3.out"))
 
     # Process in the fourth file
-    mng = RoomManager(pathlib.Path(first_task_data, "level1_4.in"))
+    mng = RoomManager(pathlib.Path(first_task_data, "level1_4.in"), bulk=True)
     mng.calculate(pathlib.Path(first_task_out, "level1_4.out"))
 
     # Process in the fifth file
-    mng = RoomManager(pathlib.Path(first_task_data, "level1_5.in"))
+    mng = RoomManager(pathlib.Path(first_task_data, "level1_5.in"), bulk=True)
     mng.calculate(pathlib.Path(first_task_out, "level1_5.out"))
 
 
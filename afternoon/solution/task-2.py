@@ -7,12 +7,20 @@ from __future__ import annotations
 
 import math
 import pathlib
+import sys
 from os import PathLike
 from typing import Tuple, List
 
-DATA_PATH: pathlib.Path = pathlib.Path("../data/").resolve()
-OUT_PATH: pathlib.Path = pathlib.Path("../output/").resolve()
-EXAMPLE_PATH: pathlib.Path = pathlib.Path("../example/").resolve()
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from ccc import instrument, parser, streaming  # noqa: E402
+
+# The directories of the day, independent of the working directory
+DAY_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+DATA_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "data")
+OUT_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "output")
+EXAMPLE_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "example")
 
 
 class Room:
@@ -36,66 +44,98 @@ class RoomManager:
     room_dimensions: List[Room]
     room_count: int
     _room_table_positions: List[List[List[int]]]
+    _file: PathLike
+    _stream: bool
 
-    def __init__(self, file: PathLike):
+    def __init__(self, file: PathLike, stream: bool = False):
         self.room_count = 0
         self.room_dimensions = []
         self._room_table_positions = []
-        self._read_in_rooms(file)
+        self._file = file
+        self._stream = stream
+        if not stream:
+            self._read_in_rooms(file)
 
+    @instrument.phase("read")
     def _read_in_rooms(self, file: PathLike) -> None:
         """
         Reads in the locations from the specified file.
         :param file: The file to read from.
         :return: Every location
         """
-        with open(file, "r+") as f:
-            content: List[str] = f.readlines()
-
-            # Parse the last line
-            line_info = content[0].strip("\n").split(" ")
-            self.room_count = int(line_info[0])
+        table = parser.parse_int_table(file)
+        self.room_count = int(table.row(0)[0])
 
-            for line in content[1:]:
-                items = line.strip("\n").split(" ")
-                x = int(items[0])
-                y = int(items[1])
-                tables = int(items[2])
-
-                self.room_dimensions.append(Room(x, y, tables))
+        for row in table.rows(1):
+            x, y, tables = (int(item) for item in row)
+            self.room_dimensions.append(Room(x, y, tables))
 
+    @instrument.phase("calculate", records="room_count")
     def calculate(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
+        if self._stream:
+            self._calculate_streaming(out_path)
+            return
+
         for room in self.room_dimensions:
-            rooms_in_w: int = int(room.x / 3)
-            rows: int = int(room.tables / rooms_in_w)
+            self._room_table_positions.append(self._layout_room(room))
 
-            room_tables: List[List[int]] = []
-            for row in range(rows):
-                room_tables.append([row * rooms_in_w + i + 1 for i in range(rooms_in_w)])
+        self._write_out(out_path)
 
-            self._room_table_positions.append(room_tables)
+    @staticmethod
+    def _layout_room(room: Room) -> List[List[int]]:
+        """
+        Numbers the tables of a single room row by row.
+        :param room: The room to lay out.
+        :return: The table ids per row.
+        """
+        rooms_in_w: int = int(room.x / 3)
+        rows: int = int(room.tables / rooms_in_w)
 
-        self._write_out(out_path)
+        room_tables: List[List[int]] = []
+        for row in range(rows):
+            room_tables.append([row * rooms_in_w + i + 1 for i in range(rooms_in_w)])
+
+        return room_tables
 
+    def _calculate_streaming(self, out_path: PathLike) -> None:
+        """
+        Lays out every room as soon as it is read and writes its result
+        straight away, without keeping the rooms in memory.
+        :param out_path: The file to write to.
+        :return:
+        """
+        with open(self._file, "r") as f_in, open(out_path, "w+") as f_out:
+            self.room_count = streaming.read_header(f_in, 1)[0][0]
+
+            with streaming.SeparatedWriter(f_out, "") as out:
+                for x, y, tables in streaming.iter_records(f_in):
+                    self._write_room(out, self._layout_room(Room(x, y, tables)))
+
+    @instrument.phase("write")
     def _write_out(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
-        with open(out_path, "w+") as f:
-            i = 0
+        with open(out_path, "w+") as f, streaming.SeparatedWriter(f, "") as out:
             for pos in self._room_table_positions:
-                for row in pos:
-                    for table in row:
-                        f.write(" ".join(str(table) for _ in range(3)))
-                        f.write(" ")
-                    f.write("\n")
+                self._write_room(out, pos)
+
+    @staticmethod
+    def _write_room(out: streaming.SeparatedWriter, room_tables: List[List[int]]) -> None:
+        """
+        Writes the table ids of a single room, one row at a time.
+        :param out: The writer to write to.
+        :param room_tables: The table ids per row.
+        :return:
+        """
+        out.write_all("".join(f"{table} {table} {table} " for table in row) + "\n" for row in room_tables)
 
 
 
@@ -7,12 +7,20 @@ from __future__ import annotations
 
 import math as m
 import pathlib
+import sys
 from os import PathLike
 from typing import Tuple, List
 
-DATA_PATH: pathlib.Path = pathlib.Path("../data/").resolve()
-OUT_PATH: pathlib.Path = pathlib.Path("../output/").resolve()
-EXAMPLE_PATH: pathlib.Path = pathlib.Path("../example/").resolve()
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from ccc import instrument, parser, streaming  # noqa: E402
+
+# The directories of the day, independent of the working directory
+DAY_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+DATA_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "data")
+OUT_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "output")
+EXAMPLE_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "example")
 
 
 class Room:
@@ -36,98 +44,130 @@ class RoomManager:
     room_dimensions: List[Room]
     room_count: int
     _room_table_positions: List[List[List[int]]]
+    _file: PathLike
+    _stream: bool
 
-    def __init__(self, file: PathLike):
+    def __init__(self, file: PathLike, stream: bool = False):
         self.room_count = 0
         self.room_dimensions = []
         self._room_table_positions = []
-        self._read_in_rooms(file)
+        self._file = file
+        self._stream = stream
+        if not stream:
+            self._read_in_rooms(file)
 
+    @instrument.phase("read")
     def _read_in_rooms(self, file: PathLike) -> None:
         """
         Reads in the locations from the specified file.
         :param file: The file to read from.
         :return: Every location
         """
-        with open(file, "r+") as f:
-            content: List[str] = f.readlines()
-
-            # Parse the last line
-            line_info = content[0].strip("\n").split(" ")
-            self.room_count = int(line_info[0])
-
-            for line in content[1:]:
-                items = line.strip("\n").split(" ")
-                x = int(items[0])
-                y = int(items[1])
-                tables = int(items[2])
+        table = parser.parse_int_table(file)
+        self.room_count = int(table.row(0)[0])
 
-                self.room_dimensions.append(Room(x, y, tables))
+        for row in table.rows(1):
+            x, y, tables = (int(item) for item in row)
+            self.room_dimensions.append(Room(x, y, tables))
 
+    @instrument.phase("calculate", records="room_count")
     def calculate(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
+        if self._stream:
+            self._calculate_streaming(out_path)
+            return
+
         for room in self.room_dimensions:
-            rooms_in_w: int = m.floor(room.x / 3)
-            w_fits = room.x % 3 == 0
-            empty_spaces_in_w = room.x * room.y % 3
-            rows_width: int = room.x
-            rows_count: int = room.y
-            last_id: int = 0
-
-            # We add 0 in the spaces that are empty
-            rows: List[List[int]] = []
-            for row in range(rows_count):
-                row_ids: List[int] = []
-                occupied_width: int = 0
-
-                while occupied_width + 3 <= rows_width:
-                    new_id: int = last_id + 1
-                    last_id = new_id
-
-                    row_ids.append(new_id)
-                    row_ids.append(new_id)
-                    row_ids.append(new_id)
-                    occupied_width += 3
-
-                for _ in range(rows_width - occupied_width):
-                    row_ids.append(0)
-
-                rows.append(row_ids)
-
-            table_count: int = last_id - 1
-            if table_count < room.tables:
-                for i, row in enumerate(rows):
-                    row: List[int]
-                    for j, id in enumerate(row):
-                        if id == 0 and i + 2 < rows_count and rows[i + 1][j] == 0 and rows[i + 2][j] == 0:
-                            row[j] = last_id + 1
-                            rows[i + 1][j] = last_id + 1
-                            rows[i + 2][j] = last_id + 1
-                            last_id += 1
-                            table_count += 1
-
-
-            self._room_table_positions.append(rows)
+            self._room_table_positions.append(self._layout_room(room))
 
         self._write_out(out_path)
 
+    @staticmethod
+    def _layout_room(room: Room) -> List[List[int]]:
+        """
+        Places the tables of a single room.
+        :param room: The room to lay out.
+        :return: The cells per row.
+        """
+        rooms_in_w: int = m.floor(room.x / 3)
+        w_fits = room.x % 3 == 0
+        empty_spaces_in_w = room.x * room.y % 3
+        rows_width: int = room.x
+        rows_count: int = room.y
+        last_id: int = 0
+
+        # We add 0 in the spaces that are empty
+        rows: List[List[int]] = []
+        for row in range(rows_count):
+            row_ids: List[int] = []
+            occupied_width: int = 0
+
+            while occupied_width + 3 <= rows_width:
+                new_id: int = last_id + 1
+                last_id = new_id
+
+                row_ids.append(new_id)
+                row_ids.append(new_id)
+                row_ids.append(new_id)
+                occupied_width += 3
+
+            for _ in range(rows_width - occupied_width):
+                row_ids.append(0)
+
+            rows.append(row_ids)
+
+        table_count: int = last_id - 1
+        if table_count < room.tables:
+            for i, row in enumerate(rows):
+                row: List[int]
+                for j, id in enumerate(row):
+                    if id == 0 and i + 2 < rows_count and rows[i + 1][j] == 0 and rows[i + 2][j] == 0:
+                        row[j] = last_id + 1
+                        rows[i + 1][j] = last_id + 1
+                        rows[i + 2][j] = last_id + 1
+                        last_id += 1
+                        table_count += 1
+
+        return rows
+
+    def _calculate_streaming(self, out_path: PathLike) -> None:
+        """
+        Lays out every room as soon as it is read and writes its result
+        straight away, without keeping the rooms in memory.
+        :param out_path: The file to write to.
+        :return:
+        """
+        with open(self._file, "r") as f_in, open(out_path, "w+") as f_out:
+            self.room_count = streaming.read_header(f_in, 1)[0][0]
+
+            with streaming.SeparatedWriter(f_out, "") as out:
+                for x, y, tables in streaming.iter_records(f_in):
+                    self._write_room(out, self._layout_room(Room(x, y, tables)))
+
+    @instrument.phase("write")
     def _write_out(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
-        with open(out_path, "w+") as f:
-            i = 0
+        with open(out_path, "w+") as f, streaming.SeparatedWriter(f, "") as out:
             for pos in self._room_table_positions:
-                for row in pos:
-                    for id in row:
-                        f.write(f"{id} ")
-                    f.write("\n")
+                self._write_room(out, pos)
+
+    @staticmethod
+    def _write_room(out: streaming.SeparatedWriter, rows: List[List[int]]) -> None:
+        """
+        Writes the table ids of a single room, one row at a time.
+        :param out: The writer to write to.
+        :param rows: The table ids per row.
+        :return:
+        """
+        out.write_all("".join(f"{table_id} " for table_id in row) + "\n" for row in rows)
 
 
 
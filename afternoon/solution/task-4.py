@@ -5,14 +5,25 @@ Author: Luna Klatzer
 """
 from __future__ import annotations
 
-import math as m
 import pathlib
+import sys
 from os import PathLike
-from typing import Tuple, List
+from typing import Tuple, List, Optional, Sequence
 
-DATA_PATH: pathlib.Path = pathlib.Path("../data/").resolve()
-OUT_PATH: pathlib.Path = pathlib.Path("../output/").resolve()
-EXAMPLE_PATH: pathlib.Path = pathlib.Path("../example/").resolve()
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from ccc import grid, instrument, packing, parser, streaming  # noqa: E402
+from ccc.layout_cache import LayoutCache  # noqa: E402
+
+# The directories of the day, independent of the working directory
+DAY_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+DATA_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "data")
+OUT_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "output")
+EXAMPLE_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "example")
+
+# Tables are 1 x TABLE_LENGTH or TABLE_LENGTH x 1 cells
+TABLE_LENGTH: int = 3
 
 
 class Room:
@@ -35,120 +46,170 @@ class RoomManager:
     """
     room_dimensions: List[Room]
     room_count: int
-    _room_table_positions: List[List[List[int]]]
-
-    def __init__(self, file: PathLike):
+    _room_table_positions: List[grid.RoomGrid]
+    _file: PathLike
+    _stream: bool
+    _stream_rows: bool
+    _time_budget: float
+    _strategies: Sequence[str]
+    _cache: Optional[LayoutCache]
+
+    def __init__(
+            self,
+            file: PathLike,
+            stream: bool = False,
+            time_budget: float = packing.DEFAULT_TIME_BUDGET,
+            cache: Optional[LayoutCache] = None,
+            strategies: Sequence[str] = packing.DEFAULT_STRATEGIES,
+            stream_rows: bool = False
+    ):
         self.room_count = 0
         self.room_dimensions = []
         self._room_table_positions = []
-        self._read_in_rooms(file)
-
+        self._file = file
+        # Laying out the rooms row by row implies reading them one by one
+        self._stream = stream or stream_rows
+        self._stream_rows = stream_rows
+        self._time_budget = time_budget
+        self._cache = cache
+        self._strategies = strategies
+        if not self._stream:
+            self._read_in_rooms(file)
+
+    @instrument.phase("read")
     def _read_in_rooms(self, file: PathLike) -> None:
         """
         Reads in the locations from the specified file.
         :param file: The file to read from.
         :return: Every location
         """
-        with open(file, "r+") as f:
-            content: List[str] = f.readlines()
-
-            # Parse the last line
-            line_info = content[0].strip("\n").split(" ")
-            self.room_count = int(line_info[0])
-
-            for line in content[1:]:
-                items = line.strip("\n").split(" ")
-                x = int(items[0])
-                y = int(items[1])
-                tables = int(items[2])
+        table = parser.parse_int_table(file)
+        self.room_count = int(table.row(0)[0])
 
-                self.room_dimensions.append(Room(x, y, tables))
+        for row in table.rows(1):
+            x, y, tables = (int(item) for item in row)
+            self.room_dimensions.append(Room(x, y, tables))
 
+    @instrument.phase("calculate", records="room_count")
     def calculate(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
+        if self._stream:
+            self._calculate_streaming(out_path)
+            return
+
         for room in self.room_dimensions:
-            rooms_in_w: int = m.floor(room.x / 3)
-            w_fits = room.x % 3 == 0
-            empty_spaces_in_w = room.x * room.y % 3
-            rows_width: int = room.x
-            rows_count: int = room.y
-            table_count: int = 0
-
-            # We add 0 in the spaces that are empty
-            rows: List[List[str]] = [["." for _ in range(rows_width)] for _ in range(rows_count)]
-            for i, row in enumerate(rows):
-                row: List[str]
-                occupied_width: int = 0
-
-                while occupied_width + 3 <= rows_width:
-                    if row[occupied_width - 1] == "X":
-                        occupied_width += 1
-
-                    if i - 1 >= 0 and ((occupied_width - 1 >= 0 and rows[i - 1][occupied_width - 1] == "X")
-                                  or rows[i - 1][occupied_width] == "X"
-                                  or rows[i - 1][occupied_width + 1] == "X"
-                                  or (occupied_width + 2 < rows_width and rows[i - 1][occupied_width + 2] == "X")
-                                  or (occupied_width + 3 < rows_width and rows[i - 1][occupied_width + 3] == "X")) \
-                        or i + 1 < rows_count and ((occupied_width - 1 >= 0 and rows[i + 1][occupied_width - 1] == "X")
-                                 or rows[i + 1][occupied_width] == "X"
-                                 or rows[i + 1][occupied_width + 1] == "X"
-                                 or (occupied_width + 2 < rows_width and rows[i + 1][occupied_width + 2] == "X")
-                                 or (occupied_width + 3 < rows_width and rows[i + 1][occupied_width + 3] == "X")):
-                        occupied_width += 3
-                        continue
-
-                    if occupied_width + 3 <= rows_width:
-                        row[occupied_width] = "X"
-                        row[occupied_width + 1] = "X"
-                        row[occupied_width + 2] = "X"
-
-                        if i + 1 < rows_count:
-                            rows[i + 1][occupied_width] = "."
-                            rows[i + 1][occupied_width + 1] = "."
-                            rows[i + 1][occupied_width + 2] = "."
-
-                        table_count += 1
-                        occupied_width += 3
-
-            if table_count < room.tables:
-                for i, row in enumerate(rows):
-                    row: List[int]
-                    for j, value in enumerate(row):
-                        if value == "." and i + 2 < rows_count and (j - 1 >= 0 or rows[i + 1][j - 1] == ".") and rows[i + 1][j] == "." and rows[i + 2][j] == "." \
-                            and (rows[i][j - 1] == "." and rows[i + 1][j - 1] == "." and rows[i + 2][j - 1] == ".") \
-                                and (i - 1 < 0 or (rows[i - 1][j - 1] == "." and rows[i - 1][j] == "." and (j + 1 >= rows_width or rows[i - 1][j + 1] == ".")))\
-                                    and (i + 3 >= rows_count or (rows[i + 3][j - 1] == "." and rows[i + 3][j] == "." and (j + 1 >= rows_width or rows[i + 3][j + 1] == "."))) \
-                                        and (j + 1 >= rows_width or (rows[i][j + 1] == "." and rows[i + 1][j + 1] == "." and rows[i + 2][j + 1] == ".")):
-                            row[j] = "X"
-                            rows[i + 1][j] = "X"
-                            rows[i + 2][j] = "X"
-                            table_count += 1
-
-            self._room_table_positions.append(rows)
+            self._room_table_positions.append(self._layout_room(room))
 
         self._write_out(out_path)
 
+    def _layout_room(self, room: Room) -> grid.RoomGrid:
+        """
+        Places the tables of a single room with the strategies of the manager,
+        see packing.pack, e.g. ("profile",) for the exact DP of narrow rooms.
+        Rooms which get fewer tables than requested are reported.
+        :param room: The room to lay out.
+        :return: The occupied cells.
+        """
+        if self._cache is not None:
+            result = self._cache.get(room.x, room.y, room.tables, TABLE_LENGTH, self._time_budget, self._strategies)
+        else:
+            result = packing.pack(room.x, room.y, room.tables, TABLE_LENGTH, self._strategies, self._time_budget)
+
+        # Per room, the layouts taken from the cache included
+        instrument.count("rooms_laid_out", strategy=result.strategy)
+        if result.tables < room.tables:
+            instrument.count("rooms_short", strategy=result.strategy)
+            print(
+                f"-- Placed only {result.tables} of {room.tables} tables in a {room.x} x {room.y} room",
+                file=sys.stderr
+            )
+        return result.grid
+
+    def _calculate_streaming(self, out_path: PathLike) -> None:
+        """
+        Lays out every room as soon as it is read and writes its result
+        straight away, without keeping the rooms in memory.
+        :param out_path: The file to write to.
+        :return:
+        """
+        with open(self._file, "r") as f_in, open(out_path, "w+") as f_out:
+            self.room_count = streaming.read_header(f_in, 1)[0][0]
+
+            with streaming.SeparatedWriter(f_out, "\n\n") as out:
+                for x, y, tables in streaming.iter_records(f_in):
+                    if self._stream_rows:
+                        self._stream_room(out, Room(x, y, tables))
+                    else:
+                        self._write_room(out, self._layout_room(Room(x, y, tables)))
+
+    @staticmethod
+    def _stream_room(out: streaming.SeparatedWriter, room: Room) -> None:
+        """
+        Writes the greedy layout of a single room while it is produced, see
+        packing.stream_greedy, so only a few of its rows are ever in memory.
+        Rooms which get fewer tables than requested are reported.
+        :param out: The writer separating the rooms.
+        :param room: The room to lay out.
+        :return:
+        """
+        occupied: List[int] = [0]
+
+        def format_rows():
+            for bits in packing.stream_greedy(room.x, room.y, room.tables, TABLE_LENGTH):
+                occupied[0] += bin(bits).count("1")
+                yield grid.format_row(bits, room.x)
+
+        instrument.count("rooms_laid_out", strategy="stream")
+        out.write_all(format_rows(), "\n")
+        if occupied[0] // TABLE_LENGTH < room.tables:
+            instrument.count("rooms_short", strategy="stream")
+            print(
+                f"-- Placed only {occupied[0] // TABLE_LENGTH} of {room.tables} tables in a {room.x} x {room.y} room",
+                file=sys.stderr
+            )
+
+    @instrument.phase("write")
     def _write_out(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
-        with open(out_path, "w+") as f:
-            j = 0
-            for room_id, pos in enumerate(self._room_table_positions):
-                for i, row in enumerate(pos):
-                    for j, value in enumerate(row):
-                        f.write(value)
+        # Rooms are separated by an empty line, without one at the end
+        with open(out_path, "w+") as f, streaming.SeparatedWriter(f, "\n\n") as out:
+            for pos in self._room_table_positions:
+                self._write_room(out, pos)
+
+    def render(self, out_dir: PathLike, fmt: str = "png", workers: int = 1) -> List[pathlib.Path]:
+        """
+        Renders the layouts of the last calculation, one image per room, see
+        render.render_all. Streamed layouts are not kept and can not be
+        rendered, use python -m ccc.render on their output file instead.
+        :param out_dir: The directory to write to.
+        :param fmt: The image format, png or svg.
+        :param workers: The number of worker processes.
+        :return: The paths of the images.
+        """
+        # Imported here, solving the rooms does not need the renderer
+        from ccc import render
 
-                    if i + 1 < len(pos) or room_id + 1 < len(self._room_table_positions):
-                        f.write("\n")
-                if room_id + 1 < len(self._room_table_positions):
-                    f.write("\n")
+        return render.render_all(
+            self._room_table_positions, out_dir, fmt, workers=workers, prefix=pathlib.Path(self._file).stem
+        )
+
+    @staticmethod
+    def _write_room(out: streaming.SeparatedWriter, cells: grid.RoomGrid) -> None:
+        """
+        Writes the layout of a single room, one row at a time.
+        :param out: The writer separating the rooms.
+        :param cells: The occupied cells.
+        :return:
+        """
+        out.write_all(cells.rows(), "\n")
 
 
 
@@ -162,29 +223,34 @@ def first_task() -> None:
 
     print(f"-- Writing to {task_out}")
 
-    mng = RoomManager(pathlib.Path(example, "level4_example.in"))
+    # The files share their layouts, many room dimensions repeat
+    cache = LayoutCache()
+
+    mng = RoomManager(pathlib.Path(example, "level4_example.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level4_example.out"))
 
     # Process in the first file
-    mng = RoomManager(pathlib.Path(task_data, "level4_1.in"))
+    mng = RoomManager(pathlib.Path(task_data, "level4_1.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level4_1.out"))
 
     # Process in the second file
-    mng = RoomManager(pathlib.Path(task_data, "level4_2.in"))
+    mng = RoomManager(pathlib.Path(task_data, "level4_2.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level4_2.out"))
 
     # Process in the third file
-    mng = RoomManager(pathlib.Path(task_data, "level4_3.in"))
+    mng = RoomManager(pathlib.Path(task_data, "level4_3.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level4_3.out"))
 
     # Process in the fourth file
-    mng = RoomManager(pathlib.Path(task_data, "level4_4.in"))
+    mng = RoomManager(pathlib.Path(task_data, "level4_4.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level4_4.out"))
 
     # Process in the fifth file
-    mng = RoomManager(pathlib.Path(task_data, "level4_5.in"))
+    mng = RoomManager(pathlib.Path(task_data, "level4_5.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level4_5.out"))
 
+    print(f"-- Layout cache: {cache.stats()}")
+
 
 def main() -> None:
     """
@@ -0,0 +1,74 @@
+# coding=utf-8
+"""
+Compares the batch flight integrator against the scalar loop.
+
+Usage: python benchmarks/bench_integrator.py [flights] [ticks]
+"""
+from __future__ import annotations
+
+import pathlib
+import random
+import sys
+import time
+from typing import Callable, List, TypeVar
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from ccc import integrator  # noqa: E402
+
+T = TypeVar("T")
+
+
+def timed(label: str, func: Callable[[], T]) -> T:
+    """
+    Runs func once and prints the wall time it took.
+    :param label: The name printed in front of the timing.
+    :param func: The function to run.
+    :return: The result of func.
+    """
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<24} {time.perf_counter() - start:8.3f}s")
+    return result
+
+
+def main() -> None:
+    """
+    Entry function for the benchmark
+    """
+    flight_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    max_ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    if not integrator.has_numpy():
+        sys.exit("numpy is required for the batch engine")
+
+    rng = random.Random(2023)
+    velocities: List[List[int]] = [
+        [rng.randint(-100, 100) for _ in range(rng.randint(1, max_ticks))]
+        for _ in range(flight_count)
+    ]
+    accelerations: List[List[int]] = [
+        [rng.randint(0, 20) for _ in range(rng.randint(1, max_ticks))]
+        for _ in range(flight_count)
+    ]
+    print(f"-- {flight_count} flights, up to {max_ticks} ticks")
+
+    for level, flights, gravity in (
+            ("level1", velocities, None), ("level2", accelerations, integrator.GRAVITY)
+    ):
+        if gravity is None:
+            scalar = timed(f"{level} scalar", lambda: [integrator.final_position(f) for f in flights])
+        else:
+            scalar = timed(f"{level} scalar", lambda: [
+                integrator.final_position_from_accelerations(f, gravity) for f in flights
+            ])
+        padded, lengths = timed(f"{level} pad", lambda: integrator.pad_flights(flights))
+        batch = timed(
+            f"{level} batch", lambda: integrator.batch_final_positions(padded, lengths, gravity)
+        ).tolist()
+
+        if batch != scalar:
+            sys.exit(f"{level}: batch engine does not match the scalar loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# coding=utf-8
+"""
+Measures the parser throughput in MB/s on scaled up morning level 1 inputs.
+
+Every morning/data/level1/*.in file is repeated until it reaches the target
+size, then parsed with the old readlines() loop and both parser paths.
+
+Usage: python benchmarks/bench_parser.py [target MB]
+"""
+from __future__ import annotations
+
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from ccc import parser  # noqa: E402
+
+LEVEL1_PATH: pathlib.Path = pathlib.Path(ROOT, "morning", "data", "level1")
+
+
+def readlines_parse(file: pathlib.Path) -> List[List[int]]:
+    """
+    The parsing loop the managers used before the parser module.
+    :param file: The file to parse.
+    :return: The integers of every line.
+    """
+    with open(file, "r+") as f:
+        content: List[str] = f.readlines()
+        return [[int(item) for item in line.strip("\n").split(" ")] for line in content]
+
+
+def scale_up(source: pathlib.Path, target: pathlib.Path, target_bytes: int) -> int:
+    """
+    Writes the records of source repeatedly until target_bytes are reached.
+    :param source: The input file to scale up.
+    :param target: The file to write to.
+    :param target_bytes: The minimum size of the written file.
+    :return: The size of the written file in bytes.
+    """
+    records = source.read_text().splitlines()[1:]
+    block = "\n".join(records) + "\n"
+    repeats = max(1, target_bytes // len(block))
+
+    with open(target, "w") as f:
+        f.write(f"{len(records) * repeats}\n")
+        for _ in range(repeats):
+            f.write(block)
+    return target.stat().st_size
+
+
+def throughput(label: str, size: int, func: Callable[[], object]) -> None:
+    """
+    Runs func once and prints the throughput.
+    :param label: The name printed in front of the result.
+    :param size: The size of the parsed file in bytes.
+    :param func: The parsing function to run.
+    :return:
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<12} {size / elapsed / 1e6:8.1f} MB/s ({elapsed:.3f}s)")
+
+
+def main() -> None:
+    """
+    Entry function for the benchmark
+    """
+    target_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for source in sorted(LEVEL1_PATH.glob("*.in")):
+            target = pathlib.Path(tmp, source.name)
+            size = scale_up(source, target, int(target_mb * 1e6))
+            print(f"-- {source.name} scaled to {size / 1e6:.1f} MB")
+
+            throughput("readlines", size, lambda: readlines_parse(target))
+            throughput("array('q')", size, lambda: parser.parse_int_table(target, use_numpy=False))
+            if parser.np is not None:
+                throughput("numpy", size, lambda: parser.parse_int_table(target, use_numpy=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# coding=utf-8
+"""
+Shared engines for the solutions of the Cloudflight coding contest.
+
+The task scripts in ``morning/solution`` and ``afternoon/solution`` import
+from this package, so they stay runnable as standalone scripts.
+"""
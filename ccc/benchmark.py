@@ -0,0 +1,283 @@
+# coding=utf-8
+"""
+Benchmark harness measuring every level's solver on inputs of growing size.
+
+Every level of SIZES is generated with ccc.generator at each of its sizes,
+the same seed giving the same files on every machine, and solved by the
+manager of its task script. Every solve runs in a fresh interpreter, so the
+peak RSS is the one of that solve alone and no cache is warm from a previous
+size. The fastest of a few repeats is kept, along with
+
+- the wall time of reading, calculating and writing the file,
+- the peak resident set size of the process in bytes and
+- the throughput in records per second.
+
+The results of a run are written as JSON to the baseline directory. The
+compare mode solves the sizes of a baseline again and fails if any of them
+got slower than the threshold allows, e.g. 0.2 for 20 % slower. The
+timings depend on the machine, so no baseline is committed; record one with
+run before the first compare.
+
+Usage: python -m ccc.benchmark run [--level L] [--scale F] [--out FILE]
+       python -m ccc.benchmark compare [--threshold T] [--baseline FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+from ccc import generator, runner
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows has no getrusage
+    resource = None
+
+BASELINE_PATH: pathlib.Path = pathlib.Path(runner.ROOT_PATH, "benchmarks", "baseline")
+DEFAULT_BASELINE: pathlib.Path = pathlib.Path(BASELINE_PATH, "baseline.json")
+
+# Number of records of the generated inputs per level, smaller for the
+# levels which plan a trajectory or search a layout per record
+SIZES: Dict[str, Sequence[int]] = {
+    "morning/1": (1_000, 10_000, 100_000),
+    "morning/2": (1_000, 10_000, 100_000),
+    "morning/3": (100, 1_000, 10_000),
+    "afternoon/1": (10_000, 100_000, 1_000_000),
+    "afternoon/2": (100, 1_000, 10_000),
+    "afternoon/3": (100, 1_000, 10_000),
+    "afternoon/4": (10, 100, 1_000),
+    "afternoon/5": (10, 100, 1_000),
+}
+
+DEFAULT_REPEATS: int = 3
+DEFAULT_THRESHOLD: float = 0.2
+
+# Slowdowns below this many seconds are noise of the machine, not regressions
+NOISE_SECONDS: float = 0.05
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Returns the peak resident set size of the current process.
+    :return: The size in bytes, None if the platform can not tell.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def solve_once(level: str, in_path: pathlib.Path, out_path: pathlib.Path) -> Dict[str, Optional[float]]:
+    """
+    Solves a single file with the manager of the level, inside the process
+    that measures it. The managers print progress, which is discarded.
+    :param level: The level, one of SIZES.
+    :param in_path: The input file.
+    :param out_path: The output file.
+    :return: The wall time in seconds and the peak RSS in bytes.
+    """
+    day, number = level.split("/")
+    script = pathlib.Path(runner.ROOT_PATH, day, "solution", f"task-{number}.py")
+    manager = getattr(runner.load_task(script), runner.MANAGERS[day])
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        manager(in_path).calculate(out_path)
+        wall = time.perf_counter() - start
+    return {"wall": wall, "peak_rss": peak_rss()}
+
+
+def measure(level: str, records: int, work_dir: pathlib.Path, repeats: int = DEFAULT_REPEATS) -> Dict:
+    """
+    Generates an input of the level and solves it in fresh interpreters.
+    :param level: The level, one of SIZES.
+    :param records: The number of flights or rooms of the input.
+    :param work_dir: The directory for the input and output files.
+    :param repeats: The number of solves, the fastest is kept.
+    :return: The result of the size, see the module docstring.
+    """
+    in_path = pathlib.Path(work_dir, f"{level.replace('/', '_')}_{records}.in")
+    out_path = in_path.with_suffix(".out")
+    if not in_path.exists():
+        generator.generate(level, records, in_path)
+
+    best: Optional[Dict] = None
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, "-m", "ccc.benchmark", "solve", level, str(in_path), str(out_path)],
+            cwd=runner.ROOT_PATH, stdout=subprocess.PIPE, check=True
+        )
+        result = json.loads(completed.stdout)
+        if best is None or result["wall"] < best["wall"]:
+            best = result
+
+    return {
+        "records": records,
+        "bytes": in_path.stat().st_size,
+        "wall": best["wall"],
+        "peak_rss": best["peak_rss"],
+        "records_per_second": records / best["wall"] if best["wall"] > 0 else None,
+    }
+
+
+def run(
+        levels: Sequence[str],
+        sizes: Optional[Dict[str, Sequence[int]]] = None,
+        repeats: int = DEFAULT_REPEATS
+) -> Dict:
+    """
+    Measures every size of the passed levels.
+    :param levels: The levels to measure.
+    :param sizes: The sizes per level, by default SIZES.
+    :param repeats: The number of solves per size.
+    :return: The results, with the machine they were measured on.
+    """
+    sizes = sizes if sizes is not None else SIZES
+    results: Dict[str, List[Dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for level in levels:
+            results[level] = []
+            for records in sizes[level]:
+                result = measure(level, records, pathlib.Path(tmp), repeats)
+                results[level].append(result)
+                print(format_result(level, result))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "seed": generator.DEFAULT_SEED,
+            "repeats": repeats,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def scaled_sizes(levels: Sequence[str], scale: float) -> Dict[str, List[int]]:
+    """
+    Scales the sizes of SIZES. Small scales round several sizes to the same
+    number of records, which is measured only once, as compare tells the
+    results of a level apart by it.
+    :param levels: The levels to measure.
+    :param scale: The factor applied to every size.
+    :return: The distinct sizes per level, ascending.
+    """
+    return {level: sorted({max(1, round(records * scale)) for records in SIZES[level]}) for level in levels}
+
+
+def format_result(level: str, result: Dict) -> str:
+    """
+    Formats a single result as a line of the report.
+    :param level: The level of the result.
+    :param result: The result, see measure.
+    :return: The formatted line.
+    """
+    rss = f"{result['peak_rss'] / 2 ** 20:8.1f} MB" if result["peak_rss"] is not None else "       - MB"
+    rate = result["records_per_second"] or 0.0
+    return f"{level:<12} {result['records']:>9} records {result['wall']:9.3f}s {rss} {rate:12.0f} records/s"
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compares the wall times of two runs.
+    :param baseline: The results of the reference run.
+    :param current: The results of the run to check.
+    :param threshold: The allowed relative slowdown, e.g. 0.2 for 20 %.
+    :return: A line per size that got slower than allowed.
+    """
+    regressions: List[str] = []
+    for level, results in baseline["results"].items():
+        measured = {result["records"]: result for result in current["results"].get(level, [])}
+        for reference in results:
+            result = measured.get(reference["records"])
+            if result is None:
+                continue
+
+            allowed = max(reference["wall"] * (1 + threshold), reference["wall"] + NOISE_SECONDS)
+            if result["wall"] > allowed:
+                regressions.append(
+                    f"{level} with {reference['records']} records took {result['wall']:.3f}s, "
+                    f"{result['wall'] / reference['wall'] - 1:+.0%} over the baseline of {reference['wall']:.3f}s"
+                )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the benchmark harness
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="measure and write a baseline")
+    run_parser.add_argument("--level", choices=sorted(SIZES), action="append", dest="levels")
+    run_parser.add_argument("--scale", type=float, default=1.0, help="factor applied to every size")
+    run_parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    run_parser.add_argument("--out", type=pathlib.Path, default=DEFAULT_BASELINE)
+
+    compare_parser = commands.add_parser("compare", help="measure the sizes of a baseline and compare")
+    compare_parser.add_argument("--baseline", type=pathlib.Path, default=DEFAULT_BASELINE)
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    compare_parser.add_argument("--out", type=pathlib.Path, default=None)
+
+    # Used by measure, solves a single file in a fresh interpreter
+    solve_parser = commands.add_parser("solve")
+    solve_parser.add_argument("level", choices=sorted(SIZES))
+    solve_parser.add_argument("in_file", type=pathlib.Path)
+    solve_parser.add_argument("out_file", type=pathlib.Path)
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "solve":
+        print(json.dumps(solve_once(args.level, args.in_file, args.out_file)))
+        return
+
+    if args.command == "run":
+        levels = args.levels or list(SIZES)
+        sizes = scaled_sizes(levels, args.scale)
+        results = run(levels, sizes, args.repeats)
+        out = args.out
+    else:
+        # The timings depend on the machine, so no baseline is committed
+        if not args.baseline.exists():
+            print(
+                f"-- No baseline at {args.baseline}, record one with python -m ccc.benchmark run",
+                file=sys.stderr
+            )
+            sys.exit(1)
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        sizes = {level: [result["records"] for result in results] for level, results in baseline["results"].items()}
+        results = run(list(sizes), sizes, args.repeats)
+        out = args.out
+
+    if out is not None:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"-- Wrote {out}")
+
+    if args.command == "compare":
+        regressions = compare(baseline, results, args.threshold)
+        for line in regressions:
+            print(f"-- Slower: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"-- No regression over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# coding=utf-8
+"""
+Deterministic generator of synthetic inputs for every level.
+
+Writes an ``.in`` file of any size in the format of a level, e.g. 10^8
+flights or rooms of 10^5 x 10^5 cells, so the managers can be measured at
+scale. The same level, count, seed and options always give the same file:
+every random number is drawn from random.Random(seed).randbytes, whether
+numpy is there to speed up the mapping of the bytes to numbers or not.
+The records are produced CHUNK_RECORDS at a time and written through a
+SeparatedWriter, so the memory does not grow with the size of the file.
+
+The values follow the data of the contest:
+
+- morning/1, velocity changes between -100 and 100, ticks per flight,
+- morning/2, accelerations between 0 and 20, ticks per flight,
+- morning/3, the time limit and a target altitude per flight, which are
+  uniform, repeated from a few distinct altitudes or clustered around a few
+  centers, and always reachable within the time limit,
+- afternoon/1 to 5, rooms with sides between min_side and max_side and the
+  number of tables of the level: none for level 1, a third of the cells for
+  the levels 2 and 3, the tile library count for level 4, which is always
+  reachable, and packing.upper_bound for level 5.
+
+Usage: python -m ccc.generator [--seed N] [options] level count out_file
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import random
+import sys
+from array import array
+from os import PathLike
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from ccc import lazy, packing, streaming, trajectory
+from ccc.integrator import GRAVITY
+
+# Imported on first use, the pure path writes the same files
+np = lazy.optional("numpy")
+
+DEFAULT_SEED: int = 2024
+
+# Records drawn and formatted at once
+CHUNK_RECORDS: int = 1 << 12
+
+# Defaults of the options, like the largest files of the contest
+DEFAULT_TICKS: int = 40
+DEFAULT_TIME_LIMIT: int = 7500
+DEFAULT_MIN_SIDE: int = 3
+DEFAULT_MAX_SIDE: int = 100
+
+# Distinct altitudes of the repeated distribution, centers of the clustered
+# one and how far the altitudes of a cluster spread
+DISTINCT_ALTITUDES: int = 16
+CLUSTERS: int = 8
+CLUSTER_SPREAD: int = 50
+
+ALTITUDES: Sequence[str] = ("uniform", "repeated", "clustered")
+
+
+class _Draws:
+    """
+    Class drawing uniform integers from the bytes of a seeded random.Random.
+    Every integer takes 4 bytes, which keeps the modulo bias below 10^-4 for
+    the ranges of the inputs.
+    """
+    _random: random.Random
+
+    def __init__(self, seed: int):
+        self._random = random.Random(seed)
+
+    def indices(self, count: int, span: int) -> List[int]:
+        """
+        Draws integers between 0 and span - 1.
+        :param count: The number of integers.
+        :param span: The number of possible integers.
+        :return: The integers.
+        """
+        data = self._random.randbytes(4 * count)
+        if np is not None:
+            return (np.frombuffer(data, dtype="<u4") % span).tolist()
+
+        words = array("I", data)
+        if sys.byteorder == "big":
+            words.byteswap()
+        return [word % span for word in words]
+
+    def integers(self, count: int, low: int, high: int) -> List[int]:
+        """
+        Draws integers between low and high, both included.
+        :param count: The number of integers.
+        :param low: The smallest integer.
+        :param high: The largest integer.
+        :return: The integers.
+        """
+        return [index + low for index in self.indices(count, high - low + 1)]
+
+
+def _format_rows(values: Sequence, columns: int) -> str:
+    """
+    Formats the values row by row, separated by spaces.
+    :param values: The values of every row after each other, integers or
+    already formatted.
+    :param columns: The values per row.
+    :return: The rows, each ended by a line break.
+    """
+    if values and not isinstance(values[0], str):
+        values = list(map(str, values))
+    return "".join(" ".join(values[start:start + columns]) + "\n" for start in range(0, len(values), columns))
+
+
+def _chunks(count: int) -> Iterator[int]:
+    """
+    Splits the records into chunks.
+    :param count: The number of records.
+    :return: A generator over the number of records of every chunk.
+    """
+    for start in range(0, count, CHUNK_RECORDS):
+        yield min(CHUNK_RECORDS, count - start)
+
+
+def _morning_ticks(draws: _Draws, count: int, low: int, high: int, ticks: int) -> Iterator[str]:
+    """
+    Draws the values of every tick of every flight.
+    :param draws: The random source.
+    :param count: The number of flights.
+    :param low: The smallest value.
+    :param high: The largest value.
+    :param ticks: The ticks per flight.
+    :return: A generator over the formatted chunks, after the header.
+    """
+    # The values are few, so they are formatted once and looked up
+    tokens: List[str] = [str(value) for value in range(low, high + 1)]
+    yield f"{count}\n"
+    for size in _chunks(count):
+        yield _format_rows(list(map(tokens.__getitem__, draws.indices(size * ticks, len(tokens)))), ticks)
+
+
+def morning_1(draws: _Draws, count: int, ticks: int = DEFAULT_TICKS, **_) -> Iterator[str]:
+    """
+    Generates the velocity changes of morning level 1.
+    """
+    return _morning_ticks(draws, count, -100, 100, ticks)
+
+
+def morning_2(draws: _Draws, count: int, ticks: int = DEFAULT_TICKS, **_) -> Iterator[str]:
+    """
+    Generates the accelerations of morning level 2.
+    """
+    return _morning_ticks(draws, count, 0, 2 * GRAVITY, ticks)
+
+
+def highest_altitude(time_limit: int) -> int:
+    """
+    Finds the highest altitude a flight reaches within the time limit.
+    :param time_limit: The maximum number of ticks.
+    :return: The altitude, see trajectory.minimum_ticks.
+    """
+    low, high = 0, 1
+    while trajectory.minimum_ticks(high) <= time_limit:
+        low, high = high, high * 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if trajectory.minimum_ticks(middle) <= time_limit:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def morning_3(
+        draws: _Draws,
+        count: int,
+        time_limit: int = DEFAULT_TIME_LIMIT,
+        altitudes: str = "uniform",
+        **_
+) -> Iterator[str]:
+    """
+    Generates the target altitudes of morning level 3, up to twice the time
+    limit like the contest data, or lower if that is out of reach.
+    """
+    if altitudes not in ALTITUDES:
+        raise ValueError(f"Unknown altitudes {altitudes!r}, one of {ALTITUDES} is needed")
+    highest = min(2 * time_limit, highest_altitude(time_limit))
+    if highest < 1:
+        raise ValueError(f"No altitude can be reached within {time_limit} ticks")
+
+    yield f"{count}\n{time_limit}\n"
+    distinct = draws.integers(DISTINCT_ALTITUDES, 1, highest)
+    centers = draws.integers(CLUSTERS, 1, highest)
+    for size in _chunks(count):
+        if altitudes == "uniform":
+            values = draws.integers(size, 1, highest)
+        elif altitudes == "repeated":
+            picks = draws.integers(size, 0, DISTINCT_ALTITUDES - 1)
+            values = [distinct[pick] for pick in picks]
+        else:
+            picks = draws.integers(size, 0, CLUSTERS - 1)
+            offsets = draws.integers(size, -CLUSTER_SPREAD, CLUSTER_SPREAD)
+            values = [min(max(centers[pick] + offset, 1), highest) for pick, offset in zip(picks, offsets)]
+        yield _format_rows(values, 1)
+
+
+def _tables(level: int, x: int, y: int) -> List[int]:
+    """
+    Returns the number of tables of a room, as the contest data has them.
+    :param level: The afternoon level.
+    :param x: The width of the room.
+    :param y: The height of the room.
+    :return: The number of tables, empty for level 1.
+    """
+    if level == 1:
+        return []
+    if level in (2, 3):
+        return [x * y // 3]
+    if level == 4:
+        return [packing.tile_library(3).count(x, y)]
+    return [packing.upper_bound(x, y, 2)]
+
+
+def _afternoon(
+        level: int,
+        draws: _Draws,
+        count: int,
+        min_side: int = DEFAULT_MIN_SIDE,
+        max_side: int = DEFAULT_MAX_SIDE,
+        **_
+) -> Iterator[str]:
+    """
+    Generates the rooms of an afternoon level.
+    """
+    if not 1 <= min_side <= max_side:
+        raise ValueError(f"Invalid room sides {min_side} to {max_side}")
+
+    yield f"{count}\n"
+    for size in _chunks(count):
+        sides = draws.integers(2 * size, min_side, max_side)
+        yield "".join(
+            " ".join(map(str, [x, y] + _tables(level, x, y))) + "\n" for x, y in zip(sides[::2], sides[1::2])
+        )
+
+
+GENERATORS: Dict[str, Callable[..., Iterator[str]]] = {
+    "morning/1": morning_1,
+    "morning/2": morning_2,
+    "morning/3": morning_3,
+    **{f"afternoon/{level}": functools.partial(_afternoon, level) for level in range(1, 6)},
+}
+
+
+def generate(level: str, count: int, path: PathLike, seed: int = DEFAULT_SEED, **options) -> None:
+    """
+    Writes a synthetic input file.
+    :param level: The level, one of GENERATORS.
+    :param count: The number of flights or rooms.
+    :param path: The file to write to.
+    :param seed: The seed of the random numbers.
+    :param options: The options of the level, ticks, time_limit, altitudes,
+    min_side and max_side.
+    :return:
+    """
+    if level not in GENERATORS:
+        raise ValueError(f"Unknown level {level!r}, one of {sorted(GENERATORS)} is needed")
+    if count < 0:
+        raise ValueError("The count can not be negative")
+
+    with open(path, "w") as f, streaming.SeparatedWriter(f, "") as out:
+        for chunk in GENERATORS[level](_Draws(seed), count, **options):
+            out.write(chunk)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the generator
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("level", choices=sorted(GENERATORS))
+    arg_parser.add_argument("count", type=int)
+    arg_parser.add_argument("out_file")
+    arg_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    arg_parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    arg_parser.add_argument("--time-limit", type=int, default=DEFAULT_TIME_LIMIT)
+    arg_parser.add_argument("--altitudes", choices=ALTITUDES, default="uniform")
+    arg_parser.add_argument("--min-side", type=int, default=DEFAULT_MIN_SIDE)
+    arg_parser.add_argument("--max-side", type=int, default=DEFAULT_MAX_SIDE)
+    args = arg_parser.parse_args(argv)
+
+    generate(
+        args.level, args.count, args.out_file, args.seed, ticks=args.ticks, time_limit=args.time_limit,
+        altitudes=args.altitudes, min_side=args.min_side, max_side=args.max_side
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+# coding=utf-8
+"""
+Bit-packed room grid for the afternoon levels 4 and 5.
+
+Every cell of a room is a single bit of a bytearray, one byte aligned row
+after the other, instead of a boxed string per cell in a list of lists. A
+room of 10k x 10k cells takes 12.5 MB this way instead of roughly 800 MB of
+list slots. Tables are placed and tested as whole spans of a row, which are
+read with a single int.from_bytes call per row, and the rows are serialised
+through a lookup table per byte instead of per cell. ConflictMask keeps the
+dilated occupancy next to the grid, so the neighbourhood test of a table
+only reads the cells of the table.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List
+
+# Default length of a table, tables are 1 x TABLE_LENGTH or TABLE_LENGTH x 1
+TABLE_LENGTH: int = 3
+
+FREE: str = "."
+TAKEN: str = "X"
+
+# The cells of every possible byte, the lowest bit is the leftmost cell
+_BYTE_CELLS: List[str] = [
+    "".join(TAKEN if byte >> bit & 1 else FREE for bit in range(8)) for byte in range(256)
+]
+_TO_BITS = str.maketrans({FREE: "0", TAKEN: "1"})
+
+
+def parse_row(row: str) -> int:
+    """
+    Parses a single row of X and . cells.
+    :param row: The cells, without the line break.
+    :return: The occupied cells as bits, the lowest bit is the first column.
+    """
+    # Reversed, so the first cell becomes the lowest bit
+    return int(row[::-1].translate(_TO_BITS) or "0", 2)
+
+
+def format_row(bits: int, width: int) -> str:
+    """
+    Serialises a single row which is not part of a grid, see parse_row.
+    :param bits: The occupied cells, the lowest bit is the first column.
+    :param width: The width of the row.
+    :return: The cells as X and . characters.
+    """
+    return "".join([_BYTE_CELLS[byte] for byte in bits.to_bytes((width + 7) >> 3, "little")])[:width]
+
+
+class RoomGrid:
+    """
+    Class representing the occupied cells of a room.
+    """
+    width: int
+    height: int
+    _stride: int
+    _cells: bytearray
+
+    def __init__(self, width: int, height: int):
+        if width < 0 or height < 0:
+            raise ValueError("The dimensions of a grid can not be negative")
+
+        self.width = width
+        self.height = height
+        self._stride = (width + 7) >> 3
+        self._cells = bytearray(self._stride * height)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[str]) -> RoomGrid:
+        """
+        Parses a grid from its X/. rows.
+        :param rows: The cells per row, every row has to have the same width.
+        :return: The parsed grid.
+        """
+        rows = [row.rstrip("\r\n") for row in rows]
+        grid = cls(len(rows[0]) if rows else 0, len(rows))
+        for i, row in enumerate(rows):
+            if len(row) != grid.width:
+                raise ValueError(f"Row {i} has {len(row)} cells instead of {grid.width}")
+
+            grid._cells[i * grid._stride:(i + 1) * grid._stride] = parse_row(row).to_bytes(grid._stride, "little")
+        return grid
+
+    @classmethod
+    def from_bytes(cls, width: int, height: int, data: bytes) -> RoomGrid:
+        """
+        Restores a grid from the bytes of to_bytes.
+        :param width: The width of the grid.
+        :param height: The height of the grid.
+        :param data: The packed cells.
+        :return: The restored grid.
+        """
+        grid = cls(width, height)
+        if len(data) != len(grid._cells):
+            raise ValueError(f"Expected {len(grid._cells)} bytes for {width} x {height}, got {len(data)}")
+        grid._cells[:] = data
+        return grid
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns the packed cells, see from_bytes.
+        :return: The cells, one bit each and every row byte aligned.
+        """
+        return bytes(self._cells)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes holding the cells.
+        """
+        return len(self._cells)
+
+    def get(self, i: int, j: int) -> bool:
+        """
+        Returns whether a single cell is occupied.
+        :param i: The row of the cell.
+        :param j: The column of the cell.
+        :return: True if occupied, cells outside of the grid are free.
+        """
+        if not (0 <= i < self.height and 0 <= j < self.width):
+            return False
+        return bool(self._cells[i * self._stride + (j >> 3)] >> (j & 7) & 1)
+
+    def span(self, i: int, j: int, length: int) -> int:
+        """
+        Reads consecutive cells of a single row.
+        :param i: The row of the cells.
+        :param j: The first column, may be outside of the grid.
+        :param length: The number of cells.
+        :return: The cells as bits, the lowest bit is column j. The cells
+        outside of the grid are free.
+        """
+        lo, hi = max(j, 0), min(j + length, self.width)
+        if not 0 <= i < self.height or lo >= hi:
+            return 0
+
+        base = i * self._stride
+        bits = int.from_bytes(self._cells[base + (lo >> 3):base + ((hi - 1) >> 3) + 1], "little")
+        return (bits >> (lo & 7) & ((1 << (hi - lo)) - 1)) << (lo - j)
+
+    def is_free(self, i: int, j: int, rows: int, columns: int) -> bool:
+        """
+        Tests a rectangle of cells, clipped to the grid.
+        :param i: The top row.
+        :param j: The left column.
+        :param rows: The number of rows.
+        :param columns: The number of columns.
+        :return: True if none of the cells is occupied.
+        """
+        lo, hi = max(j, 0), min(j + columns, self.width)
+        top, bottom = max(i, 0), min(i + rows, self.height)
+        if lo >= hi or top >= bottom:
+            return True
+
+        # Same bytes and mask for every row of the rectangle
+        first, last = lo >> 3, ((hi - 1) >> 3) + 1
+        mask = ((1 << (hi - lo)) - 1) << (lo & 7)
+        cells, stride = self._cells, self._stride
+        for base in range(top * stride, bottom * stride, stride):
+            if int.from_bytes(cells[base + first:base + last], "little") & mask:
+                return False
+        return True
+
+    def fits(self, i: int, j: int, horizontal: bool, length: int = TABLE_LENGTH) -> bool:
+        """
+        Tests whether a table can be placed, without looking at its
+        neighbourhood.
+        :param i: The row of the first cell of the table.
+        :param j: The column of the first cell of the table.
+        :param horizontal: Whether the table is 1 x length, else length x 1.
+        :param length: The length of the table.
+        :return: True if the table is inside of the grid on free cells.
+        """
+        rows, columns = (1, length) if horizontal else (length, 1)
+        if i < 0 or j < 0 or i + rows > self.height or j + columns > self.width:
+            return False
+        return self.is_free(i, j, rows, columns)
+
+    def neighbourhood_free(
+            self, i: int, j: int, horizontal: bool, length: int = TABLE_LENGTH, diagonal: bool = True
+    ) -> bool:
+        """
+        Tests whether the cells of a table and the cells around it are free.
+        :param i: The row of the first cell of the table.
+        :param j: The column of the first cell of the table.
+        :param horizontal: Whether the table is 1 x length, else length x 1.
+        :param length: The length of the table.
+        :param diagonal: Whether tables touching only at a corner conflict.
+        :return: True if no occupied cell is within the neighbourhood.
+        """
+        rows, columns = (1, length) if horizontal else (length, 1)
+        if diagonal:
+            return self.is_free(i - 1, j - 1, rows + 2, columns + 2)
+        return self.is_free(i - 1, j, rows + 2, columns) and self.is_free(i, j - 1, rows, columns + 2)
+
+    def place(self, i: int, j: int, horizontal: bool, length: int = TABLE_LENGTH) -> None:
+        """
+        Marks the cells of a table as occupied.
+        :param i: The row of the first cell of the table.
+        :param j: The column of the first cell of the table.
+        :param horizontal: Whether the table is 1 x length, else length x 1.
+        :param length: The length of the table.
+        :return:
+        """
+        rows, columns = (1, length) if horizontal else (length, 1)
+        if i < 0 or j < 0 or i + rows > self.height or j + columns > self.width:
+            raise ValueError(f"A table at {i}, {j} does not fit into {self.width} x {self.height}")
+        self.fill(i, j, rows, columns)
+
+    def fill(self, i: int, j: int, rows: int, columns: int) -> None:
+        """
+        Marks a rectangle of cells as occupied, clipped to the grid.
+        :param i: The top row.
+        :param j: The left column.
+        :param rows: The number of rows.
+        :param columns: The number of columns.
+        :return:
+        """
+        lo, hi = max(j, 0), min(j + columns, self.width)
+        top, bottom = max(i, 0), min(i + rows, self.height)
+        if lo >= hi or top >= bottom:
+            return
+
+        first, last = lo >> 3, ((hi - 1) >> 3) + 1
+        mask = ((1 << (hi - lo)) - 1) << (lo & 7)
+        cells, stride = self._cells, self._stride
+        for base in range(top * stride, bottom * stride, stride):
+            bits = int.from_bytes(cells[base + first:base + last], "little") | mask
+            cells[base + first:base + last] = bits.to_bytes(last - first, "little")
+
+    def merge_row(self, i: int, bits: int) -> None:
+        """
+        Marks the cells of a whole row as occupied.
+        :param i: The index of the row, rows outside of the grid are ignored.
+        :param bits: The cells to mark, the lowest bit is the first column.
+        :return:
+        """
+        if not 0 <= i < self.height:
+            return
+
+        bits = (self.row_bits(i) | bits) & ((1 << self.width) - 1)
+        self._cells[i * self._stride:(i + 1) * self._stride] = bits.to_bytes(self._stride, "little")
+
+    def row_bits(self, i: int) -> int:
+        """
+        Reads a whole row.
+        :param i: The index of the row.
+        :return: The cells as bits, the lowest bit is the first column.
+        """
+        return int.from_bytes(self._cells[i * self._stride:(i + 1) * self._stride], "little")
+
+    def row_bytes(self, i: int) -> bytes:
+        """
+        Reads the packed bytes of a whole row.
+        :param i: The index of the row.
+        :return: The cells, the lowest bit of the first byte is the first
+        column, the bits past the width are free.
+        """
+        return bytes(self._cells[i * self._stride:(i + 1) * self._stride])
+
+    def count(self) -> int:
+        """
+        Counts the occupied cells.
+        :return: The number of occupied cells.
+        """
+        return bin(int.from_bytes(self._cells, "little")).count("1")
+
+    def row(self, i: int) -> str:
+        """
+        Serialises a single row.
+        :param i: The index of the row.
+        :return: The cells as X and . characters.
+        """
+        base = i * self._stride
+        return "".join([_BYTE_CELLS[byte] for byte in self._cells[base:base + self._stride]])[:self.width]
+
+    def rows(self) -> Iterator[str]:
+        """
+        Serialises the grid one row at a time.
+        :return: A generator over the cells of every row as X and . characters.
+        """
+        return (self.row(i) for i in range(self.height))
+
+    def __str__(self) -> str:
+        return "\n".join(self.rows())
+
+
+class ConflictMask:
+    """
+    Class tracking where tables can still be placed in a room.
+
+    Next to the occupied cells it keeps the forbidden cells, which are the
+    occupied cells dilated by their neighbourhood. A table can be placed iff
+    none of its own cells is forbidden, so a query reads the cells of the
+    table only instead of its whole neighbourhood, and the placement updates
+    the dilation in place.
+    """
+    cells: RoomGrid
+    forbidden: RoomGrid
+    diagonal: bool
+
+    def __init__(self, cells: RoomGrid, diagonal: bool = True):
+        self.cells = cells
+        self.forbidden = RoomGrid(cells.width, cells.height)
+        self.diagonal = diagonal
+        full: int = (1 << cells.width) - 1
+        for i in range(cells.height):
+            bits = cells.row_bits(i)
+            if not bits:
+                continue
+
+            # Dilates the tables which are already placed, a row at a time
+            wide = (bits | bits << 1 | bits >> 1) & full
+            self.forbidden.merge_row(i - 1, wide if diagonal else bits)
+            self.forbidden.merge_row(i, wide)
+            self.forbidden.merge_row(i + 1, wide if diagonal else bits)
+
+    def can_place(self, i: int, j: int, horizontal: bool, length: int = TABLE_LENGTH) -> bool:
+        """
+        Tests whether a table can be placed, see RoomGrid.neighbourhood_free.
+        :param i: The row of the first cell of the table.
+        :param j: The column of the first cell of the table.
+        :param horizontal: Whether the table is 1 x length, else length x 1.
+        :param length: The length of the table.
+        :return: True if the table is inside of the room and does not touch
+        another table.
+        """
+        return self.forbidden.fits(i, j, horizontal, length)
+
+    def place(self, i: int, j: int, horizontal: bool, length: int = TABLE_LENGTH) -> None:
+        """
+        Places a table, without testing whether it can be placed.
+        :param i: The row of the first cell of the table.
+        :param j: The column of the first cell of the table.
+        :param horizontal: Whether the table is 1 x length, else length x 1.
+        :param length: The length of the table.
+        :return:
+        """
+        self.cells.place(i, j, horizontal, length)
+        self._forbid(i, j, *((1, length) if horizontal else (length, 1)))
+
+    def free_starts(self, i: int, horizontal: bool, length: int = TABLE_LENGTH) -> int:
+        """
+        Finds every column of a row a table can start at, all at once.
+        :param i: The row of the first cells of the tables.
+        :param horizontal: Whether the tables are 1 x length, else length x 1.
+        :param length: The length of the tables.
+        :return: The columns as bits, the lowest bit is the first column. The
+        tables are not tested against each other.
+        """
+        width = self.forbidden.width
+        rows, columns = (1, length) if horizontal else (length, 1)
+        if i < 0 or i + rows > self.forbidden.height or columns > width:
+            return 0
+
+        taken = 0
+        for row in range(i, i + rows):
+            taken |= self.forbidden.row_bits(row)
+        # A start is free if the next columns - 1 cells are free as well
+        spread = taken
+        for shift in range(1, columns):
+            spread |= taken >> shift
+        return ~spread & ((1 << (width - columns + 1)) - 1)
+
+    def fill_row(self, i: int, horizontal: bool, length: int = TABLE_LENGTH) -> int:
+        """
+        Places as many tables as possible into a row, from left to right.
+        :param i: The row of the first cells of the tables.
+        :param horizontal: Whether the tables are 1 x length, else length x 1.
+        :param length: The length of the tables.
+        :return: The number of placed tables.
+        """
+        starts = self.free_starts(i, horizontal, length)
+        # The next start is past the placed table and the gap after it
+        gap: int = (length if horizontal else 1) + 1
+        placed: int = 0
+        while starts:
+            j = (starts & -starts).bit_length() - 1
+            self.place(i, j, horizontal, length)
+            placed += 1
+            starts &= ~((1 << (j + gap)) - 1)
+        return placed
+
+    def _forbid(self, i: int, j: int, rows: int, columns: int) -> None:
+        """
+        Marks the cells around a rectangle of occupied cells as forbidden.
+        :param i: The top row of the rectangle.
+        :param j: The left column of the rectangle.
+        :param rows: The number of rows.
+        :param columns: The number of columns.
+        :return:
+        """
+        if self.diagonal:
+            self.forbidden.fill(i - 1, j - 1, rows + 2, columns + 2)
+        else:
+            self.forbidden.fill(i - 1, j, rows + 2, columns)
+            self.forbidden.fill(i, j - 1, rows, columns + 2)
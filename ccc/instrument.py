@@ -0,0 +1,245 @@
+# coding=utf-8
+"""
+Instrumentation of the managers, phase timers and counters.
+
+The managers mark their phases with the phase decorator, _read_in_* as
+"read", calculate as "calculate" and _write_out* as "write", and count what
+they solve with count, per record and whether or not it came from a cache:
+
+- ticks, the ticks of every flight planned by the morning level 3,
+- rooms_laid_out, every room laid out by the afternoon levels 4 and 5,
+  labelled with the strategy whose layout was used, "stream" for the
+  streamed rows, and
+- rooms_short, the rooms of those which got fewer tables than requested.
+
+The tables are placed a whole row of bits at a time, see
+ConflictMask.fill_row, so there are no single candidate placements to
+count, only rooms.
+
+The table packing counts its own work on top, only for the rooms it packs,
+so not for the cache hits: strategy_runs, every call of a strategy, and
+strategy_shortfalls, the calls which found no layout or too few tables.
+
+Everything is off by default. A disabled phase is a single call with a flag
+check around the method, a disabled counter a call that returns straight
+away, and both are only used once per file, flight or room, never per tick
+or cell. Enabling the instrumentation with enable() or the CCC_METRICS
+environment variable records
+
+- the calls, the seconds and the seconds without nested phases per phase,
+  so the write phase is not counted twice within calculate,
+- the records solved, see the records argument of phase, and the records
+  per second over the time of the outermost phases and
+- the counters, by name and labels.
+
+The report is exported as JSON or in the Prometheus text format. If
+CCC_METRICS names a file, the report is written to it when the process
+exits, in the Prometheus format if the file ends with .prom and as JSON
+otherwise. Counts of worker processes stay in the workers and are not part
+of the report.
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+# The environment variable enabling the instrumentation for a whole process
+ENV_VARIABLE: str = "CCC_METRICS"
+
+# Prefix of every metric of the Prometheus export
+PROMETHEUS_PREFIX: str = "ccc_"
+
+# Name and sorted (label, value) pairs of a counter
+CounterKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_enabled: bool = False
+# Calls, seconds and seconds without nested phases per phase
+_phases: Dict[str, List[float]] = {}
+_counters: Dict[CounterKey, int] = {}
+# Seconds of the nested phases, per phase that is running
+_nested: List[float] = []
+_outer_seconds: float = 0.0
+
+
+def enable(enabled: bool = True) -> None:
+    """
+    Turns the instrumentation on or off, the recorded values are kept.
+    :param enabled: Whether phases and counters are recorded.
+    :return:
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """
+    Returns whether phases and counters are recorded.
+    """
+    return _enabled
+
+
+def reset() -> None:
+    """
+    Drops every recorded value.
+    :return:
+    """
+    global _outer_seconds
+    _phases.clear()
+    _counters.clear()
+    _outer_seconds = 0.0
+
+
+def count(name: str, value: int = 1, **labels: str) -> None:
+    """
+    Adds to a counter, if the instrumentation is enabled.
+    :param name: The name of the counter.
+    :param value: The amount to add.
+    :param labels: The labels of the counter, e.g. strategy="greedy".
+    :return:
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def phase(name: str, records: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorates a method as a phase of the managers, which is timed if the
+    instrumentation is enabled.
+    :param name: The name of the phase.
+    :param records: The attribute of the manager holding the number of
+    records once the method returned, e.g. "flight_count", which is added
+    to the records counter.
+    :return: The decorator.
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            global _outer_seconds
+            _nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = _nested.pop()
+                if _nested:
+                    _nested[-1] += elapsed
+                else:
+                    _outer_seconds += elapsed
+
+                stats = _phases.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += elapsed - nested
+                if records is not None and args:
+                    count("records", int(getattr(args[0], records, 0) or 0))
+
+        return wrapper
+
+    return decorator
+
+
+def report() -> Dict:
+    """
+    Collects the recorded values.
+    :return: The phases, the counters and the records per second.
+    """
+    solved = sum(value for (name, _), value in _counters.items() if name == "records")
+    return {
+        "phases": {
+            name: {"calls": int(calls), "seconds": seconds, "self_seconds": own}
+            for name, (calls, seconds, own) in sorted(_phases.items())
+        },
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ],
+        "records": solved,
+        "records_per_second": solved / _outer_seconds if _outer_seconds > 0 else None,
+    }
+
+
+def to_json() -> str:
+    """
+    Exports the recorded values as JSON, see report.
+    """
+    return json.dumps(report(), indent=2) + "\n"
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    """
+    Formats the labels of a Prometheus sample.
+    :param labels: The labels.
+    :return: The labels in braces, empty if there are none.
+    """
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in sorted(labels.items())
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def to_prometheus(prefix: str = PROMETHEUS_PREFIX) -> str:
+    """
+    Exports the recorded values in the Prometheus text format.
+    :param prefix: The prefix of every metric name.
+    :return: The samples, one per line.
+    """
+    data = report()
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> str:
+        lines.append(f"# HELP {prefix}{name} {help_text}")
+        lines.append(f"# TYPE {prefix}{name} {kind}")
+        return f"{prefix}{name}"
+
+    if data["phases"]:
+        metric = family("phase_calls_total", "counter", "Calls of a manager phase.")
+        lines.extend(f'{metric}{{phase="{p}"}} {v["calls"]}' for p, v in data["phases"].items())
+        metric = family("phase_seconds_total", "counter", "Seconds spent in a manager phase.")
+        lines.extend(f'{metric}{{phase="{p}"}} {v["seconds"]:.9f}' for p, v in data["phases"].items())
+        metric = family("phase_self_seconds_total", "counter", "Seconds of a manager phase without nested phases.")
+        lines.extend(f'{metric}{{phase="{p}"}} {v["self_seconds"]:.9f}' for p, v in data["phases"].items())
+
+    names = sorted({counter["name"] for counter in data["counters"]})
+    for name in names:
+        metric = family(f"{name}_total", "counter", f"Count of {name.replace('_', ' ')}.")
+        lines.extend(
+            f"{metric}{_labels(counter['labels'])} {counter['value']}"
+            for counter in data["counters"] if counter["name"] == name
+        )
+
+    if data["records_per_second"] is not None:
+        metric = family("records_per_second", "gauge", "Records solved per second of the manager phases.")
+        lines.append(f"{metric} {data['records_per_second']:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def write(path: os.PathLike) -> None:
+    """
+    Writes the recorded values to a file.
+    :param path: The file, in the Prometheus format if it ends with .prom
+    and as JSON otherwise.
+    :return:
+    """
+    text = to_prometheus() if str(path).endswith(".prom") else to_json()
+    with open(path, "w") as f:
+        f.write(text)
+
+
+if os.environ.get(ENV_VARIABLE):
+    enable()
+    atexit.register(write, os.environ[ENV_VARIABLE])
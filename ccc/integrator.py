@@ -0,0 +1,155 @@
+# coding=utf-8
+"""
+Flight integrators for the morning levels 1 and 2.
+
+Contains the scalar reference loop and a NumPy batch engine, which integrates
+every flight of a file at once. The ground rule (a position never drops below
+zero) turns the position update into ``p = max(p + v, 0)``, which is not a
+plain prefix sum. It is solved as a Lindley recursion instead:
+
+    p_n = S_n - min(0, S_1, ..., S_n)
+
+where ``S`` is the prefix sum of the velocities. Everything is integer
+arithmetic, so the results match the scalar loop bit for bit.
+"""
+from __future__ import annotations
+
+import itertools
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Tuple
+
+from ccc import lazy
+
+if TYPE_CHECKING:
+    from ccc import parser
+
+# Imported on first use, the scalar path works without numpy
+np = lazy.optional("numpy")
+
+GRAVITY: int = 10
+
+# Rows integrated at once, bounds the size of the temporary cumsum arrays
+DEFAULT_CHUNK_ROWS: int = 1 << 14
+
+
+def has_numpy() -> bool:
+    """
+    Returns whether the batch engine is available.
+    :return: True if numpy is installed.
+    """
+    return np is not None
+
+
+def final_position(velocities: Iterable[int]) -> int:
+    """
+    Integrates the velocities of a single flight with the scalar loop.
+    :param velocities: The velocity for every tick.
+    :return: The final position.
+    """
+    pos: int = 0
+    for velocity in velocities:
+        pos = pos + velocity if pos + velocity >= 0 else 0
+    return pos
+
+
+def final_position_from_accelerations(
+        accelerations: Iterable[int], gravity: int = GRAVITY
+) -> int:
+    """
+    Integrates the accelerations of a single flight with the scalar loop.
+    :param accelerations: The acceleration for every tick.
+    :param gravity: The gravity subtracted from every acceleration.
+    :return: The final position.
+    """
+    pos: int = 0
+    velocity: int = 0
+    for acc in accelerations:
+        velocity = velocity + (acc - gravity)
+        pos = pos + velocity if pos + velocity >= 0 else 0
+    return pos
+
+
+def pad_flights(flights: Sequence[Sequence[int]]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Loads the flights into a zero padded 2-D array.
+    :param flights: The values of every flight.
+    :return: The padded (flights x max ticks) array and the length per flight.
+    """
+    lengths = np.fromiter((len(flight) for flight in flights), dtype=np.int64, count=len(flights))
+    width: int = int(lengths.max()) if len(flights) else 0
+    padded = np.zeros((len(flights), width), dtype=np.int64)
+
+    # Row major order of the mask matches the order of the flattened values
+    values = np.fromiter(itertools.chain.from_iterable(flights), dtype=np.int64, count=int(lengths.sum()))
+    padded[np.arange(width, dtype=np.int64) < lengths[:, None]] = values
+    return padded, lengths
+
+
+def batch_final_positions(
+        padded: "np.ndarray",
+        lengths: "np.ndarray",
+        gravity: Optional[int] = None,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> "np.ndarray":
+    """
+    Integrates all flights at once.
+    :param padded: The padded values, see pad_flights.
+    :param lengths: The number of ticks per flight.
+    :param gravity: If None the values are velocities (level 1), otherwise
+    they are accelerations and the gravity is subtracted (level 2).
+    :param chunk_rows: The number of flights integrated at once.
+    :return: The final position per flight.
+    """
+    if np is None:
+        raise RuntimeError("The batch engine requires numpy")
+
+    result = np.empty(padded.shape[0], dtype=np.int64)
+    columns = np.arange(padded.shape[1], dtype=np.int64)
+    for start in range(0, padded.shape[0], chunk_rows):
+        block = padded[start:start + chunk_rows]
+        if gravity is None:
+            velocities = block
+        else:
+            # Padded ticks must not keep moving the flight
+            velocities = np.cumsum(block - gravity, axis=1)
+            velocities[columns >= lengths[start:start + chunk_rows, None]] = 0
+
+        sums = np.cumsum(velocities, axis=1)
+        if sums.shape[1] == 0:
+            result[start:start + chunk_rows] = 0
+            continue
+        lowest = np.minimum(sums.min(axis=1), 0)
+        result[start:start + chunk_rows] = sums[:, -1] - lowest
+    return result
+
+
+def final_positions(
+        flights: Sequence[Sequence[int]], gravity: Optional[int] = None
+) -> List[int]:
+    """
+    Integrates every flight, using the batch engine if numpy is available.
+    :param flights: The values of every flight.
+    :param gravity: See batch_final_positions.
+    :return: The final position per flight.
+    """
+    if np is None or not flights:
+        if gravity is None:
+            return [final_position(flight) for flight in flights]
+        return [final_position_from_accelerations(flight, gravity) for flight in flights]
+
+    padded, lengths = pad_flights(flights)
+    return batch_final_positions(padded, lengths, gravity).tolist()
+
+
+def table_final_positions(table: "parser.IntTable", gravity: Optional[int] = None) -> List[int]:
+    """
+    Integrates every row of a parsed table. Used as the kernel of the sharded
+    mode.
+    :param table: The rows to integrate, one flight per row.
+    :param gravity: See batch_final_positions.
+    :return: The final position per flight.
+    """
+    if np is None:
+        return final_positions(table.rows(), gravity)
+
+    padded, lengths = table.padded()
+    return batch_final_positions(padded, lengths, gravity).tolist()
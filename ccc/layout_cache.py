@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+LRU cache for packed room layouts of the afternoon levels 4 and 5.
+
+The inputs repeat room dimensions a lot, so the packed layouts are cached per
+width, height, number of tables and table length, and per strategies and time
+budget, which decide how many tables a layout holds. The cache can be backed
+by a JSON file, which is loaded on creation and written back on save(), so
+the layouts survive between runs, see persistent_cache. Rooms which are not
+cached yet still share the derived tile library of packing, which memoises
+the stitching of periodic tiles per rectangle size and so per modular class
+of the room dimensions.
+"""
+from __future__ import annotations
+
+import base64
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from ccc import packing
+from ccc.grid import TABLE_LENGTH, RoomGrid
+from ccc.persistent_cache import PersistentCache
+
+DEFAULT_MAX_SIZE: int = 1024
+
+Key = Tuple[int, int, int, int, Tuple[str, ...], float]
+
+
+class LayoutCache(PersistentCache[Key, packing.PackResult]):
+    """
+    Class representing a LRU cache of packed room layouts.
+    """
+    default_max_size: int = DEFAULT_MAX_SIZE
+
+    def get(
+            self,
+            width: int,
+            height: int,
+            tables: int,
+            length: int = TABLE_LENGTH,
+            time_budget: float = packing.DEFAULT_TIME_BUDGET,
+            strategies: Sequence[str] = packing.DEFAULT_STRATEGIES
+    ) -> packing.PackResult:
+        """
+        Returns the packed layout of a room, packing it on a miss.
+        :param width: The width of the room.
+        :param height: The height of the room.
+        :param tables: The number of tables that should be placed.
+        :param length: The length of the tables.
+        :param time_budget: The seconds packing the room may take on a miss.
+        :param strategies: The strategies of packing.pack used on a miss.
+        :return: The layout, its grid must not be modified.
+        """
+        key: Key = (width, height, tables, length, tuple(strategies), time_budget)
+        result = self._lookup(key)
+        if result is None:
+            result = packing.pack(width, height, tables, length, strategies, time_budget)
+            self._put(key, result)
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit and miss statistics.
+        :return: The hits, misses, hit rate, the number of entries and the
+        number of rectangles in the tile libraries.
+        """
+        stats = super().stats()
+        stats["tiles"] = sum(len(packing.tile_library(length)) for length in {key[3] for key in self._entries})
+        return stats
+
+    def _encode(self, key: Key, result: packing.PackResult) -> Dict[str, Any]:
+        return {
+            "key": list(key),
+            "tables": result.tables,
+            "strategy": result.strategy,
+            "cells": base64.b64encode(result.grid.to_bytes()).decode("ascii"),
+        }
+
+    def _decode(self, entry: Dict[str, Any]) -> Optional[Tuple[Key, packing.PackResult]]:
+        # Entries of older files lack the strategies and time budget
+        if len(entry["key"]) != 6:
+            return None
+
+        width, height, tables, length, strategies, time_budget = entry["key"]
+        grid = RoomGrid.from_bytes(width, height, base64.b64decode(entry["cells"]))
+        return (
+            (width, height, tables, length, tuple(strategies), time_budget),
+            packing.PackResult(grid, entry["tables"], entry["strategy"])
+        )
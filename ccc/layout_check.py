@@ -0,0 +1,341 @@
+# coding=utf-8
+"""
+Validator for the room layouts of the afternoon levels 3, 4 and 5.
+
+Reads an ``.out`` file room by room, one row at a time, and checks every room
+against the matching line of the ``.in`` file. A room is valid if
+
+- it has as many rows and columns as the room,
+- every cell is free or part of a table, a table id for level 3 and X or .
+  for the levels 4 and 5,
+- every table is 1 x length or length x 1 cells,
+- no two tables touch, not even at a corner, for the levels 4 and 5 and
+- it has at least as many tables as requested.
+
+The tables of an X/. room are labelled as the runs of occupied cells along
+both axes, bit-parallel on whole rows like the RoomGrid, see check_grid. A
+cell belongs to a valid table iff it is in a horizontal run of length cells
+and a vertical run of one cell, or the other way round, and the vertical runs
+are carried from row to row, so a room of any size is checked with a few
+rows in memory.
+
+The scan replaces a labelling of the connected components with numpy, which
+needs the whole room as an array and its labels as a second one, 8 bytes per
+cell each. The scan costs a fixed number of big int operations per row,
+each linear in width / 64 machine words, about a quarter of a millisecond for
+a row of 10^5 cells including parsing it, and its memory grows with the
+width alone.
+
+Usage: python -m ccc.layout_check [--level N] in_file out_file
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from os import PathLike
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ccc import streaming
+from ccc.grid import FREE, TABLE_LENGTH, TAKEN, parse_row
+
+# Failures kept with their details, the rest is only counted
+MAX_REPORTED: int = 100
+
+# Table length, whether the cells are table ids and whether tables may not
+# touch at all, per level
+LEVELS: Dict[int, Tuple[int, bool, bool]] = {
+    3: (TABLE_LENGTH, True, False),
+    4: (TABLE_LENGTH, False, True),
+    5: (2, False, True),
+}
+
+# Reasons a room is rejected for, by priority
+VALID: int = 0
+BAD_SIZE: int = 1
+BAD_CELL: int = 2
+BAD_SHAPE: int = 3
+TOUCHING: int = 4
+TOO_FEW: int = 5
+MISSING: int = 6
+EXTRA: int = 7
+
+REASONS: Tuple[str, ...] = (
+    "valid",
+    "does not match the dimensions of the room",
+    "has a cell that is neither free nor a table",
+    "has cells that do not form separate 1 x length tables",
+    "has tables touching at a corner",
+    "has fewer tables than requested",
+    "is missing from the output",
+    "has rows after the last room",
+)
+
+
+class Report:
+    """
+    Class representing the result of validating an output file.
+    """
+    checked: int
+    invalid: int
+    tables: int
+    failures: List[Tuple[int, int, int, int, int]]
+
+    def __init__(self):
+        self.checked = 0
+        self.invalid = 0
+        self.tables = 0
+        self.failures = []
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether every room is valid.
+        """
+        return self.invalid == 0
+
+    def add(self, index: int, x: int, y: int, tables: int, reason: int) -> None:
+        """
+        Records an invalid room.
+        :param index: The index of the room in the file.
+        :param x: The width of the room, -1 if unknown.
+        :param y: The height of the room, -1 if unknown.
+        :param tables: The number of requested tables, -1 if unknown.
+        :param reason: The reason code, see REASONS.
+        :return:
+        """
+        self.invalid += 1
+        if len(self.failures) < MAX_REPORTED:
+            self.failures.append((index, x, y, tables, reason))
+
+    def __str__(self) -> str:
+        lines = [f"{self.checked} rooms checked, {self.invalid} invalid, {self.tables} tables placed"]
+        for index, x, y, tables, reason in self.failures:
+            lines.append(f"  room {index} ({x} x {y}, {tables} tables) {REASONS[reason]}")
+        if self.invalid > len(self.failures):
+            lines.append(f"  ... and {self.invalid - len(self.failures)} more")
+        return "\n".join(lines)
+
+
+def check_grid(
+        rows: Iterable[str],
+        width: int,
+        height: int,
+        tables: int,
+        length: int = TABLE_LENGTH,
+        diagonal: bool = True
+) -> Tuple[int, int]:
+    """
+    Checks a room of X and . cells, one row at a time. Every vertical run
+    is tracked per column as a bit of runs[k] while it has k + 1 cells, and
+    of all_single and all_full while its cells have no horizontal neighbour
+    or are in a horizontal run of length cells.
+    :param rows: The rows of the room, consumed completely.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: The number of requested tables.
+    :param length: The length of the tables.
+    :param diagonal: Whether tables touching only at a corner are rejected.
+    :return: The reason code, VALID if the room is valid, and the number of
+    tables placed.
+    """
+    full: int = (1 << width) - 1
+    reason: int = VALID
+    row_count: int = 0
+    horizontal_cells: int = 0
+    vertical_tables: int = 0
+    prev: int = 0
+    runs: List[int] = [0] * length
+    all_single: int = 0
+    all_full: int = 0
+
+    def finish(ended: int) -> int:
+        """
+        Closes the vertical runs of some columns.
+        :param ended: The columns whose run ended in the row above.
+        :return: The reason code of the runs.
+        """
+        nonlocal horizontal_cells, vertical_tables
+        horizontal = ended & runs[0] & all_full
+        vertical = ended & runs[length - 1] & all_single & ~horizontal
+        horizontal_cells += bin(horizontal).count("1")
+        vertical_tables += bin(vertical).count("1")
+        return BAD_SHAPE if ended & ~(horizontal | vertical) else VALID
+
+    for row in rows:
+        row_count += 1
+        if reason != VALID:
+            continue
+        if len(row) != width or row_count > height:
+            reason = BAD_SIZE
+            continue
+        if row.count(TAKEN) + row.count(FREE) != width:
+            reason = BAD_CELL
+            continue
+
+        bits = parse_row(row)
+        starts = bits & ~(bits << 1)
+        single = starts & ~(bits >> 1)
+        # Starts of horizontal runs of exactly length cells, and their cells
+        span_starts = starts & ~(bits >> length)
+        for shift in range(1, length):
+            span_starts &= bits >> shift
+        span = span_starts
+        for shift in range(1, length):
+            span |= span_starts << shift
+
+        if bits & ~(single | span):
+            reason = BAD_SHAPE
+        elif diagonal and bits & ((prev << 1) | (prev >> 1)) & full:
+            reason = TOUCHING
+        else:
+            reason = finish(prev & ~bits)
+
+        new, continued = bits & ~prev, bits & prev
+        runs = [new] + [run & continued for run in runs[:-1]]
+        all_single = single & (new | (continued & all_single))
+        all_full = span & (new | (continued & all_full))
+        prev = bits
+
+    if reason == VALID:
+        reason = finish(prev)
+    if reason == VALID and row_count != height:
+        reason = BAD_SIZE
+
+    placed: int = horizontal_cells // length + vertical_tables
+    if reason == VALID and placed < tables:
+        reason = TOO_FEW
+    return reason, placed
+
+
+def check_ids(
+        rows: Iterable[str],
+        width: int,
+        height: int,
+        tables: int,
+        length: int = TABLE_LENGTH
+) -> Tuple[int, int]:
+    """
+    Checks a room of table ids, 0 for a free cell. The cells of every id are
+    counted along with their bounding box, a table is valid iff it has
+    length cells within a box of 1 x length or length x 1.
+    :param rows: The rows of the room, consumed completely.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: The number of requested tables.
+    :param length: The length of the tables.
+    :return: The reason code, VALID if the room is valid, and the number of
+    tables placed.
+    """
+    reason: int = VALID
+    row_count: int = 0
+    # Cells, top, bottom, left and right of every id
+    boxes: Dict[int, List[int]] = {}
+    for i, row in enumerate(rows):
+        row_count += 1
+        if reason != VALID:
+            continue
+
+        try:
+            ids = streaming.parse_line(row)
+        except ValueError:
+            reason = BAD_CELL
+            continue
+        if len(ids) != width or row_count > height:
+            reason = BAD_SIZE
+            continue
+
+        for j, table_id in enumerate(ids):
+            if table_id <= 0:
+                reason = reason if table_id == 0 else BAD_CELL
+                continue
+
+            box = boxes.get(table_id)
+            if box is None:
+                boxes[table_id] = [1, i, i, j, j]
+            else:
+                box[0] += 1
+                box[2] = i
+                box[3] = min(box[3], j)
+                box[4] = max(box[4], j)
+
+    if reason == VALID and row_count != height:
+        reason = BAD_SIZE
+    if reason == VALID:
+        for cells, top, bottom, left, right in boxes.values():
+            rows_spanned, columns_spanned = bottom - top + 1, right - left + 1
+            if cells != length or min(rows_spanned, columns_spanned) != 1 or rows_spanned * columns_spanned != length:
+                reason = BAD_SHAPE
+                break
+
+    if reason == VALID and len(boxes) < tables:
+        reason = TOO_FEW
+    return reason, len(boxes)
+
+
+def level_of(path: PathLike) -> int:
+    """
+    Guesses the level of a file from its name, e.g. level4_1.out.
+    :param path: The path of the file.
+    :return: The level.
+    """
+    match = re.search(r"level(\d+)", str(path))
+    if match is None or int(match.group(1)) not in LEVELS:
+        raise ValueError(f"Can not tell the level of {path}, one of {sorted(LEVELS)} is needed")
+    return int(match.group(1))
+
+
+def validate(in_path: PathLike, out_path: PathLike, level: Optional[int] = None) -> Report:
+    """
+    Validates every room of an output file.
+    :param in_path: The input file with the rooms.
+    :param out_path: The output file with the layouts.
+    :param level: The level of the files, by default guessed from out_path.
+    :return: The report of the invalid rooms.
+    """
+    length, ids, no_touching = LEVELS[level if level is not None else level_of(out_path)]
+    report = Report()
+    with open(in_path, "r") as f_in, open(out_path, "r") as f_out:
+        room_count = streaming.read_header(f_in, 1)[0][0]
+        lines = (line.rstrip("\r\n") for line in f_out)
+
+        for x, y, tables in streaming.iter_records(f_in):
+            rows = streaming.room_rows(lines, y)
+            if rows is None:
+                report.add(report.checked, x, y, tables, MISSING)
+            else:
+                if ids:
+                    reason, placed = check_ids(rows, x, y, tables, length)
+                else:
+                    reason, placed = check_grid(rows, x, y, tables, length, no_touching)
+                report.tables += placed
+                if reason != VALID:
+                    report.add(report.checked, x, y, tables, reason)
+            report.checked += 1
+
+        if any(line.strip() for line in lines):
+            report.add(report.checked, -1, -1, -1, EXTRA)
+
+    if report.checked != room_count:
+        print(f"-- The input declares {room_count} rooms, but has {report.checked}", file=sys.stderr)
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the validator
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("in_file")
+    arg_parser.add_argument("out_file")
+    arg_parser.add_argument("--level", type=int, choices=sorted(LEVELS), default=None)
+    args = arg_parser.parse_args(argv)
+
+    report = validate(args.in_file, args.out_file, args.level)
+    print(report)
+    if not report.ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
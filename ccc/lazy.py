@@ -0,0 +1,68 @@
+# coding=utf-8
+"""
+Deferred imports of the optional dependencies.
+
+Importing numpy takes longer than solving most of the contest files, so the
+engines do not import it up front. optional finds out whether a module is
+installed without importing it and returns a LazyModule, which imports the
+module on the first access of one of its attributes. The engines keep their
+``np is not None`` checks for the availability of numpy, and the files that
+never touch np, e.g. the ones parsed without numpy, see
+parser.NUMPY_MIN_BYTES, never import it.
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """
+    Class representing a module, which is imported on the first access of
+    one of its attributes.
+    """
+    _name: str
+    _module: Optional[ModuleType]
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        # Only called for the attributes of the module, the own ones exist
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self) -> str:
+        state = "imported" if self._module is not None else "not imported yet"
+        return f"<lazy module {self._name!r}, {state}>"
+
+
+def optional(name: str) -> Optional[LazyModule]:
+    """
+    Looks up an optional dependency without importing it.
+    :param name: The name of the module.
+    :return: The module, imported on first use, or None if it is not
+    installed.
+    """
+    if name in sys.modules:
+        return LazyModule(name)
+    try:
+        return LazyModule(name) if importlib.util.find_spec(name) is not None else None
+    except (ImportError, ValueError):
+        return None
+
+
+def is_ndarray(value: Any) -> bool:
+    """
+    Returns whether a value is a numpy array, without importing numpy. A
+    value can only be an array once numpy has been imported.
+    :param value: The value to check.
+    :return: True if the value is a numpy array.
+    """
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(value, np.ndarray)
@@ -0,0 +1,604 @@
+# coding=utf-8
+"""
+Table packing engine for the afternoon levels 4 and 5.
+
+Tables of 1 x length or length x 1 cells have to be placed into a room
+without touching each other, not even at a corner. The engine runs a list
+of strategies, cheapest first, until one of them places enough tables, and
+returns the best layout found within the time budget of the room:
+
+- greedy, the two pass heuristic of the task scripts: rows of horizontal
+  tables, followed by vertical tables wherever they still fit,
+- periodic, stripes of tables repeating every length + 1 cells, along the
+  axis whose remainder leaves the more useful strip at the border for tables
+  of the other orientation,
+- tiles, the best stitching of periodic tiles from the TileLibrary,
+- profile, the exact row profile DP of ccc.profile_dp for rooms with a side
+  of at most DP_MAX_WIDTH cells,
+- search, a branch and bound over the cells of small rooms.
+
+Extending every table by one cell to the right and to the bottom gives
+disjoint (length + 1) x 2 blocks within the room grown by one row and one
+column, which bounds the number of tables of any layout, see upper_bound.
+Conversely every packing of such blocks into the grown room is a valid
+layout, which is what the tile library builds on.
+
+Rooms too large to hold in memory can be laid out with stream_greedy, which
+yields the greedy layout row by row within a window of a few rows.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ccc import instrument, profile_dp
+from ccc.grid import TABLE_LENGTH, ConflictMask, RoomGrid
+
+# Seconds a room may take, the search is stopped once they are used up
+DEFAULT_TIME_BUDGET: float = 1.0
+
+# Largest room, in cells, the branch and bound is tried for
+SEARCH_MAX_CELLS: int = 256
+
+# Nodes of the branch and bound between two looks at the clock
+_CLOCK_NODES: int = 1 << 10
+
+# Sides of the grown room up to which the tile library searches every cut,
+# longer sides are cut at multiples of strips of STRIP_BLOCKS blocks
+TILE_MAX_SIDE: int = 96
+STRIP_BLOCKS: int = 4
+
+# Distinct rows stream_greedy memoises the horizontal tables of
+_STREAM_MEMO_ROWS: int = 64
+
+DEFAULT_STRATEGIES: Tuple[str, ...] = ("greedy", "periodic", "tiles", "profile", "search")
+
+# width, height, tables, length and deadline, None if it does not apply
+Strategy = Callable[[int, int, int, int, float], Optional[RoomGrid]]
+
+
+class PackResult:
+    """
+    Class representing the best layout found for a room.
+    """
+    grid: RoomGrid
+    tables: int
+    strategy: str
+
+    def __init__(self, grid: RoomGrid, tables: int, strategy: str):
+        self.grid = grid
+        self.tables = tables
+        self.strategy = strategy
+
+
+def upper_bound(width: int, height: int, length: int = TABLE_LENGTH) -> int:
+    """
+    Returns the most tables any layout can place into a room.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param length: The length of the tables.
+    :return: The maximum number of tables.
+    """
+    return (width + 1) * (height + 1) // (2 * (length + 1))
+
+
+def pack_greedy(
+        width: int, height: int, tables: int, length: int = TABLE_LENGTH, deadline: float = 0.0
+) -> RoomGrid:
+    """
+    Places rows of horizontal tables and fills the rest with vertical ones,
+    if the rows are not enough.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: The number of tables that should be placed.
+    :param length: The length of the tables.
+    :param deadline: Unused, the heuristic is linear in the room size.
+    :return: The layout.
+    """
+    cells = RoomGrid(width, height)
+    conflicts = ConflictMask(cells)
+    table_count: int = 0
+    for i in range(height):
+        occupied_width: int = 0
+
+        while occupied_width + length <= width:
+            if cells.get(i, occupied_width - 1):
+                occupied_width += 1
+
+            if not conflicts.can_place(i, occupied_width, horizontal=True, length=length):
+                occupied_width += length
+                continue
+
+            conflicts.place(i, occupied_width, horizontal=True, length=length)
+            table_count += 1
+            occupied_width += length
+
+    if table_count < tables:
+        for i in range(height - length + 1):
+            table_count += conflicts.fill_row(i, horizontal=False, length=length)
+
+    return cells
+
+
+def _horizontal_row(forbidden: int, width: int, length: int) -> int:
+    """
+    Places the horizontal tables of a single row like pack_greedy.
+    :param forbidden: The forbidden cells of the row.
+    :param width: The width of the room.
+    :param length: The length of the tables.
+    :return: The occupied cells of the row.
+    """
+    table: int = (1 << length) - 1
+    cells: int = 0
+    j: int = 0
+    while j + length <= width:
+        if j > 0 and cells >> (j - 1) & 1:
+            j += 1
+
+        if j + length > width or forbidden >> j & table:
+            j += length
+            continue
+
+        cells |= table << j
+        j += length
+    return cells
+
+
+def stream_greedy(
+        width: int, height: int, tables: int, length: int = TABLE_LENGTH
+) -> Iterator[int]:
+    """
+    Produces the layout of pack_greedy one row at a time, without the grid
+    of the whole room. A first pass counts the horizontal tables, which only
+    depend on the row above, to decide whether vertical tables are needed.
+    The second pass places the tables within a window of length + 2 rows
+    and yields every row as soon as no table can reach it anymore, so the
+    memory grows with the width of the room only.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: The number of tables that should be placed.
+    :param length: The length of the tables.
+    :return: A generator over the occupied cells of every row as bits, the
+    lowest bit is the first column.
+    """
+    full: int = (1 << width) - 1
+
+    def dilate(bits: int) -> int:
+        return (bits | bits << 1 | bits >> 1) & full
+
+    # The rows repeat, so the horizontal tables are memoised per forbidden row
+    horizontal: Dict[int, int] = {}
+
+    def horizontal_row(forbidden_row: int) -> int:
+        placed = horizontal.get(forbidden_row)
+        if placed is None:
+            if len(horizontal) >= _STREAM_MEMO_ROWS:
+                horizontal.clear()
+            placed = horizontal[forbidden_row] = _horizontal_row(forbidden_row, width, length)
+        return placed
+
+    horizontal_count: int = 0
+    above: int = 0
+    for _ in range(height):
+        above = horizontal_row(dilate(above))
+        horizontal_count += bin(above).count("1") // length
+    vertical: bool = horizontal_count < tables
+
+    # The rows from the first one that is not final yet, cells and forbidden
+    cells: Deque[int] = deque()
+    forbidden: Deque[int] = deque()
+    for row in range(height + length):
+        if row < height:
+            # Only the horizontal tables of the row above reach the row yet
+            placed = horizontal_row(dilate(cells[-1]) if cells else 0)
+            wide = dilate(placed)
+            if forbidden:
+                forbidden[-1] |= wide
+            cells.append(placed)
+            forbidden.append((dilate(cells[-2]) if len(cells) > 1 else 0) | wide)
+
+        # Vertical tables starting at i only need the horizontal tables of
+        # the rows up to i + length
+        i = row - length
+        if i < 0:
+            continue
+
+        if vertical and i + length <= height:
+            taken = 0
+            for k in range(length):
+                taken |= forbidden[k]
+            starts = ~taken & full
+            while starts:
+                j = (starts & -starts).bit_length() - 1
+                wide = dilate(1 << j)
+                for k in range(length):
+                    cells[k] |= 1 << j
+                    forbidden[k] |= wide
+                if length < len(forbidden):
+                    forbidden[length] |= wide
+                starts &= ~((1 << (j + 2)) - 1)
+
+        yield cells.popleft()
+        forbidden.popleft()
+
+
+def _stripes(width: int, height: int, length: int) -> Tuple[int, List[Tuple[int, int, bool]]]:
+    """
+    Lays out every other row with tables one cell apart, and the columns
+    left over at the right border with vertical tables.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param length: The length of the tables.
+    :return: The number of tables and every table as (i, j, horizontal).
+    """
+    period: int = length + 1
+    placed: List[Tuple[int, int, bool]] = [
+        (i, j, True) for i in range(0, height, 2) for j in range(0, width - length + 1, period)
+    ]
+
+    # A remainder of length fits another table into the rows, 0 is a gap
+    rest: int = width % period
+    if 0 < rest < length:
+        for j in range(width - rest, width, 2):
+            placed.extend((i, j, False) for i in range(0, height - length + 1, period))
+    return len(placed), placed
+
+
+def pack_periodic(
+        width: int, height: int, tables: int, length: int = TABLE_LENGTH, deadline: float = 0.0
+) -> RoomGrid:
+    """
+    Tiles the room with stripes, horizontal or vertical, whichever places
+    more tables for the remainders of the dimensions.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: Unused, the tiling does not depend on it.
+    :param length: The length of the tables.
+    :param deadline: Unused, the tiling is linear in the room size.
+    :return: The layout.
+    """
+    rows_count, rows = _stripes(width, height, length)
+    columns_count, columns = _stripes(height, width, length)
+
+    cells = RoomGrid(width, height)
+    if rows_count >= columns_count:
+        for i, j, horizontal in rows:
+            cells.place(i, j, horizontal, length)
+    else:
+        # Transposed, the rows of the stripes are the columns of the room
+        for j, i, horizontal in columns:
+            cells.place(i, j, not horizontal, length)
+    return cells
+
+
+class TileLibrary:
+    """
+    Class representing the best stitching of periodic tiles into every
+    rectangle of the grown room, for tables of a single length.
+
+    A tile is a rectangle filled with blocks of a single orientation, two
+    rows of tables one cell apart or two columns of them. A larger rectangle
+    is either a tile or cut in two, the best choice is memoised per size, so
+    every room reuses the tiles and cuts of the rectangles it shares with the
+    rooms before it.
+    """
+    length: int
+    _plans: Dict[Tuple[int, int], Tuple[int, int, int]]
+
+    # Kinds of a plan, a tile of either orientation or a cut along an axis
+    HORIZONTAL: int = 0
+    VERTICAL: int = 1
+    CUT_ROWS: int = 2
+    CUT_COLUMNS: int = 3
+
+    def __init__(self, length: int = TABLE_LENGTH):
+        self.length = length
+        self._plans = {}
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def count(self, width: int, height: int) -> int:
+        """
+        Returns the number of tables of the stitched layout of a room.
+        :param width: The width of the room.
+        :param height: The height of the room.
+        :return: The number of tables.
+        """
+        return self._plan(height + 1, width + 1)[0]
+
+    def _plan(self, rows: int, columns: int) -> Tuple[int, int, int]:
+        """
+        Finds the best plan for a rectangle of the grown room.
+        :param rows: The rows of the rectangle.
+        :param columns: The columns of the rectangle.
+        :return: The number of blocks, the kind of the plan and the size of
+        the first part if it is a cut.
+        """
+        plan = self._plans.get((rows, columns))
+        if plan is not None:
+            return plan
+
+        period: int = self.length + 1
+        horizontal = (rows // 2) * (columns // period)
+        vertical = (rows // period) * (columns // 2)
+        plan = (horizontal, self.HORIZONTAL, 0) if horizontal >= vertical else (vertical, self.VERTICAL, 0)
+
+        perfect: int = rows * columns // (2 * period)
+        if plan[0] < perfect:
+            # Halved at a multiple of the strip, keeps the recursion shallow
+            strip: int = 2 * period * STRIP_BLOCKS
+            if rows > TILE_MAX_SIDE:
+                cuts = [(self.CUT_ROWS, strip * max(rows // strip // 2, 1))]
+            elif columns > TILE_MAX_SIDE:
+                cuts = [(self.CUT_COLUMNS, strip * max(columns // strip // 2, 1))]
+            else:
+                # Every cut and its mirror give the same count
+                cuts = [(self.CUT_ROWS, cut) for cut in range(2, rows // 2 + 1)]
+                cuts += [(self.CUT_COLUMNS, cut) for cut in range(2, columns // 2 + 1)]
+
+            for kind, cut in cuts:
+                if kind == self.CUT_ROWS:
+                    count = self._plan(cut, columns)[0] + self._plan(rows - cut, columns)[0]
+                else:
+                    count = self._plan(rows, cut)[0] + self._plan(rows, columns - cut)[0]
+                if count > plan[0]:
+                    plan = (count, kind, cut)
+                    if count == perfect:
+                        break
+
+        self._plans[(rows, columns)] = plan
+        return plan
+
+    def build(self, width: int, height: int) -> RoomGrid:
+        """
+        Lays out a room by stitching the tiles of its plan.
+        :param width: The width of the room.
+        :param height: The height of the room.
+        :return: The layout.
+        """
+        cells = RoomGrid(width, height)
+        period: int = self.length + 1
+        table_bits: int = (1 << self.length) - 1
+
+        # The parts of the grown room still to lay out, as top, left, rows
+        # and columns, kept on a stack instead of recursing into the cuts
+        parts: List[Tuple[int, int, int, int]] = [(0, 0, height + 1, width + 1)]
+        while parts:
+            top, left, rows, columns = parts.pop()
+            _, kind, cut = self._plan(rows, columns)
+            if kind == self.CUT_ROWS:
+                parts += [(top, left, cut, columns), (top + cut, left, rows - cut, columns)]
+            elif kind == self.CUT_COLUMNS:
+                parts += [(top, left, rows, cut), (top, left + cut, rows, columns - cut)]
+            elif kind == self.HORIZONTAL:
+                pattern = sum(table_bits << (left + period * c) for c in range(columns // period))
+                for r in range(rows // 2):
+                    cells.merge_row(top + 2 * r, pattern)
+            else:
+                pattern = sum(1 << (left + 2 * c) for c in range(columns // 2))
+                for r in range(rows // period):
+                    for k in range(self.length):
+                        cells.merge_row(top + period * r + k, pattern)
+        return cells
+
+
+# The libraries of every table length, shared by all rooms of the process
+_libraries: Dict[int, TileLibrary] = {}
+
+
+def tile_library(length: int = TABLE_LENGTH) -> TileLibrary:
+    """
+    Returns the shared tile library of a table length.
+    :param length: The length of the tables.
+    :return: The library, created on the first use.
+    """
+    library = _libraries.get(length)
+    if library is None:
+        library = _libraries[length] = TileLibrary(length)
+    return library
+
+
+def pack_tiles(
+        width: int, height: int, tables: int, length: int = TABLE_LENGTH, deadline: float = 0.0
+) -> RoomGrid:
+    """
+    Stitches the room from the periodic tiles of the shared tile library.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: Unused, the library always places the most it can.
+    :param length: The length of the tables.
+    :param deadline: Unused, the plans are memoised per rectangle size.
+    :return: The layout.
+    """
+    return tile_library(length).build(width, height)
+
+
+def pack_profile(
+        width: int, height: int, tables: int, length: int = TABLE_LENGTH, deadline: float = 0.0
+) -> Optional[RoomGrid]:
+    """
+    Packs the most tables into a narrow room with the row profile DP, along
+    the longer side of the room. The tile library provides the lower bound
+    the DP prunes its profiles with.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: Unused, the DP always places the most it can.
+    :param length: The length of the tables.
+    :param deadline: The perf_counter time to give up at.
+    :return: The layout, None if both sides are too long or the deadline
+    passed.
+    """
+    transpose: bool = width > profile_dp.DP_MAX_WIDTH or height < width
+    if min(width, height) > profile_dp.DP_MAX_WIDTH or width == 0 or height == 0:
+        return None
+
+    at_least: int = tile_library(length).count(width, height)
+    if transpose:
+        columns = profile_dp.solve(height, width, length, at_least, deadline)
+    else:
+        columns = profile_dp.solve(width, height, length, at_least, deadline)
+    if columns is None:
+        return None
+
+    cells = RoomGrid(width, height)
+    if not transpose:
+        for i, bits in enumerate(columns):
+            cells.merge_row(i, bits)
+        return cells
+
+    # The DP ran over the columns, every row gets a bit of each of them
+    for i in range(height):
+        cells.merge_row(i, sum((bits >> i & 1) << j for j, bits in enumerate(columns)))
+    return cells
+
+
+class _Timeout(Exception):
+    """
+    Raised inside the branch and bound once the deadline has passed.
+    """
+
+
+def pack_search(
+        width: int, height: int, tables: int, length: int = TABLE_LENGTH, deadline: float = 0.0
+) -> Optional[RoomGrid]:
+    """
+    Searches the layouts of a small room with branch and bound, cell by cell
+    in row major order. Every free cell either stays empty or is the first
+    cell of a horizontal or vertical table. The tables which can still start
+    after a cell are bounded like in upper_bound, counting the blocks left
+    in the grown room.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: The search stops once that many tables are placed.
+    :param length: The length of the tables.
+    :param deadline: The perf_counter time to stop at, the best layout found
+    until then is returned.
+    :return: The layout, None if the room is too large to search.
+    """
+    if width * height > SEARCH_MAX_CELLS or width == 0 or height == 0:
+        return None
+
+    block: int = 2 * (length + 1)
+    goal: int = min(tables, upper_bound(width, height, length))
+    full: int = (1 << width) - 1
+    table_bits: int = (1 << length) - 1
+    forbidden: List[int] = [0] * height
+    stack: List[Tuple[int, int, bool]] = []
+    best: List[Tuple[int, int, bool]] = []
+    nodes: List[int] = [0]
+
+    def forbid(i: int, j: int, rows: int, columns: int) -> List[int]:
+        saved = forbidden[max(i - 1, 0):i + rows + 1]
+        bits = (((1 << (columns + 2)) - 1) << j >> 1) & full
+        for row in range(max(i - 1, 0), min(i + rows + 1, height)):
+            forbidden[row] |= bits
+        return saved
+
+    def restore(i: int, saved: List[int]) -> None:
+        forbidden[max(i - 1, 0):max(i - 1, 0) + len(saved)] = saved
+
+    def visit(position: int) -> bool:
+        nonlocal best
+        nodes[0] += 1
+        if nodes[0] % _CLOCK_NODES == 0 and time.perf_counter() > deadline:
+            raise _Timeout()
+
+        # Skip to the next cell a table can start at
+        while position < width * height:
+            i, j = divmod(position, width)
+            if not forbidden[i] >> j & 1:
+                break
+            position += 1
+        else:
+            if len(stack) > len(best):
+                best = list(stack)
+            return len(best) >= goal
+
+        if len(stack) + ((height + 1 - i) * (width + 1) - j) // block <= len(best):
+            return False
+
+        if j + length <= width and not forbidden[i] >> j & table_bits:
+            saved = forbid(i, j, 1, length)
+            stack.append((i, j, True))
+            done = visit(position + 1)
+            stack.pop()
+            restore(i, saved)
+            if done:
+                return True
+
+        if length > 1 and i + length <= height and not any(forbidden[row] >> j & 1 for row in range(i, i + length)):
+            saved = forbid(i, j, length, 1)
+            stack.append((i, j, False))
+            done = visit(position + 1)
+            stack.pop()
+            restore(i, saved)
+            if done:
+                return True
+
+        return visit(position + 1)
+
+    try:
+        visit(0)
+    except _Timeout:
+        pass
+
+    cells = RoomGrid(width, height)
+    for i, j, horizontal in best:
+        cells.place(i, j, horizontal, length)
+    return cells
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "greedy": pack_greedy,
+    "periodic": pack_periodic,
+    "tiles": pack_tiles,
+    "profile": pack_profile,
+    "search": pack_search,
+}
+
+
+def pack(
+        width: int,
+        height: int,
+        tables: int,
+        length: int = TABLE_LENGTH,
+        strategies: Sequence[str] = DEFAULT_STRATEGIES,
+        time_budget: float = DEFAULT_TIME_BUDGET
+) -> PackResult:
+    """
+    Runs the strategies in order, until one of them places enough tables or
+    the time budget is used up.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param tables: The number of tables that should be placed.
+    :param length: The length of the tables.
+    :param strategies: The names of the strategies in STRATEGIES.
+    :param time_budget: The seconds the room may take.
+    :return: The layout with the most tables found.
+    """
+    deadline: float = time.perf_counter() + time_budget
+    bound: int = upper_bound(width, height, length)
+
+    best: Optional[PackResult] = None
+    for name in strategies:
+        if best is not None and (best.tables >= min(tables, bound) or time.perf_counter() > deadline):
+            break
+
+        # Per strategy call, the rooms themselves are counted by the managers
+        instrument.count("strategy_runs", strategy=name)
+        grid = STRATEGIES[name](width, height, tables, length, deadline)
+        if grid is None:
+            instrument.count("strategy_shortfalls", strategy=name)
+            continue
+
+        count = grid.count() // length
+        if count < min(tables, bound):
+            instrument.count("strategy_shortfalls", strategy=name)
+        if best is None or count > best.tables:
+            best = PackResult(grid, count, name)
+
+    if best is None:
+        best = PackResult(RoomGrid(width, height), 0, "empty")
+    return best
@@ -0,0 +1,323 @@
+# coding=utf-8
+"""
+Memory-mapped parser for the whitespace separated integer input format.
+
+The file is mapped instead of read into a string, and the digits are turned
+straight into one flat int64 buffer. With numpy this happens vectorised on
+newline aligned chunks of the mapping, otherwise the lines are parsed into a
+typed ``array('q')``. Next to the values a row offset index is kept, so the
+managers can slice every record out of the buffer without copying it.
+
+Empty lines are dropped by default. With keep_empty every line is a row, so
+the rows stay aligned with the line numbers, which the validators need to
+check the output files.
+
+Files smaller than NUMPY_MIN_BYTES are parsed into a typed array by default,
+numpy is imported on first use, see ccc.lazy, and the small files would take
+longer to import it than to parse them.
+"""
+from __future__ import annotations
+
+import mmap
+from array import array
+from os import PathLike
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from ccc import lazy
+
+# Imported on first use, the array('q') path works without numpy
+np = lazy.optional("numpy")
+
+# Bytes parsed at once by the numpy path, bounds the temporary arrays
+DEFAULT_CHUNK_BYTES: int = 1 << 26
+
+# Smallest file parsed with numpy by default
+NUMPY_MIN_BYTES: int = 1 << 16
+
+_MINUS: int = ord("-")
+_NEWLINE: int = ord("\n")
+_ZERO: int = ord("0")
+
+Row = Union[memoryview, "np.ndarray"]
+
+# Place values of the digits, int64 holds up to 19 of them, created on the
+# first numpy parse
+_pow10: Optional["np.ndarray"] = None
+
+
+class IntTable:
+    """
+    Class representing a parsed input file, one row per non-empty line, or
+    per line if parsed with keep_empty.
+    """
+    values: Union[array, "np.ndarray"]
+    offsets: Union[array, "np.ndarray"]
+    _view: Union[memoryview, "np.ndarray"]
+
+    def __init__(self, values: Union[array, "np.ndarray"], offsets: Union[array, "np.ndarray"]):
+        self.values = values
+        self.offsets = offsets
+        self._view = memoryview(values) if isinstance(values, array) else values
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def row(self, index: int) -> Row:
+        """
+        Returns a single row without copying it.
+        :param index: The index of the row.
+        :return: A memoryview or numpy view on the values of the row.
+        """
+        return self._view[self.offsets[index]:self.offsets[index + 1]]
+
+    def rows(self, start: int = 0) -> List[Row]:
+        """
+        Returns the rows starting at the passed index without copying them.
+        :param start: The index of the first row, used to skip the header.
+        :return: A view for every row.
+        """
+        return [self.row(i) for i in range(start, len(self))]
+
+    def lengths(self, start: int = 0) -> Sequence[int]:
+        """
+        Returns the number of values per row.
+        :param start: The index of the first row.
+        :return: The length of every row.
+        """
+        if lazy.is_ndarray(self.offsets):
+            return np.diff(self.offsets[start:])
+        return [self.offsets[i + 1] - self.offsets[i] for i in range(start, len(self))]
+
+    def columns(self, start: int = 0, width: int = 1) -> List[Sequence[int]]:
+        """
+        Returns the columns of rows which all have the same number of values,
+        without creating an object per row.
+        :param start: The index of the first row, used to skip the header.
+        :param width: The number of values of every row.
+        :return: A numpy view or typed array for every column.
+        """
+        rows: int = max(len(self) - start, 0)
+        lengths = self.lengths(start)
+        if lazy.is_ndarray(lengths):
+            uneven = bool(np.any(lengths != width))
+        else:
+            uneven = any(length != width for length in lengths)
+        if uneven:
+            raise ValueError(f"Every row has to have {width} values")
+
+        first: int = int(self.offsets[start]) if rows else 0
+        values = self.values[first:first + rows * width]
+        if lazy.is_ndarray(values):
+            block = values.reshape(rows, width)
+            return [block[:, column] for column in range(width)]
+        return [values[column::width] for column in range(width)]
+
+    def padded(self, start: int = 0) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Loads the rows into a zero padded 2-D array, see integrator.pad_flights.
+        :param start: The index of the first row.
+        :return: The padded (rows x max length) array and the length per row.
+        """
+        values = np.asarray(self.values, dtype=np.int64)
+        offsets = np.asarray(self.offsets, dtype=np.int64)[start:]
+        lengths = np.diff(offsets)
+        width: int = int(lengths.max()) if len(lengths) else 0
+
+        padded = np.zeros((len(lengths), width), dtype=np.int64)
+        padded[np.arange(width, dtype=np.int64) < lengths[:, None]] = values[offsets[0]:offsets[-1]]
+        return padded, lengths
+
+
+def has_numpy() -> bool:
+    """
+    Returns whether the tables of large files are parsed into numpy arrays
+    by default.
+    :return: True if numpy is installed.
+    """
+    return np is not None
+
+
+def _parse_chunk(buf: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Parses a newline aligned chunk of the mapped file.
+    :param buf: The bytes of the chunk.
+    :return: The values and the number of values before every line break.
+    """
+    global _pow10
+    if _pow10 is None:
+        _pow10 = 10 ** np.arange(19, dtype=np.int64)
+
+    digit = (buf >= _ZERO) & (buf <= _ZERO + 9)
+    token = digit | (buf == _MINUS)
+
+    # Token boundaries, ends are exclusive
+    edges = np.diff(np.concatenate(([0], token.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    negative = buf[starts] == _MINUS
+    lengths = ends - starts - negative
+
+    # Every digit is weighted by its place value within its token
+    digit_pos = np.flatnonzero(digit)
+    exponent = np.repeat(ends, lengths) - digit_pos - 1
+    weighted = (buf[digit_pos].astype(np.int64) - _ZERO) * _pow10[exponent]
+
+    values = np.add.reduceat(weighted, np.concatenate(([0], np.cumsum(lengths)[:-1]))) \
+        if len(starts) else np.empty(0, dtype=np.int64)
+    values[negative] *= -1
+
+    line_ends = np.searchsorted(starts, np.flatnonzero(buf == _NEWLINE))
+    return values, line_ends
+
+
+def _chunk_bounds(mm: mmap.mmap, chunk_bytes: int) -> Iterator[Tuple[int, int]]:
+    """
+    Splits the mapped file into chunks which end at a line break.
+    :param mm: The mapped file.
+    :param chunk_bytes: The approximate number of bytes per chunk.
+    :return: A generator over the start and stop of every chunk.
+    """
+    start: int = 0
+    while start < len(mm):
+        stop = min(start + chunk_bytes, len(mm))
+        if stop < len(mm):
+            # Extend the chunk to the end of the current line
+            newline = mm.find(b"\n", stop)
+            stop = len(mm) if newline == -1 else newline + 1
+        yield start, stop
+        start = stop
+
+
+def _line_offsets(
+        line_ends: List["np.ndarray"], parsed: int, unterminated: bool, keep_empty: bool
+) -> "np.ndarray":
+    """
+    Builds the row offsets from the number of values before every line break.
+    :param line_ends: The line ends of every chunk, relative to the table.
+    :param parsed: The number of values of the table.
+    :param unterminated: Whether the last line has no line break.
+    :param keep_empty: Whether empty lines are kept as empty rows.
+    :return: The row offsets.
+    """
+    if keep_empty:
+        tail = [[parsed]] if unterminated else []
+        return np.concatenate([[0], *line_ends, *tail]).astype(np.int64)
+
+    # Drop the empty lines, offsets are sorted so the duplicates are adjacent
+    return np.unique(np.concatenate([[0], *line_ends, [parsed]]).astype(np.int64))
+
+
+def _parse_numpy(mm: mmap.mmap, chunk_bytes: int, keep_empty: bool = False) -> IntTable:
+    """
+    Parses the mapped file with numpy.
+    :param mm: The mapped file.
+    :param chunk_bytes: The approximate number of bytes parsed at once.
+    :param keep_empty: Whether empty lines are kept as empty rows.
+    :return: The parsed table.
+    """
+    data = np.frombuffer(mm, dtype=np.uint8)
+    values_parts: List["np.ndarray"] = []
+    ends_parts: List["np.ndarray"] = []
+    parsed: int = 0
+
+    for start, stop in _chunk_bounds(mm, chunk_bytes):
+        values, line_ends = _parse_chunk(data[start:stop])
+        values_parts.append(values)
+        ends_parts.append(line_ends + parsed)
+        parsed += len(values)
+    del data
+
+    values = np.concatenate(values_parts) if values_parts else np.empty(0, dtype=np.int64)
+    return IntTable(values, _line_offsets(ends_parts, parsed, mm[-1] != _NEWLINE, keep_empty))
+
+
+def _parse_array(
+        mm: mmap.mmap, start: int = 0, stop: Optional[int] = None, keep_empty: bool = False
+) -> IntTable:
+    """
+    Parses the mapped file line by line into a typed array.
+    :param mm: The mapped file.
+    :param start: The byte to start at.
+    :param stop: The byte to stop at, which has to be at a line start.
+    :param keep_empty: Whether empty lines are kept as empty rows.
+    :return: The parsed table.
+    """
+    values = array("q")
+    offsets = array("q", [0])
+    stop = len(mm) if stop is None else stop
+    mm.seek(start)
+    while mm.tell() < stop:
+        line = mm.readline()
+        values.extend(map(int, line.split()))
+        if keep_empty or len(values) != offsets[-1]:
+            offsets.append(len(values))
+    return IntTable(values, offsets)
+
+
+def parse_int_table(
+        file: PathLike,
+        use_numpy: Optional[bool] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        keep_empty: bool = False
+) -> IntTable:
+    """
+    Maps the passed file and parses every integer in it.
+    :param file: The file to parse.
+    :param use_numpy: Whether to use the numpy path, by default if available
+    and the file has at least NUMPY_MIN_BYTES.
+    :param chunk_bytes: The approximate number of bytes parsed at once by
+    the numpy path.
+    :param keep_empty: Whether empty lines are kept as empty rows.
+    :return: The parsed table.
+    """
+    with open(file, "rb") as f:
+        size = f.seek(0, 2)
+        if use_numpy is None:
+            use_numpy = np is not None and size >= NUMPY_MIN_BYTES
+
+        # Empty files can not be mapped
+        if size == 0:
+            if use_numpy:
+                return IntTable(np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64))
+            return IntTable(array("q"), array("q", [0]))
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if use_numpy:
+                return _parse_numpy(mm, chunk_bytes, keep_empty)
+            return _parse_array(mm, keep_empty=keep_empty)
+
+
+def iter_int_tables(
+        file: PathLike,
+        use_numpy: Optional[bool] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        keep_empty: bool = False
+) -> Iterator[IntTable]:
+    """
+    Maps the passed file and parses it chunk by chunk, so only a single chunk
+    is held in memory at a time. Lines are never split between chunks.
+    :param file: The file to parse.
+    :param use_numpy: Whether to use the numpy path, by default if available
+    and the file has at least NUMPY_MIN_BYTES.
+    :param chunk_bytes: The approximate number of bytes per chunk.
+    :param keep_empty: Whether empty lines are kept as empty rows.
+    :return: A generator over the parsed table of every chunk.
+    """
+    with open(file, "rb") as f:
+        size = f.seek(0, 2)
+        if use_numpy is None:
+            use_numpy = np is not None and size >= NUMPY_MIN_BYTES
+        if size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, stop in _chunk_bounds(mm, chunk_bytes):
+                if not use_numpy:
+                    yield _parse_array(mm, start, stop, keep_empty)
+                    continue
+
+                # Copied, so the mapping can be closed while a table is alive
+                values, line_ends = _parse_chunk(np.frombuffer(mm, dtype=np.uint8)[start:stop])
+                offsets = _line_offsets([line_ends], len(values), mm[stop - 1] != _NEWLINE, keep_empty)
+                yield IntTable(values, offsets)
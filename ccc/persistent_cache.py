@@ -0,0 +1,145 @@
+# coding=utf-8
+"""
+Base class of the LRU caches of the solvers, see trajectory_cache and
+layout_cache.
+
+The least recently used entry is evicted once the cache is full. A cache can
+be backed by a JSON file, which is loaded on creation and written back on
+save(), so the entries survive between runs. The subclasses only compute
+their entries and turn them into JSON objects and back, see _encode and
+_decode.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+from collections import OrderedDict
+from os import PathLike
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class PersistentCache(Generic[K, V]):
+    """
+    Class representing a LRU cache, which can be backed by a JSON file.
+    """
+    # The size of the caches created without one, set by the subclasses
+    default_max_size: int = 1024
+
+    max_size: int
+    hits: int
+    misses: int
+    _entries: "OrderedDict[K, V]"
+    _path: Optional[pathlib.Path]
+
+    def __init__(
+            self,
+            max_size: Optional[int] = None,
+            path: Optional[PathLike] = None
+    ):
+        max_size = self.default_max_size if max_size is None else max_size
+        if max_size <= 0:
+            raise ValueError("The cache size has to be positive")
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._path = pathlib.Path(path) if path is not None else None
+        if self._path is not None and self._path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> PersistentCache:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.save()
+
+    def _lookup(self, key: K) -> Optional[V]:
+        """
+        Looks up an entry and counts the hit or miss.
+        :param key: The key of the entry.
+        :return: The value, None on a miss.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: K, value: V) -> None:
+        """
+        Stores an entry and evicts the least recently used one if full.
+        :param key: The key of the entry.
+        :param value: The value of the entry.
+        :return:
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit and miss statistics.
+        :return: The hits, misses, hit rate and the number of entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _encode(self, key: K, value: V) -> Dict[str, Any]:
+        """
+        Turns an entry into a JSON object of the backing file.
+        :param key: The key of the entry.
+        :param value: The value of the entry.
+        :return: The JSON object.
+        """
+        raise NotImplementedError
+
+    def _decode(self, entry: Dict[str, Any]) -> Optional[Tuple[K, V]]:
+        """
+        Turns a JSON object of the backing file back into an entry.
+        :param entry: The JSON object.
+        :return: The key and value, None to skip an outdated entry.
+        """
+        raise NotImplementedError
+
+    def _load(self) -> None:
+        """
+        Loads the entries of the backing file, oldest first.
+        :return:
+        """
+        with open(self._path, "r") as f:
+            for entry in json.load(f):
+                decoded = self._decode(entry)
+                if decoded is not None:
+                    self._put(*decoded)
+
+    def save(self) -> None:
+        """
+        Writes the entries to the backing file, if there is one. The file is
+        replaced atomically, so an interrupted save keeps the old entries.
+        :return:
+        """
+        if self._path is None:
+            return
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f"{self._path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump([self._encode(key, value) for key, value in self._entries.items()], f)
+        os.replace(tmp_path, self._path)
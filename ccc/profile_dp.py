@@ -0,0 +1,192 @@
+# coding=utf-8
+"""
+Row profile dynamic programming for the exact packing of narrow rooms.
+
+A room at most DP_MAX_WIDTH cells wide is packed row by row. The profile
+between two rows holds a digit per column: 0 if the cell above is free, 1 if
+it belongs to a finished table and k + 1 if it belongs to a vertical table
+which still needs k cells. The profile is all the next row has to know, so
+the best number of tables per profile after every row gives the maximum for
+the whole room in time linear in its length.
+
+The rows which can follow a profile only depend on the width and the table
+length, so they are kept in a ProfileTable per width and length, which is
+shared by every room of the process. Profiles that can not reach a known
+lower bound anymore are dropped after every row, which keeps the number of
+live profiles small without losing the optimum.
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ccc.grid import TABLE_LENGTH
+
+# Widest room, or narrowest side of a room, the DP is used for
+DP_MAX_WIDTH: int = 12
+
+# The next profile, the tables started in the row and the occupied cells
+Transition = Tuple[int, int, int]
+
+
+class ProfileTable:
+    """
+    Class representing the transitions between the profiles of rooms of a
+    single width, for tables of a single length.
+    """
+    width: int
+    length: int
+    _digit_bits: int
+    _transitions: Dict[int, List[Transition]]
+
+    def __init__(self, width: int, length: int = TABLE_LENGTH):
+        self.width = width
+        self.length = length
+        self._digit_bits = max(length.bit_length(), 1)
+        self._transitions = {}
+
+    def __len__(self) -> int:
+        return len(self._transitions)
+
+    def digit(self, profile: int, column: int) -> int:
+        """
+        Returns the digit of a single column of a profile.
+        :param profile: The profile.
+        :param column: The column.
+        :return: The digit, see the module docstring.
+        """
+        return profile >> (self._digit_bits * column) & ((1 << self._digit_bits) - 1)
+
+    def is_final(self, profile: int) -> bool:
+        """
+        Returns whether no vertical table is left unfinished.
+        :param profile: The profile after the last row.
+        :return: True if the profile can end the room.
+        """
+        return all(self.digit(profile, column) <= 1 for column in range(self.width))
+
+    def transitions(self, profile: int) -> List[Transition]:
+        """
+        Returns every row which can follow a profile, computed on first use.
+        :param profile: The profile above the row.
+        :return: The transitions of the row.
+        """
+        transitions = self._transitions.get(profile)
+        if transitions is None:
+            transitions = self._transitions[profile] = self._expand(profile)
+        return transitions
+
+    def _expand(self, profile: int) -> List[Transition]:
+        """
+        Enumerates the rows which can follow a profile, column by column.
+        Every table is followed by a free column, so the tables of the row
+        can not touch each other.
+        :param profile: The profile above the row.
+        :return: The transitions of the row.
+        """
+        width, length, bits = self.width, self.length, self._digit_bits
+        digits = [self.digit(profile, column) for column in range(width)]
+        # Columns whose cell above and the cells next to it are free
+        clear = [
+            all(digits[c] == 0 for c in range(max(column - 1, 0), min(column + 2, width)))
+            for column in range(width)
+        ]
+
+        transitions: List[Transition] = []
+        stack: List[Tuple[int, int, int, int]] = [(0, 0, 0, 0)]
+        while stack:
+            column, following, gain, cells = stack.pop()
+            if column >= width:
+                transitions.append((following, gain, cells))
+                continue
+
+            digit = digits[column]
+            if digit >= 2:
+                # A vertical table has to be continued, 1 once it is finished
+                remaining = digit - 1
+                next_digit = remaining if remaining > 1 else 1
+                stack.append((column + 2, following | next_digit << (bits * column), gain, cells | 1 << column))
+                continue
+
+            stack.append((column + 1, following, gain, cells))
+            if length > 1 and clear[column]:
+                stack.append((column + 2, following | length << (bits * column), gain + 1, cells | 1 << column))
+            if column + length <= width and all(clear[column:column + length]):
+                table = sum(1 << (bits * c) for c in range(column, column + length))
+                stack.append((column + length + 1, following | table, gain + 1, cells | ((1 << length) - 1) << column))
+        return transitions
+
+
+# The tables of every width and length, shared by all rooms of the process
+_tables: Dict[Tuple[int, int], ProfileTable] = {}
+
+
+def profile_table(width: int, length: int = TABLE_LENGTH) -> ProfileTable:
+    """
+    Returns the shared transition table of a width and table length.
+    :param width: The width of the rooms.
+    :param length: The length of the tables.
+    :return: The table, created on the first use.
+    """
+    table = _tables.get((width, length))
+    if table is None:
+        table = _tables[(width, length)] = ProfileTable(width, length)
+    return table
+
+
+def solve(
+        width: int,
+        height: int,
+        length: int = TABLE_LENGTH,
+        at_least: int = 0,
+        deadline: Optional[float] = None
+) -> Optional[List[int]]:
+    """
+    Packs the most tables into a narrow room.
+    :param width: The width of the room, at most DP_MAX_WIDTH.
+    :param height: The height of the room.
+    :param length: The length of the tables.
+    :param at_least: A number of tables some layout is known to reach,
+    profiles which can not reach it anymore are dropped.
+    :param deadline: The perf_counter time to give up at, None for no limit.
+    :return: The occupied cells of every row of a maximal layout, None if
+    the deadline passed or no layout reaches at_least.
+    """
+    if width > DP_MAX_WIDTH:
+        raise ValueError(f"The profile DP is limited to {DP_MAX_WIDTH} columns")
+
+    table = profile_table(width, length)
+    block: int = 2 * (length + 1)
+    best: Dict[int, int] = {0: 0}
+    # The profile before and the cells of every row, per profile after it
+    steps: List[Dict[int, Tuple[int, int]]] = []
+    for i in range(height):
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+
+        # The tables starting in rows i and below fit into the grown rows
+        # i to height, see packing.upper_bound
+        remaining: int = (height - i + 1) * (width + 1) // block
+        following: Dict[int, int] = {}
+        step: Dict[int, Tuple[int, int]] = {}
+        for profile, count in best.items():
+            if count + remaining < at_least:
+                continue
+            for next_profile, gain, cells in table.transitions(profile):
+                if following.get(next_profile, -1) < count + gain:
+                    following[next_profile] = count + gain
+                    step[next_profile] = (profile, cells)
+        best = following
+        steps.append(step)
+
+    finals = [(count, profile) for profile, count in best.items() if table.is_final(profile) and count >= at_least]
+    if not finals:
+        return None
+
+    _, profile = max(finals)
+    rows: List[int] = []
+    for step in reversed(steps):
+        profile, cells = step[profile]
+        rows.append(cells)
+    rows.reverse()
+    return rows
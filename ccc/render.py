@@ -0,0 +1,356 @@
+# coding=utf-8
+"""
+Headless rendering of the room layouts of the afternoon levels 4 and 5.
+
+Turns a RoomGrid, e.g. one of RoomManager._room_table_positions or a room
+of an ``.out`` file, into a PNG or SVG image without a browser:
+
+- PNG, written with zlib only. At scale 1 every row of the grid becomes a
+  1 bit scanline with a single bytes.translate of its packed bytes, larger
+  scales map every packed byte to 8 * scale grey pixels.
+- SVG, a single path of the runs of occupied cells, row by row.
+
+Rooms with a side of more than max_side pixels are drawn as an overview
+instead, downsampled by the smallest factor that fits. Every pixel is the
+share of occupied cells in its block as a grey level, computed a band of
+rows at a time. The overview replaces tiles at full resolution, which would
+be thousands of images for a room of 10^5 x 10^5 cells. A single image shows
+the density of the whole room, and the placement of single tables is checked
+by layout_check instead. Batches of rooms are rendered in worker processes,
+see render_all.
+
+Usage: python -m ccc.render [--format png|svg] [--scale N] [--max-side N]
+[--workers N] in_file out_file out_dir
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import pathlib
+import struct
+import zlib
+from collections import deque
+from os import PathLike
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO
+
+from ccc import lazy, streaming
+from ccc.grid import RoomGrid, parse_row
+
+# Imported on first use, the overview works without numpy
+np = lazy.optional("numpy")
+
+# Longest side of an image in pixels, larger rooms are drawn as an overview
+DEFAULT_MAX_SIDE: int = 2048
+
+# Rooms handed to every worker ahead of time, bounds the grids in flight
+PENDING_PER_WORKER: int = 2
+
+FREE_GREY: int = 0xFF
+TAKEN_GREY: int = 0x00
+
+# Grey levels of the overview paths of an SVG
+SVG_LEVELS: int = 16
+
+_PNG_SIGNATURE: bytes = b"\x89PNG\r\n\x1a\n"
+
+# A packed byte as a 1 bit scanline byte, the first cell becomes the highest
+# bit and a table black
+_ONE_BIT: bytes = bytes(int(f"{byte ^ 0xFF:08b}"[::-1], 2) for byte in range(256))
+
+
+def overview_factor(width: int, height: int, max_side: int = DEFAULT_MAX_SIDE, scale: int = 1) -> int:
+    """
+    Returns the downsampling factor of a room.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param max_side: The longest side of the image in pixels.
+    :param scale: The pixels per cell of a room drawn in full.
+    :return: The cells per pixel along both axes, 1 if the room is drawn in
+    full.
+    """
+    if max(width, height) * scale <= max_side:
+        return 1
+    return -(-max(width, height) // max_side)
+
+
+def _grey_rows(cells: RoomGrid, factor: int) -> Iterator[bytes]:
+    """
+    Downsamples a room into grey pixels, a band of factor rows at a time.
+    :param cells: The room.
+    :param factor: The cells per pixel along both axes.
+    :return: A generator over the grey level of every pixel per pixel row.
+    """
+    width, height = cells.width, cells.height
+    for top in range(0, height, factor):
+        bottom = min(top + factor, height)
+        if np is not None:
+            band = np.frombuffer(b"".join(cells.row_bytes(i) for i in range(top, bottom)), dtype=np.uint8)
+            bits = np.unpackbits(band.reshape(bottom - top, -1), axis=1, bitorder="little")[:, :width]
+            counts = np.add.reduceat(bits.sum(axis=0, dtype=np.int64), np.arange(0, width, factor))
+            sizes = np.minimum(factor, width - np.arange(0, width, factor)) * (bottom - top)
+            yield (FREE_GREY - counts * (FREE_GREY - TAKEN_GREY) // sizes).astype(np.uint8).tobytes()
+            continue
+
+        rows = [cells.row_bits(i) for i in range(top, bottom)]
+        pixels = bytearray()
+        for left in range(0, width, factor):
+            columns = min(factor, width - left)
+            mask = (1 << columns) - 1
+            count = sum(bin(row >> left & mask).count("1") for row in rows)
+            pixels.append(FREE_GREY - count * (FREE_GREY - TAKEN_GREY) // (columns * (bottom - top)))
+        yield bytes(pixels)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    """
+    Frames the data of a PNG chunk.
+    :param kind: The four letter type of the chunk.
+    :param data: The data of the chunk.
+    :return: The chunk with its length and checksum.
+    """
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _write_png(f, width: int, height: int, bit_depth: int, scanlines: Iterable[bytes]) -> None:
+    """
+    Writes a greyscale PNG, compressing the scanlines while they come in.
+    :param f: The file opened in binary mode.
+    :param width: The width of the image.
+    :param height: The height of the image.
+    :param bit_depth: The bits per pixel, 1 or 8.
+    :param scanlines: The pixels of every row, without the filter byte.
+    :return:
+    """
+    f.write(_PNG_SIGNATURE)
+    f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth, 0, 0, 0, 0)))
+    compressor = zlib.compressobj()
+    for scanline in scanlines:
+        data = compressor.compress(b"\x00" + scanline)
+        if data:
+            f.write(_png_chunk(b"IDAT", data))
+    f.write(_png_chunk(b"IDAT", compressor.flush()))
+    f.write(_png_chunk(b"IEND", b""))
+
+
+def render_png(cells: RoomGrid, path: PathLike, scale: int = 1, max_side: int = DEFAULT_MAX_SIDE) -> None:
+    """
+    Renders a room as a PNG, tables in black and free cells in white.
+    :param cells: The room.
+    :param path: The file to write to.
+    :param scale: The pixels per cell of a room drawn in full.
+    :param max_side: The longest side of the image in pixels.
+    :return:
+    """
+    width, height = cells.width, cells.height
+    if width == 0 or height == 0:
+        raise ValueError("An empty room can not be rendered")
+
+    factor = overview_factor(width, height, max_side, scale)
+    with open(path, "wb") as f:
+        if factor > 1:
+            _write_png(f, -(-width // factor), -(-height // factor), 8, _grey_rows(cells, factor))
+        elif scale == 1:
+            _write_png(f, width, height, 1, (cells.row_bytes(i).translate(_ONE_BIT) for i in range(height)))
+        else:
+            pixels: List[bytes] = [
+                b"".join(bytes([TAKEN_GREY if byte >> bit & 1 else FREE_GREY]) * scale for bit in range(8))
+                for byte in range(256)
+            ]
+
+            def scanlines() -> Iterator[bytes]:
+                for i in range(height):
+                    scanline = b"".join([pixels[byte] for byte in cells.row_bytes(i)])[:width * scale]
+                    for _ in range(scale):
+                        yield scanline
+
+            _write_png(f, width * scale, height * scale, 8, scanlines())
+
+
+def _write_svg_runs(f: TextIO, i: int, bits: int) -> None:
+    """
+    Writes the runs of occupied cells of a single row as path segments.
+    :param f: The opened SVG file, within the d attribute of a path.
+    :param i: The index of the row.
+    :param bits: The occupied cells, the lowest bit is the first column.
+    :return:
+    """
+    starts = bits & ~(bits << 1)
+    ends = bits & ~(bits >> 1)
+    segments: List[str] = []
+    while starts:
+        j = (starts & -starts).bit_length() - 1
+        end = ends >> j
+        run = (end & -end).bit_length()
+        segments.append(f"M{j} {i}h{run}v1h-{run}z")
+        starts &= starts - 1
+    f.write("".join(segments))
+
+
+def render_svg(cells: RoomGrid, path: PathLike, scale: int = 1, max_side: int = DEFAULT_MAX_SIDE) -> None:
+    """
+    Renders a room as a SVG, tables in black and free cells in white. An
+    overview gets a path per grey level, of SVG_LEVELS levels.
+    :param cells: The room.
+    :param path: The file to write to.
+    :param scale: The pixels per cell of a room drawn in full.
+    :param max_side: The longest side of the image in pixels.
+    :return:
+    """
+    width, height = cells.width, cells.height
+    if width == 0 or height == 0:
+        raise ValueError("An empty room can not be rendered")
+
+    factor = overview_factor(width, height, max_side, scale)
+    columns, rows = -(-width // factor), -(-height // factor)
+    size = (columns * scale, rows * scale) if factor == 1 else (columns, rows)
+    with open(path, "w") as f:
+        f.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size[0]}" height="{size[1]}" '
+            f'viewBox="0 0 {columns} {rows}" shape-rendering="crispEdges">\n'
+            f'<rect width="{columns}" height="{rows}" fill="#{FREE_GREY:02x}{FREE_GREY:02x}{FREE_GREY:02x}"/>\n'
+        )
+        if factor == 1:
+            f.write(f'<path fill="#{TAKEN_GREY:02x}{TAKEN_GREY:02x}{TAKEN_GREY:02x}" d="')
+            for i in range(height):
+                _write_svg_runs(f, i, cells.row_bits(i))
+            f.write('"/>\n')
+        else:
+            # The pixels of every grey level, as the bits of every row
+            levels: Dict[int, List[int]] = {}
+            step = 256 // SVG_LEVELS
+            for i, greys in enumerate(_grey_rows(cells, factor)):
+                for j, grey in enumerate(greys):
+                    level = grey // step * step
+                    if level < FREE_GREY // step * step:
+                        levels.setdefault(level, [0] * rows)[i] |= 1 << j
+            for level, level_rows in sorted(levels.items()):
+                f.write(f'<path fill="#{level:02x}{level:02x}{level:02x}" d="')
+                for i, bits in enumerate(level_rows):
+                    _write_svg_runs(f, i, bits)
+                f.write('"/>\n')
+        f.write("</svg>\n")
+
+
+FORMATS: Dict[str, Callable[[RoomGrid, PathLike, int, int], None]] = {
+    "png": render_png,
+    "svg": render_svg,
+}
+
+
+def render(cells: RoomGrid, path: PathLike, scale: int = 1, max_side: int = DEFAULT_MAX_SIDE) -> None:
+    """
+    Renders a room in the format of the suffix of the path.
+    :param cells: The room.
+    :param path: The file to write to, ending in .png or .svg.
+    :param scale: The pixels per cell of a room drawn in full.
+    :param max_side: The longest side of the image in pixels.
+    :return:
+    """
+    fmt = pathlib.Path(path).suffix.lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown image format {fmt!r}, one of {sorted(FORMATS)} is needed")
+    FORMATS[fmt](cells, path, scale, max_side)
+
+
+def _render_one(cells: RoomGrid, path: pathlib.Path, scale: int, max_side: int) -> pathlib.Path:
+    """
+    Renders a single room, runs inside the worker processes.
+    :param cells: The room.
+    :param path: The file to write to.
+    :param scale: The pixels per cell of a room drawn in full.
+    :param max_side: The longest side of the image in pixels.
+    :return: The path of the image.
+    """
+    render(cells, path, scale, max_side)
+    return path
+
+
+def render_all(
+        rooms: Iterable[RoomGrid],
+        out_dir: PathLike,
+        fmt: str = "png",
+        scale: int = 1,
+        max_side: int = DEFAULT_MAX_SIDE,
+        workers: int = 1,
+        prefix: str = "room"
+) -> List[pathlib.Path]:
+    """
+    Renders every room into an image of its own, named prefix_index.fmt.
+    :param rooms: The rooms, consumed while the images are rendered.
+    :param out_dir: The directory to write to, created if missing.
+    :param fmt: The image format, see FORMATS.
+    :param scale: The pixels per cell of a room drawn in full.
+    :param max_side: The longest side of the image in pixels.
+    :param workers: If more than one, the rooms are rendered in that many
+    worker processes, with at most PENDING_PER_WORKER rooms per worker
+    waiting, so rooms read from a file are not all held at once.
+    :param prefix: The start of the file names.
+    :return: The paths of the images, in the order of the rooms.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown image format {fmt!r}, one of {sorted(FORMATS)} is needed")
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = (pathlib.Path(out_dir, f"{prefix}_{index}.{fmt}") for index in itertools.count())
+
+    if workers <= 1:
+        return [_render_one(cells, path, scale, max_side) for cells, path in zip(rooms, paths)]
+
+    # Imported here, the process pool costs more to import than a room takes
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    rendered: List[pathlib.Path] = []
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for cells, path in zip(rooms, paths):
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                rendered.append(pending.popleft().result())
+            pending.append(executor.submit(_render_one, cells, path, scale, max_side))
+        rendered.extend(future.result() for future in pending)
+    return rendered
+
+
+def read_out(in_path: PathLike, out_path: PathLike) -> Iterator[RoomGrid]:
+    """
+    Reads the rooms of a level 4 or 5 output file, one at a time.
+    :param in_path: The input file with the dimensions of the rooms.
+    :param out_path: The output file with the layouts.
+    :return: A generator over the grid of every room.
+    """
+    with open(in_path, "r") as f_in, open(out_path, "r") as f_out:
+        streaming.read_header(f_in, 1)
+        lines = (line.rstrip("\r\n") for line in f_out)
+        for x, y, _ in streaming.iter_records(f_in):
+            rows = streaming.room_rows(lines, y)
+            if rows is None:
+                return
+
+            cells = RoomGrid(x, y)
+            for i, row in enumerate(rows):
+                cells.merge_row(i, parse_row(row))
+            yield cells
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the renderer
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("in_file")
+    arg_parser.add_argument("out_file")
+    arg_parser.add_argument("out_dir")
+    arg_parser.add_argument("--format", choices=sorted(FORMATS), default="png")
+    arg_parser.add_argument("--scale", type=int, default=1)
+    arg_parser.add_argument("--max-side", type=int, default=DEFAULT_MAX_SIDE)
+    arg_parser.add_argument("--workers", type=int, default=1)
+    args = arg_parser.parse_args(argv)
+
+    paths = render_all(
+        read_out(args.in_file, args.out_file), args.out_dir, args.format, args.scale, args.max_side,
+        args.workers, pathlib.Path(args.out_file).stem
+    )
+    print(f"-- Rendered {len(paths)} rooms to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# coding=utf-8
+"""
+Runner solving every input file of the contest in parallel.
+
+Finds the ``.in`` files in the data and example directories of every day,
+picks the manager of the matching ``task-N.py`` script and spreads the files
+over a process pool, so the wall time is roughly the one of the slowest file
+instead of the sum of all files.
+
+Usage: python -m ccc.runner [--workers N] [--level N] [--stream] [day ...]
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import pathlib
+import re
+import sys
+import time
+from types import ModuleType
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ROOT_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+
+# The manager class every day's task scripts define
+MANAGERS: Dict[str, str] = {
+    "morning": "FlightManager",
+    "afternoon": "RoomManager",
+}
+
+_LEVEL_PATTERN = re.compile(r"^level(\d+)$")
+_modules: Dict[pathlib.Path, ModuleType] = {}
+
+
+class Job:
+    """
+    Class representing a single input file that should be solved.
+    """
+    day: str
+    level: int
+    in_path: pathlib.Path
+    out_path: pathlib.Path
+
+    def __init__(self, day: str, level: int, in_path: pathlib.Path, out_path: pathlib.Path):
+        self.day = day
+        self.level = level
+        self.in_path = in_path
+        self.out_path = out_path
+
+    @property
+    def script(self) -> pathlib.Path:
+        """
+        The task script solving this job.
+        """
+        return pathlib.Path(ROOT_PATH, self.day, "solution", f"task-{self.level}.py")
+
+
+def find_jobs(days: Sequence[str], levels: Optional[Sequence[int]] = None) -> List[Job]:
+    """
+    Finds every input file of the passed days, which has a task script.
+    :param days: The days to search, e.g. "morning".
+    :param levels: The levels to include, by default all of them.
+    :return: A job for every input file.
+    """
+    jobs: List[Job] = []
+    for day in days:
+        for base in ("data", "example"):
+            for in_path in sorted(pathlib.Path(ROOT_PATH, day, base).glob("level*/*.in")):
+                match = _LEVEL_PATTERN.match(in_path.parent.name)
+                if match is None:
+                    continue
+
+                level = int(match.group(1))
+                if levels is not None and level not in levels:
+                    continue
+
+                out_path = pathlib.Path(ROOT_PATH, day, "output", in_path.parent.name, f"{in_path.stem}.out")
+                job = Job(day, level, in_path, out_path)
+                if job.script.exists():
+                    jobs.append(job)
+    return jobs
+
+
+def load_task(script: pathlib.Path) -> ModuleType:
+    """
+    Imports a task script, the file names are not valid module names.
+    :param script: The path of the script.
+    :return: The imported module, cached per process.
+    """
+    module = _modules.get(script)
+    if module is None:
+        name = f"{script.parent.parent.name}_{script.stem.replace('-', '_')}"
+        spec = importlib.util.spec_from_file_location(name, script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[script] = module
+    return module
+
+
+def solve(job: Job, stream: bool = False) -> Tuple[Job, float]:
+    """
+    Solves a single job, runs inside the worker processes.
+    :param job: The job to solve.
+    :param stream: Whether to use the streaming mode of the manager.
+    :return: The job and the time it took in seconds.
+    """
+    start = time.perf_counter()
+    manager = getattr(load_task(job.script), MANAGERS[job.day])
+
+    job.out_path.parent.mkdir(parents=True, exist_ok=True)
+    manager(job.in_path, stream=stream).calculate(job.out_path)
+    return job, time.perf_counter() - start
+
+
+def run(jobs: Sequence[Job], workers: Optional[int] = None, stream: bool = False) -> int:
+    """
+    Solves the passed jobs in a process pool.
+    :param jobs: The jobs to solve.
+    :param workers: The number of worker processes, by default one per CPU.
+    :param stream: Whether to use the streaming mode of the managers.
+    :return: The number of failed jobs.
+    """
+    # Imported here, ccc.solve loads the task scripts without a pool
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    failed: int = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(solve, job, stream): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                _, elapsed = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"-- Failed {job.in_path.relative_to(ROOT_PATH)}: {e!r}", file=sys.stderr)
+                continue
+            print(f"-- Wrote {job.out_path.relative_to(ROOT_PATH)} ({elapsed:.3f}s)")
+    return failed
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the runner
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("days", nargs="*", metavar="day", help=f"one of {', '.join(MANAGERS)}")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arg_parser.add_argument("--level", type=int, action="append", dest="levels")
+    arg_parser.add_argument("--stream", action="store_true")
+    args = arg_parser.parse_args(argv)
+    for day in args.days:
+        if day not in MANAGERS:
+            arg_parser.error(f"unknown day {day!r}")
+
+    jobs = find_jobs(args.days or list(MANAGERS), args.levels)
+    print(f"-- Solving {len(jobs)} files with {args.workers} workers")
+    if run(jobs, args.workers, args.stream):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
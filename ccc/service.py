@@ -0,0 +1,386 @@
+# coding=utf-8
+"""
+Long running solver service, answering solve requests from a worker pool.
+
+Starting an interpreter and importing a level takes longer than solving most
+of the contest files. The service pays for it once: every worker process
+imports the task scripts of all levels when it starts and keeps a cache per
+level, see solve.Level.new_cache, for as long as it lives, so the
+trajectories and layouts planned for one request are reused by the next.
+
+Requests and responses are JSON objects, one per line, read from stdin and
+written to stdout or exchanged over a Unix socket. A request has
+
+- id, any value, which is returned with its response,
+- op, "solve" by default, "ping" or "stats" for the caches of a worker,
+- level, one of solve.LEVELS, e.g. "afternoon/4",
+- in, the path of the input file, or input, the content of the file,
+- out, the path of the output file, without it the output is returned in
+  the response as output, and
+- stream, whether to use the streaming mode of the manager.
+
+A response has the id, ok and either the seconds the solve took or an error.
+The requests of a connection are solved in parallel and answered as soon as
+they are done, which is not necessarily in the order they were sent. Client
+is a local client for both transports.
+
+Usage: python -m ccc.service serve [--socket PATH] [--workers N]
+       python -m ccc.service send [--socket PATH] --level LEVEL --in in_file [--out out_file]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TextIO
+
+from ccc import runner, solve
+
+# The caches of the levels, per worker process
+_caches: Dict[str, Any] = {}
+
+
+def _warm_up() -> None:
+    """
+    Prepares a worker process, imports the task script and creates the cache
+    of every level. The managers print their progress, which would end up
+    between the responses of the stdin/stdout transport, so it is discarded.
+    Interrupts are left to the service, which stops the workers itself.
+    :return:
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sys.stdout = open(os.devnull, "w")
+    for name, level in solve.LEVELS.items():
+        level.load()
+        cache = level.new_cache()
+        if cache is not None:
+            _caches[name] = cache
+
+
+def handle(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answers a single request, runs inside the worker processes.
+    :param request: The request, see the module docstring.
+    :return: The response, without the id.
+    """
+    op = request.get("op", "solve")
+    if op == "ping":
+        return {"ok": True, "pid": os.getpid()}
+    if op == "stats":
+        return {"ok": True, "pid": os.getpid(), "caches": {name: cache.stats() for name, cache in _caches.items()}}
+    if op != "solve":
+        raise ValueError(f"Unknown op {op!r}")
+
+    level = request.get("level")
+    if "in" not in request and "input" not in request:
+        raise ValueError("A solve request needs in or input")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        in_path = request.get("in")
+        if in_path is None:
+            in_path = pathlib.Path(tmp, "request.in")
+            in_path.write_text(request["input"])
+        out_path = request.get("out") or pathlib.Path(tmp, "request.out")
+
+        start = time.perf_counter()
+        solve.solve(level, in_path, out_path, bool(request.get("stream", False)), _caches.get(level))
+        response: Dict[str, Any] = {"ok": True, "seconds": time.perf_counter() - start}
+        if not request.get("out"):
+            response["output"] = pathlib.Path(out_path).read_text()
+    return response
+
+
+class Service:
+    """
+    Class representing the worker pool, which is shared by every connection.
+    """
+    _executor: ProcessPoolExecutor
+
+    def __init__(self, workers: Optional[int] = None):
+        # Spawned, the socket server forks from threads otherwise
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_up
+        )
+
+    def __enter__(self) -> Service:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Waits for the pending requests and stops the workers.
+        :return:
+        """
+        self._executor.shutdown(wait=True)
+
+    def submit(self, line: str, reply: Callable[[Dict[str, Any]], None]) -> Optional[Future]:
+        """
+        Solves a single request line in the worker pool.
+        :param line: The JSON request.
+        :param reply: Called with the response once it is done, from another
+        thread.
+        :return: The future of the request, None if it was answered already.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request has to be an object")
+        except ValueError as e:
+            reply({"id": None, "ok": False, "error": f"Invalid request: {e}"})
+            return None
+
+        def done(future: Future) -> None:
+            try:
+                response = future.result()
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            reply({"id": request.get("id"), **response})
+
+        future = self._executor.submit(handle, request)
+        future.add_done_callback(done)
+        return future
+
+    def serve(self, lines: Iterable[str], write: Callable[[str], None]) -> None:
+        """
+        Answers every request of a connection, until it is closed.
+        :param lines: The request lines.
+        :param write: Writes a response line, called with a lock held.
+        :return:
+        """
+        lock = threading.Lock()
+        # Set once the response of a request is written, the callbacks of a
+        # future may run after waiting for it returned
+        pending: List[threading.Event] = []
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            answered = threading.Event()
+
+            def reply(response: Dict[str, Any], answered: threading.Event = answered) -> None:
+                try:
+                    with lock:
+                        write(json.dumps(response) + "\n")
+                finally:
+                    answered.set()
+
+            self.submit(line, reply)
+            pending = [event for event in pending if not event.is_set()] + [answered]
+
+        for answered in pending:
+            answered.wait()
+
+
+def serve_stdio(service: Service) -> None:
+    """
+    Answers the requests read from stdin on stdout, until stdin is closed.
+    :param service: The worker pool.
+    :return:
+    """
+    def write(text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    service.serve(sys.stdin, write)
+
+
+def serve_socket(service: Service, path: os.PathLike) -> None:
+    """
+    Answers the requests of every connection to a Unix socket, until the
+    process is interrupted or terminated.
+    :param service: The worker pool.
+    :param path: The path of the socket, replaced if it exists.
+    :return:
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            def write(text: str) -> None:
+                self.wfile.write(text.encode())
+                self.wfile.flush()
+
+            service.serve((line.decode() for line in self.rfile), write)
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(str(path), Handler) as server:
+        print(f"-- Listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+class Client:
+    """
+    Class representing a connection to the service, either to the socket of
+    a running one or to the stdin and stdout of one it starts itself.
+    """
+    _reader: TextIO
+    _writer: TextIO
+    _process: Optional[subprocess.Popen]
+    _socket: Optional[socket.socket]
+    _next_id: int
+    _responses: Dict[Any, Dict[str, Any]]
+
+    def __init__(
+            self,
+            reader: TextIO,
+            writer: TextIO,
+            process: Optional[subprocess.Popen] = None,
+            sock: Optional[socket.socket] = None
+    ):
+        self._reader = reader
+        self._writer = writer
+        self._process = process
+        self._socket = sock
+        self._next_id = 0
+        self._responses = {}
+
+    @classmethod
+    def connect(cls, path: os.PathLike) -> Client:
+        """
+        Connects to the socket of a running service.
+        :param path: The path of the socket.
+        :return: The client.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(path))
+        return cls(sock.makefile("r"), sock.makefile("w"), sock=sock)
+
+    @classmethod
+    def spawn(cls, workers: Optional[int] = None) -> Client:
+        """
+        Starts a service on stdin and stdout, which stops with the client.
+        :param workers: The number of worker processes.
+        :return: The client.
+        """
+        command = [sys.executable, "-m", "ccc.service", "serve"]
+        if workers is not None:
+            command += ["--workers", str(workers)]
+        process = subprocess.Popen(
+            command, cwd=runner.ROOT_PATH, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        return cls(process.stdout, process.stdin, process=process)
+
+    def __enter__(self) -> Client:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the connection, a spawned service finishes its pending
+        requests and stops.
+        :return:
+        """
+        self._writer.close()
+        if self._process is not None:
+            self._process.wait()
+        if self._socket is not None:
+            self._socket.close()
+        self._reader.close()
+
+    def send(self, **request: Any) -> Any:
+        """
+        Sends a request without waiting for its response.
+        :param request: The fields of the request, see the module docstring.
+        :return: The id of the request.
+        """
+        if "id" not in request:
+            request["id"] = self._next_id
+            self._next_id += 1
+        self._writer.write(json.dumps(request) + "\n")
+        self._writer.flush()
+        return request["id"]
+
+    def receive(self, request_id: Any) -> Dict[str, Any]:
+        """
+        Waits for the response of a request, the responses of other requests
+        read meanwhile are kept for later.
+        :param request_id: The id of the request.
+        :return: The response.
+        """
+        while request_id not in self._responses:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("The service closed the connection")
+            response = json.loads(line)
+            self._responses[response.get("id")] = response
+        return self._responses.pop(request_id)
+
+    def request(self, **request: Any) -> Dict[str, Any]:
+        """
+        Sends a request and waits for its response.
+        :param request: The fields of the request, see the module docstring.
+        :return: The response.
+        """
+        return self.receive(self.send(**request))
+
+    def solve_many(self, requests: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sends every request at once, so they are solved in parallel.
+        :param requests: The requests.
+        :return: The responses, in the order of the requests.
+        """
+        ids = [self.send(**request) for request in requests]
+        return [self.receive(request_id) for request_id in ids]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the service
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="answer requests until stdin or the process is closed")
+    serve_parser.add_argument("--socket", type=pathlib.Path, default=None)
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count())
+
+    send_parser = commands.add_parser("send", help="solve a single file with a service")
+    send_parser.add_argument("--socket", type=pathlib.Path, default=None, help="by default a service is started")
+    send_parser.add_argument("--level", required=True, choices=sorted(solve.LEVELS))
+    send_parser.add_argument("--in", dest="in_file", required=True, type=pathlib.Path)
+    send_parser.add_argument("--out", dest="out_file", type=pathlib.Path, default=None)
+    send_parser.add_argument("--stream", action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "serve":
+        with Service(args.workers) as service:
+            if args.socket is not None:
+                serve_socket(service, args.socket)
+            else:
+                serve_stdio(service)
+        return
+
+    out_file = args.out_file if args.out_file is not None else args.in_file.with_suffix(".out")
+    with (Client.connect(args.socket) if args.socket is not None else Client.spawn(1)) as client:
+        response = client.request(
+            level=args.level, stream=args.stream, **{"in": str(args.in_file.resolve()), "out": str(out_file.resolve())}
+        )
+    if not response["ok"]:
+        print(f"-- Failed {args.in_file}: {response['error']}", file=sys.stderr)
+        sys.exit(1)
+    print(f"-- Wrote {out_file} ({response['seconds']:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
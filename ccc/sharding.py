@@ -0,0 +1,145 @@
+# coding=utf-8
+"""
+Sharding of the records of a single file over worker processes.
+
+The flat values and the row offsets of a parsed file are copied once into
+shared memory. Every worker attaches to it, solves a contiguous range of rows
+with the passed kernel and only sends its results back. The results are put
+back into file order before they are returned.
+"""
+from __future__ import annotations
+
+import os
+from array import array
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from ccc import lazy, parser
+
+# The process pool and shared memory are imported by the functions using
+# them, so importing the task scripts does not pay for them
+if TYPE_CHECKING:
+    from multiprocessing import shared_memory
+
+# Imported on first use, the memoryview path works without numpy
+np = lazy.optional("numpy")
+
+# Chunks per worker, a few more than one evens out rows of different cost
+CHUNKS_PER_WORKER: int = 4
+
+Kernel = Callable[..., List[Any]]
+
+
+def _to_shared(values: Sequence[int]) -> Tuple[shared_memory.SharedMemory, int]:
+    """
+    Copies the passed integers into a new shared memory block.
+    :param values: The integers to copy.
+    :return: The shared memory block and the number of copied integers.
+    """
+    from multiprocessing import shared_memory
+
+    if lazy.is_ndarray(values):
+        data = memoryview(np.ascontiguousarray(values, dtype=np.int64)).cast("B")
+    else:
+        data = memoryview(values if isinstance(values, array) and values.typecode == "q" else array("q", values))
+        data = data.cast("B")
+
+    # Zero sized blocks can not be created
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    return shm, len(data) // 8
+
+
+def _attach(name: str, count: int) -> Tuple[shared_memory.SharedMemory, Union[memoryview, "np.ndarray"]]:
+    """
+    Attaches to a shared memory block created by the parent process.
+    :param name: The name of the block.
+    :param count: The number of integers in the block.
+    :return: The block and a view on its integers.
+    """
+    from multiprocessing import shared_memory
+
+    # The workers share the resource tracker of the parent, which unlinks the
+    # block once all shards are done
+    shm = shared_memory.SharedMemory(name=name)
+    if np is not None:
+        return shm, np.frombuffer(shm.buf, dtype=np.int64, count=count)
+    return shm, shm.buf[:count * 8].cast("q")
+
+
+def _run_shard(
+        values_name: str, values_count: int, offsets_name: str, offsets_count: int,
+        lo: int, hi: int, kernel: Kernel, args: Tuple[Any, ...]
+) -> List[Any]:
+    """
+    Solves the rows lo to hi, runs inside the worker processes.
+    :param values_name: The shared memory block holding the values.
+    :param values_count: The number of values.
+    :param offsets_name: The shared memory block holding the row offsets.
+    :param offsets_count: The number of row offsets.
+    :param lo: The first row of the shard.
+    :param hi: The row after the last row of the shard.
+    :param kernel: The function solving the rows.
+    :param args: Additional arguments passed to the kernel.
+    :return: The results of the kernel.
+    """
+    values_shm, values = _attach(values_name, values_count)
+    offsets_shm, offsets = _attach(offsets_name, offsets_count)
+    try:
+        return kernel(parser.IntTable(values, offsets[lo:hi + 1]), *args)
+    finally:
+        # The views have to be gone before the blocks can be closed
+        del values, offsets
+        values_shm.close()
+        offsets_shm.close()
+
+
+def map_rows(
+        kernel: Kernel,
+        values: Sequence[int],
+        offsets: Sequence[int],
+        workers: Optional[int] = None,
+        args: Tuple[Any, ...] = (),
+        chunk_rows: Optional[int] = None
+) -> List[Any]:
+    """
+    Solves every row in a process pool and returns the results in order.
+    :param kernel: A module level function receiving an IntTable with the rows
+    of a shard and args, returning one result per row.
+    :param values: The flat values of all rows.
+    :param offsets: The row offsets into values, one more than rows.
+    :param workers: The number of worker processes, by default one per CPU.
+    :param args: Additional arguments passed to the kernel.
+    :param chunk_rows: The number of rows per shard, by default the rows are
+    split into CHUNKS_PER_WORKER shards per worker.
+    :return: The results of all rows.
+    """
+    rows: int = len(offsets) - 1
+    if rows <= 0:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if chunk_rows is None:
+        chunk_rows = -(-rows // (workers * CHUNKS_PER_WORKER))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        values_shm, values_count = _to_shared(values)
+        offsets_shm, offsets_count = _to_shared(offsets)
+        try:
+            futures = [
+                executor.submit(
+                    _run_shard, values_shm.name, values_count, offsets_shm.name, offsets_count,
+                    lo, min(lo + chunk_rows, rows), kernel, args
+                )
+                for lo in range(0, rows, chunk_rows)
+            ]
+
+            results: List[Any] = []
+            for future in futures:
+                results.extend(future.result())
+            return results
+        finally:
+            for shm in (values_shm, offsets_shm):
+                shm.close()
+                shm.unlink()
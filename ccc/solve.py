@@ -0,0 +1,155 @@
+# coding=utf-8
+"""
+Single entry point solving an input file of any level.
+
+Every level is registered by name, e.g. "morning/3", with the task script
+and manager class solving it, see register. Only the script of the solved
+level is imported, when it is solved, so a run pays for the imports of its
+own level alone, and for numpy only if the file is large enough to be parsed
+with it, see ccc.lazy. The paths are taken as passed, independent of the
+working directory.
+
+The repository is not packaged and there is no console script. The task
+scripts keep the layout and dashed names of the contest, which are no
+importable module names, and are loaded from their paths, see
+runner.load_task, so an installed solve command would still need the
+checkout. Running the module from the root of the repository is the entry
+point.
+
+Usage: python -m ccc.solve --level LEVEL --in in_file [--out out_file] [--stream] [--metrics FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import pathlib
+import sys
+from os import PathLike
+from typing import Any, Dict, Optional, Sequence
+
+from ccc import instrument, runner
+
+
+class Level:
+    """
+    Class representing a registered level and the manager solving it.
+    """
+    name: str
+    script: pathlib.Path
+    manager: str
+    cache: Optional[str]
+    options: Dict[str, Any]
+
+    def __init__(
+            self,
+            name: str,
+            script: pathlib.Path,
+            manager: str,
+            cache: Optional[str],
+            options: Dict[str, Any]
+    ):
+        self.name = name
+        self.script = script
+        self.manager = manager
+        self.cache = cache
+        self.options = options
+
+    def load(self) -> type:
+        """
+        Imports the task script of the level, on first use.
+        :return: The manager class.
+        """
+        return getattr(runner.load_task(self.script), self.manager)
+
+    def new_cache(self) -> Any:
+        """
+        Creates a cache the manager can share between files, e.g. a
+        TrajectoryCache for morning level 3.
+        :return: The cache, None if the manager has none.
+        """
+        if self.cache is None:
+            return None
+        return getattr(runner.load_task(self.script), self.cache)()
+
+
+LEVELS: Dict[str, Level] = {}
+
+
+def register(name: str, script: PathLike, manager: str, cache: Optional[str] = None, **options: Any) -> Level:
+    """
+    Registers a level, without importing its script.
+    :param name: The name of the level, e.g. "morning/3".
+    :param script: The task script defining the manager.
+    :param manager: The name of the manager class.
+    :param cache: The name of the cache class in the script, which the
+    manager takes as its cache argument, None if it has none.
+    :param options: Keyword arguments passed to the manager.
+    :return: The registered level.
+    """
+    level = LEVELS[name] = Level(name, pathlib.Path(script), manager, cache, options)
+    return level
+
+
+def solve(name: str, in_path: PathLike, out_path: PathLike, stream: bool = False, cache: Any = None) -> None:
+    """
+    Solves a single input file.
+    :param name: The name of a registered level.
+    :param in_path: The input file.
+    :param out_path: The output file, its directory is created if needed.
+    :param stream: Whether to use the streaming mode of the manager.
+    :param cache: A cache of the level shared with other files, see
+    Level.new_cache.
+    :return:
+    """
+    if name not in LEVELS:
+        raise ValueError(f"Unknown level {name!r}, one of {sorted(LEVELS)} is needed")
+
+    level = LEVELS[name]
+    options = dict(level.options, cache=cache) if cache is not None else level.options
+    pathlib.Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    level.load()(in_path, stream=stream, **options).calculate(out_path)
+
+
+# The caches of the task scripts, which are shared by their first_task
+CACHES: Dict[str, str] = {
+    "morning/3": "TrajectoryCache",
+    "afternoon/4": "LayoutCache",
+    "afternoon/5": "LayoutCache",
+}
+
+for _day, _levels in (("morning", 3), ("afternoon", 5)):
+    for _number in range(1, _levels + 1):
+        register(
+            f"{_day}/{_number}", pathlib.Path(runner.ROOT_PATH, _day, "solution", f"task-{_number}.py"),
+            runner.MANAGERS[_day], CACHES.get(f"{_day}/{_number}")
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the solver
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--level", required=True, choices=sorted(LEVELS))
+    arg_parser.add_argument("--in", dest="in_file", required=True, type=pathlib.Path)
+    arg_parser.add_argument("--out", dest="out_file", type=pathlib.Path, default=None,
+                            help="by default the input file with the suffix .out")
+    arg_parser.add_argument("--stream", action="store_true")
+    arg_parser.add_argument("--metrics", type=pathlib.Path, default=None,
+                            help="write the phase timings, see ccc.instrument")
+    args = arg_parser.parse_args(argv)
+
+    out_file = args.out_file if args.out_file is not None else args.in_file.with_suffix(".out")
+    if args.metrics is not None:
+        instrument.enable()
+    try:
+        solve(args.level, args.in_file, out_file, args.stream)
+    except (OSError, ValueError) as e:
+        print(f"-- Failed {args.in_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.metrics is not None:
+            instrument.write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# coding=utf-8
+"""
+Line by line reading and writing of the contest file formats.
+
+Used by the streaming mode of the managers, which hands every record to the
+solver as soon as it is read and writes its result straight away, so the peak
+memory does not depend on the size of the input file. The writer buffers the
+formatted records and is shared by every output of the managers.
+"""
+from __future__ import annotations
+
+import itertools
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+# Characters collected by a writer before they are handed to the file
+DEFAULT_BUFFER_CHARS: int = 1 << 16
+
+# Records joined at once by SeparatedWriter.write_all
+JOIN_RECORDS: int = 1 << 12
+
+
+def parse_line(line: str) -> List[int]:
+    """
+    Parses a single line of whitespace separated integers.
+    :param line: The raw line, including its line break.
+    :return: The integers on the line.
+    """
+    return [int(item) for item in line.split()]
+
+
+def read_header(f: TextIO, lines: int) -> List[List[int]]:
+    """
+    Reads the header lines at the start of an input file.
+    :param f: The opened input file.
+    :param lines: The number of header lines.
+    :return: The parsed integers of every header line.
+    """
+    return [parse_line(f.readline()) for _ in range(lines)]
+
+
+def iter_records(f: TextIO) -> Iterator[List[int]]:
+    """
+    Yields the remaining lines of an input file one at a time.
+    :param f: The opened input file, positioned after the header.
+    :return: A generator over the parsed integers of every line.
+    """
+    for line in f:
+        if not line.strip():
+            continue
+        yield parse_line(line)
+
+
+def room_rows(lines: Iterator[str], height: int) -> Optional[Iterator[str]]:
+    """
+    Takes the rows of the next room of an afternoon output file. The rooms of
+    the levels 4 and 5 are separated by empty lines, the ones of level 3 are
+    not, so a room ends after height rows or at an empty line, whichever is
+    first.
+    :param lines: The remaining lines of the output file, without their line
+    breaks.
+    :param height: The height of the room.
+    :return: A generator over the rows of the room, which has to be consumed
+    before the next room, None if there are no rows left.
+    """
+    first = next((line for line in lines if line.strip()), None)
+    if first is None:
+        return None
+    return itertools.chain((first,), itertools.islice(itertools.takewhile(str.strip, lines), max(height - 1, 0)))
+
+
+class SeparatedWriter:
+    """
+    Class writing records with a separator between them, but none after the
+    last one, without knowing in advance which record is the last. The
+    records are collected and handed to the file with a single writelines
+    call per buffer_chars characters, so it has to be flushed at the end,
+    which leaving its context does.
+    """
+    separator: str
+    buffer_chars: int
+    _f: TextIO
+    _first: bool
+    _parts: List[str]
+    _buffered: int
+
+    def __init__(self, f: TextIO, separator: str = "\n", buffer_chars: int = DEFAULT_BUFFER_CHARS):
+        self.separator = separator
+        self.buffer_chars = buffer_chars
+        self._f = f
+        self._first = True
+        self._parts = []
+        self._buffered = 0
+
+    def __enter__(self) -> SeparatedWriter:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.flush()
+
+    def write(self, record: str) -> None:
+        """
+        Writes a single record.
+        :param record: The formatted record.
+        :return:
+        """
+        if self._first:
+            self._first = False
+        else:
+            self._append(self.separator)
+        self._append(record)
+
+    def write_all(self, records: Iterable[str], separator: Optional[str] = None) -> None:
+        """
+        Writes several records at once, they are joined in chunks of
+        JOIN_RECORDS, or fewer if that exceeds the buffer, instead of being
+        buffered one by one.
+        :param records: The formatted records.
+        :param separator: The separator between these records, by default the
+        one of the writer. As a whole they are separated from the other
+        records by the one of the writer.
+        :return:
+        """
+        inner: str = self.separator if separator is None else separator
+        records = iter(records)
+        chunk = list(itertools.islice(records, 1))
+        # Long records, like the rows of a huge room, are joined fewer at once
+        size = max(1, min(JOIN_RECORDS, self.buffer_chars // (len(chunk[0]) + 1))) if chunk else 1
+        chunk.extend(itertools.islice(records, size - 1))
+        self.write(inner.join(chunk))
+        while True:
+            chunk = list(itertools.islice(records, size))
+            if not chunk:
+                break
+            self._append(inner + inner.join(chunk))
+
+    def flush(self) -> None:
+        """
+        Hands the buffered records to the file.
+        :return:
+        """
+        if self._parts:
+            self._f.writelines(self._parts)
+            self._parts.clear()
+            self._buffered = 0
+
+    def _append(self, text: str) -> None:
+        """
+        Buffers a piece of text and flushes if the buffer is full.
+        :param text: The text to buffer.
+        :return:
+        """
+        self._parts.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_chars:
+            self.flush()
@@ -0,0 +1,395 @@
+# coding=utf-8
+"""
+Trajectory planners for the morning level 3.
+
+A flight starts at position 0 with velocity 0. Every tick its velocity
+changes by ``acc - GRAVITY`` and then its position by the velocity. The
+planned accelerations have to reach the target position exactly and then
+land at position 0 with a velocity of -1.
+
+The optimal planner splits a flight into the ascent up to the target and the
+descent back to the ground. Played backwards the descent is an ascent as well,
+which starts with velocity 1 instead of 0, so both phases are planned the same
+way. The two phases only interact at the top, where the velocity of the last
+ascending tick and the one of the first descending tick may differ by at most
+MAX_DELTA. The fastest ascent is searched per end velocity with closed form
+bounds of the heights reachable in n ticks. Every phase is then composed of
+at most four velocity segments (ramp up, cruise slightly below the cap,
+cruise at the cap and ramp down), so a plan is a handful of acceleration
+runs, no matter how high the target is.
+"""
+from __future__ import annotations
+
+import functools
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ccc import parser
+from ccc.integrator import GRAVITY
+
+# Maximum change of the velocity per tick, accelerations are 0 to 2 * GRAVITY
+MAX_DELTA: int = GRAVITY
+
+# Stands in for an uncapped velocity profile
+_NO_CAP: int = 1 << 62
+
+# Number of target positions whose best split is memoised, the feasibility
+# check and the planning of a flight search the same split
+SPLIT_CACHE_SIZE: int = 4096
+
+# Velocities (first, step, count) and accelerations (acceleration, count)
+Segment = Tuple[int, int, int]
+Run = Tuple[int, int]
+
+
+def plan_greedy(pos_to_reach: int) -> List[int]:
+    """
+    Plans the accelerations tick by tick with the greedy rules.
+    :param pos_to_reach: The position that should be reached.
+    :return: The acceleration for every tick.
+    """
+    pos: int = 0
+    velocity: int = 0
+    acc_list: List[int] = []
+    while pos < pos_to_reach:
+        if velocity >= 10:
+            acc = GRAVITY - 5
+        else:
+            acc = GRAVITY + 5
+
+        if velocity + (acc - GRAVITY) + pos > pos_to_reach:
+            acc = GRAVITY - velocity + 1
+        elif velocity + (acc - GRAVITY) + pos == pos_to_reach:
+            acc = GRAVITY - velocity + 1
+
+        velocity = velocity + (acc - GRAVITY)
+        pos = pos + velocity if pos + velocity >= 0 else 0
+        acc_list.append(acc)
+
+    if pos > pos_to_reach:
+        raise Exception("Doesn't work")
+
+    while pos > 0:
+        if velocity > 10:
+            acc = GRAVITY - 10
+        elif velocity < -10:
+            acc = GRAVITY + 10
+        elif pos > 50:
+            acc = GRAVITY - 10
+        elif velocity > 5:
+            acc = GRAVITY - 4
+        elif velocity == -1:
+            acc = GRAVITY
+        else:
+            acc = GRAVITY - 1
+        velocity = velocity + (acc - GRAVITY)
+        pos = pos + velocity
+        acc_list.append(acc)
+
+    if pos != 0 or velocity != -1:
+        raise Exception("Doesn't work")
+
+    return acc_list
+
+
+def _ramp_sum(first: int, count: int, cap: int) -> int:
+    """
+    Sums min(first + MAX_DELTA * i, cap) for i in 0 to count - 1.
+    :param first: The first value of the ramp.
+    :param count: The number of values.
+    :param cap: The maximum of every value.
+    :return: The sum.
+    """
+    if count <= 0:
+        return 0
+    uncapped = min(max((cap - first) // MAX_DELTA + 1, 0), count)
+    return uncapped * first + MAX_DELTA * uncapped * (uncapped - 1) // 2 + (count - uncapped) * cap
+
+
+def _profile_peak(first: int, last: int, ticks: int) -> int:
+    """
+    Returns the index of the last tick on the rising ramp of a profile.
+    :param first: The velocity of the first tick.
+    :param last: The velocity of the last tick.
+    :param ticks: The number of ticks.
+    :return: The index, -1 if the profile only falls.
+    """
+    return min(max((last - first + MAX_DELTA * (ticks - 1)) // (2 * MAX_DELTA), -1), ticks - 1)
+
+
+def _profile_sum(first: int, last: int, ticks: int, cap: int) -> int:
+    """
+    Sums the velocity profile min(first + MAX_DELTA * i, last + MAX_DELTA *
+    (ticks - 1 - i), cap), which is the height it climbs.
+    :param first: The velocity the rising ramp starts at.
+    :param last: The velocity of the last tick.
+    :param ticks: The number of ticks.
+    :param cap: The maximum velocity.
+    :return: The height.
+    """
+    peak = _profile_peak(first, last, ticks)
+    return _ramp_sum(first, peak + 1, cap) + _ramp_sum(last, ticks - 1 - peak, cap)
+
+
+def _fastest_climb(height: int, first: int, last: int) -> Optional[Tuple[int, int]]:
+    """
+    Searches the fewest ticks to climb exactly the passed height with a
+    profile ending with velocity last. The ticks are raised until the
+    uncapped profile climbs high enough; lowering its cap then reaches every
+    height down to the one of the profile capped at max(last, 1), as every
+    tick but the last one has to keep the flight above the ground.
+    :param height: The height to climb.
+    :param first: The velocity the rising ramp starts at.
+    :param last: The velocity of the last tick.
+    :return: The number of ticks and the cap of the profile, or None if the
+    height can not be climbed ending with that velocity.
+    """
+    lowest_cap = max(last, 1)
+
+    # The uncapped height grows with the ticks, so they are searched binary
+    lo = max(1, -(-(last - first) // MAX_DELTA) + 1)
+    hi = lo
+    while _profile_sum(first, last, hi, _NO_CAP) < height:
+        lo, hi = hi + 1, hi * 2
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _profile_sum(first, last, mid, _NO_CAP) >= height:
+            hi = mid
+        else:
+            lo = mid + 1
+    ticks = lo
+
+    if _profile_sum(first, last, ticks, lowest_cap) > height:
+        return None
+
+    # Likewise the lowest cap which still climbs high enough
+    lo, hi = lowest_cap, first + MAX_DELTA * ticks
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _profile_sum(first, last, ticks, mid) >= height:
+            hi = mid
+        else:
+            lo = mid + 1
+    return ticks, lo
+
+
+def _climb_segments(height: int, first: int, last: int, ticks: int, cap: int) -> List[Segment]:
+    """
+    Builds the velocity segments climbing exactly the passed height, see
+    _fastest_climb. The capped profile is a ramp up, a cruise at the cap and
+    a ramp down, each of them one segment.
+    :param height: The height to climb.
+    :param first: The velocity the rising ramp starts at.
+    :param last: The velocity of the last tick.
+    :param ticks: The number of ticks.
+    :param cap: The cap found by _fastest_climb.
+    :return: The velocity segments.
+    """
+    peak = _profile_peak(first, last, ticks)
+    rising = min(peak + 1, max(0, -(-(cap - first) // MAX_DELTA)))
+    falling = min(ticks - 1 - peak, max(0, -(-(cap - last) // MAX_DELTA)))
+    cruise = ticks - rising - falling
+
+    # The capped profile climbs at most one tick per cruise tick too high,
+    # lowering cruise ticks by one keeps every velocity change in range
+    excess = _profile_sum(first, last, ticks, cap) - height
+
+    segments = [
+        (first, MAX_DELTA, rising),
+        (cap - 1, 0, excess),
+        (cap, 0, cruise - excess),
+        (last + MAX_DELTA * (falling - 1), -MAX_DELTA, falling),
+    ]
+    return [segment for segment in segments if segment[2] > 0]
+
+
+def _reverse_segments(segments: List[Segment]) -> List[Segment]:
+    """
+    Turns the segments of a climb into the ones of a descent, by playing them
+    backwards and negating the velocities.
+    :param segments: The velocity segments of the climb.
+    :return: The velocity segments of the descent.
+    """
+    return [(-(first + step * (count - 1)), step, count) for first, step, count in reversed(segments)]
+
+
+def _acceleration_runs(segments: List[Segment]) -> List[Run]:
+    """
+    Converts velocity segments of a flight starting with velocity 0 into
+    runs of equal accelerations.
+    :param segments: The velocity segments.
+    :return: The accelerations as (acceleration, repetitions) runs.
+    """
+    runs: List[Run] = []
+    velocity: int = 0
+    for first, step, count in segments:
+        for acc, repeat in ((first - velocity + GRAVITY, 1), (step + GRAVITY, count - 1)):
+            if repeat == 0:
+                continue
+            if runs and runs[-1][0] == acc:
+                runs[-1] = (acc, runs[-1][1] + repeat)
+            else:
+                runs.append((acc, repeat))
+        velocity = first + step * (count - 1)
+    return runs
+
+
+def expand_runs(runs: List[Run]) -> List[int]:
+    """
+    Expands acceleration runs into the acceleration of every tick.
+    :param runs: The (acceleration, repetitions) runs.
+    :return: The acceleration for every tick.
+    """
+    acc_list: List[int] = []
+    for acc, repeat in runs:
+        acc_list.extend([acc] * repeat)
+    return acc_list
+
+
+class InfeasibleTargetError(ValueError):
+    """
+    Error raised for target positions which can not be reached and landed
+    from within the time limit.
+    """
+    targets: List[Tuple[int, int]]
+    time_limit: Optional[int]
+
+    def __init__(self, targets: List[Tuple[int, int]], time_limit: Optional[int]):
+        self.targets = targets
+        self.time_limit = time_limit
+        details = ", ".join(f"{pos} (needs {ticks} ticks)" for pos, ticks in targets[:10])
+        more = f" and {len(targets) - 10} more" if len(targets) > 10 else ""
+        super().__init__(f"Can not reach within {time_limit} ticks: {details}{more}")
+
+
+@functools.lru_cache(maxsize=SPLIT_CACHE_SIZE)
+def _best_split(pos_to_reach: int) -> Tuple[int, int, Tuple[int, int], int, Tuple[int, int]]:
+    """
+    Searches the fastest combination of ascent and descent.
+    :param pos_to_reach: The position that should be reached, positive.
+    :return: The total ticks, the end velocity and (ticks, cap) of the
+    ascent and the same for the reversed descent. Memoised per position.
+    """
+    # The first ascending tick starts from velocity 0, the reversed descent
+    # from the landing velocity 1
+    ascents = {last: _fastest_climb(pos_to_reach, MAX_DELTA, last) for last in range(0, MAX_DELTA + 1)}
+    descents = {last: _fastest_climb(pos_to_reach, 1, last) for last in range(1, MAX_DELTA + 1)}
+
+    best: Optional[Tuple[int, int, int]] = None
+    for up_last, up in ascents.items():
+        for down_last, down in descents.items():
+            if up is None or down is None or up_last + down_last > MAX_DELTA:
+                continue
+            if best is None or up[0] + down[0] < best[0]:
+                best = (up[0] + down[0], up_last, down_last)
+
+    ticks, up_last, down_last = best
+    return ticks, up_last, ascents[up_last], down_last, descents[down_last]
+
+
+def minimum_ticks(pos_to_reach: int) -> int:
+    """
+    Returns the fewest ticks a flight reaching the passed position needs,
+    without planning it.
+    :param pos_to_reach: The position that should be reached.
+    :return: The number of ticks, 0 if the position can not be reached.
+    """
+    if pos_to_reach <= 0:
+        return 0
+    return _best_split(pos_to_reach)[0]
+
+
+def find_infeasible(positions: Iterable[int], time_limit: Optional[int]) -> List[Tuple[int, int]]:
+    """
+    Checks every target position against the time limit before planning.
+    :param positions: The positions that should be reached.
+    :param time_limit: The maximum number of ticks, None for no limit.
+    :return: The infeasible positions with the ticks they need at least, in
+    the order they first appear.
+    """
+    infeasible: List[Tuple[int, int]] = []
+    checked: Set[int] = set()
+    for pos_to_reach in positions:
+        if pos_to_reach in checked:
+            continue
+        checked.add(pos_to_reach)
+
+        ticks = minimum_ticks(pos_to_reach)
+        if ticks == 0 or (time_limit is not None and ticks > time_limit):
+            infeasible.append((pos_to_reach, ticks))
+    return infeasible
+
+
+def plan_runs(pos_to_reach: int) -> List[Run]:
+    """
+    Plans the shortest flight reaching the passed position and landing again
+    with velocity -1, as runs of equal accelerations. The number of runs does
+    not depend on the position, so neither does the cost of planning.
+    :param pos_to_reach: The position that should be reached.
+    :return: The accelerations as (acceleration, repetitions) runs.
+    """
+    if pos_to_reach <= 0:
+        raise InfeasibleTargetError([(pos_to_reach, 0)], None)
+
+    _, up_last, up, down_last, down = _best_split(pos_to_reach)
+    up_segments = _climb_segments(pos_to_reach, MAX_DELTA, up_last, *up)
+    down_segments = _climb_segments(pos_to_reach, 1, down_last, *down)
+    return _acceleration_runs(up_segments + _reverse_segments(down_segments))
+
+
+def plan_optimal(pos_to_reach: int) -> List[int]:
+    """
+    Plans the shortest sequence of accelerations reaching the passed position
+    and landing again with velocity -1.
+    :param pos_to_reach: The position that should be reached.
+    :return: The acceleration for every tick.
+    """
+    return expand_runs(plan_runs(pos_to_reach))
+
+
+PLANNERS: Dict[str, Callable[[int], List[int]]] = {
+    "greedy": plan_greedy,
+    "optimal": plan_optimal,
+}
+
+
+def plan_within(
+        pos_to_reach: int, time_limit: Optional[int], planner: str = "optimal", checked: bool = False
+) -> List[int]:
+    """
+    Plans a flight which fits into the time limit. The feasibility is checked
+    before planning, if the passed planner does not fit into the limit the
+    optimal planner is used instead.
+    :param pos_to_reach: The position that should be reached.
+    :param time_limit: The maximum number of ticks, None for no limit.
+    :param planner: The name of the planner in PLANNERS.
+    :param checked: Whether the caller already checked the position with
+    find_infeasible, which skips the check.
+    :return: The acceleration for every tick.
+    """
+    if not checked:
+        infeasible = find_infeasible((pos_to_reach,), time_limit)
+        if infeasible:
+            raise InfeasibleTargetError(infeasible, time_limit)
+
+    acc_list = PLANNERS[planner](pos_to_reach)
+    if time_limit is not None and len(acc_list) > time_limit:
+        acc_list = plan_optimal(pos_to_reach)
+    return acc_list
+
+
+def plan_table(
+        table: parser.IntTable,
+        planner: str = "optimal",
+        time_limit: Optional[int] = None,
+        checked: bool = False
+) -> List[List[int]]:
+    """
+    Plans every row of a parsed table, the first value of a row is the
+    position to reach. Used as the kernel of the sharded mode.
+    :param table: The rows to plan.
+    :param planner: The name of the planner in PLANNERS.
+    :param time_limit: The maximum number of ticks, None for no limit.
+    :param checked: Whether the rows were already checked, see plan_within.
+    :return: The accelerations per row.
+    """
+    return [plan_within(int(row[0]), time_limit, planner, checked) for row in table.rows()]
@@ -0,0 +1,57 @@
+# coding=utf-8
+"""
+LRU cache for planned trajectories of the morning level 3.
+
+The inputs repeat target positions a lot, so the planned accelerations are
+cached per target position, time limit and planner. The cache can be backed
+by a JSON file, which is loaded on creation and written back on save(), so
+the plans survive between runs, see persistent_cache.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ccc import trajectory
+from ccc.persistent_cache import PersistentCache
+
+DEFAULT_MAX_SIZE: int = 4096
+
+Key = Tuple[int, Optional[int], str]
+
+
+class TrajectoryCache(PersistentCache[Key, List[int]]):
+    """
+    Class representing a LRU cache of planned trajectories.
+    """
+    default_max_size: int = DEFAULT_MAX_SIZE
+
+    def get(
+            self,
+            pos_to_reach: int,
+            time_limit: Optional[int] = None,
+            planner: str = "optimal",
+            checked: bool = False
+    ) -> List[int]:
+        """
+        Returns the planned accelerations, planning them on a miss. See
+        trajectory.plan_within for the handling of the time limit.
+        :param pos_to_reach: The position that should be reached.
+        :param time_limit: The time limit of the input file.
+        :param planner: The name of the planner in trajectory.PLANNERS.
+        :param checked: Whether the caller already checked the position, see
+        trajectory.plan_within.
+        :return: The acceleration for every tick, must not be modified.
+        """
+        key: Key = (pos_to_reach, time_limit, planner)
+        acc_list = self._lookup(key)
+        if acc_list is None:
+            acc_list = trajectory.plan_within(pos_to_reach, time_limit, planner, checked)
+            self._put(key, acc_list)
+        return acc_list
+
+    def _encode(self, key: Key, acc_list: List[int]) -> Dict[str, Any]:
+        return {"key": list(key), "acc": acc_list}
+
+    def _decode(self, entry: Dict[str, Any]) -> Optional[Tuple[Key, List[int]]]:
+        pos_to_reach, time_limit, planner = entry["key"]
+        return (pos_to_reach, time_limit, planner), entry["acc"]
@@ -0,0 +1,294 @@
+# coding=utf-8
+"""
+Validator for the outputs of the morning level 3.
+
+Re-simulates every planned flight of an ``.out`` file with the shared physics
+and checks it against the target positions and the time limit of the matching
+``.in`` file. A flight is valid if
+
+- it has at least one and at most time limit ticks,
+- every acceleration is between 0 and 2 * GRAVITY,
+- it stays above the ground until its last tick,
+- it reaches at least its target position at some tick and
+- it lands at position 0 with a velocity of -1.
+
+The flights are matched with their targets by line, so an empty output line
+is reported as a flight without ticks instead of shifting the following
+flights onto the wrong targets; empty lines after the last flight are
+ignored. Both files are parsed chunk by chunk and every chunk of flights is
+simulated at once with numpy, see integrator.batch_final_positions for the
+handling of the ground. Without numpy every flight is simulated with the scalar loop.
+
+Usage: python -m ccc.trajectory_check [--chunk-mb N] in_file out_file
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from os import PathLike
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from ccc import lazy, parser
+from ccc.integrator import DEFAULT_CHUNK_ROWS, GRAVITY
+
+# Imported on first use, the scalar path works without numpy
+np = lazy.optional("numpy")
+
+# Bytes of the output file parsed at once, bounds the padded arrays
+DEFAULT_CHUNK_BYTES: int = 1 << 24
+
+# Failures kept with their details, the rest is only counted
+MAX_REPORTED: int = 100
+
+# Reasons a flight is rejected for, by priority
+VALID: int = 0
+EMPTY: int = 1
+TOO_LONG: int = 2
+BAD_ACCELERATION: int = 3
+GROUNDED: int = 4
+MISSED: int = 5
+BAD_LANDING: int = 6
+MISSING: int = 7
+EXTRA: int = 8
+
+REASONS: Tuple[str, ...] = (
+    "valid",
+    "has no ticks",
+    "exceeds the time limit",
+    "has an acceleration out of range",
+    "touches the ground before landing",
+    "never reaches its target",
+    "does not land with velocity -1",
+    "is missing from the output",
+    "is not in the input",
+)
+
+
+class Report:
+    """
+    Class representing the result of validating an output file.
+    """
+    checked: int
+    invalid: int
+    failures: List[Tuple[int, int, int]]
+
+    def __init__(self):
+        self.checked = 0
+        self.invalid = 0
+        self.failures = []
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether every flight is valid.
+        """
+        return self.invalid == 0
+
+    def add(self, index: int, pos_to_reach: int, reason: int) -> None:
+        """
+        Records an invalid flight.
+        :param index: The index of the flight in the file.
+        :param pos_to_reach: The target position of the flight, -1 if unknown.
+        :param reason: The reason code, see REASONS.
+        :return:
+        """
+        self.invalid += 1
+        if len(self.failures) < MAX_REPORTED:
+            self.failures.append((index, pos_to_reach, reason))
+
+    def __str__(self) -> str:
+        lines = [f"{self.checked} flights checked, {self.invalid} invalid"]
+        for index, pos_to_reach, reason in self.failures:
+            lines.append(f"  flight {index} (target {pos_to_reach}) {REASONS[reason]}")
+        if self.invalid > len(self.failures):
+            lines.append(f"  ... and {self.invalid - len(self.failures)} more")
+        return "\n".join(lines)
+
+
+def check_flight(
+        accelerations: Sequence[int], pos_to_reach: int, time_limit: int, gravity: int = GRAVITY
+) -> int:
+    """
+    Simulates a single flight with the scalar loop.
+    :param accelerations: The acceleration for every tick.
+    :param pos_to_reach: The target position.
+    :param time_limit: The maximum number of ticks.
+    :param gravity: The gravity subtracted from every acceleration.
+    :return: The reason code, VALID if the flight is valid.
+    """
+    if len(accelerations) == 0:
+        return EMPTY
+    if len(accelerations) > time_limit:
+        return TOO_LONG
+    if any(acc < 0 or acc > 2 * gravity for acc in accelerations):
+        return BAD_ACCELERATION
+
+    pos: int = 0
+    velocity: int = 0
+    reached: bool = False
+    for tick, acc in enumerate(accelerations):
+        velocity = velocity + (acc - gravity)
+        pos = pos + velocity if pos + velocity >= 0 else 0
+        if pos <= 0 and tick < len(accelerations) - 1:
+            return GROUNDED
+        reached = reached or pos >= pos_to_reach
+
+    if not reached:
+        return MISSED
+    if pos != 0 or velocity != -1:
+        return BAD_LANDING
+    return VALID
+
+
+def check_batch(
+        padded: "np.ndarray",
+        lengths: "np.ndarray",
+        targets: "np.ndarray",
+        time_limit: int,
+        gravity: int = GRAVITY
+) -> "np.ndarray":
+    """
+    Simulates a batch of flights at once.
+    :param padded: The padded accelerations, see parser.IntTable.padded.
+    :param lengths: The number of ticks per flight.
+    :param targets: The target position per flight.
+    :param time_limit: The maximum number of ticks.
+    :param gravity: The gravity subtracted from every acceleration.
+    :return: The reason code per flight.
+    """
+    columns = np.arange(padded.shape[1], dtype=np.int64)
+    inside = columns < lengths[:, None]
+    last = np.maximum(lengths - 1, 0)
+    rows = np.arange(len(lengths))
+
+    velocities = np.cumsum(padded - gravity, axis=1)
+    velocities[~inside] = 0
+    sums = np.cumsum(velocities, axis=1)
+    # Ground clamp as a running Lindley recursion, see the integrator
+    positions = sums - np.minimum(np.minimum.accumulate(sums, axis=1), 0)
+
+    codes = np.full(len(lengths), VALID, dtype=np.int8)
+    if padded.shape[1] == 0:
+        codes[:] = EMPTY
+        return codes
+
+    # Assigned from the lowest to the highest priority
+    landed = (positions[rows, last] == 0) & (velocities[rows, last] == -1)
+    codes[~landed] = BAD_LANDING
+    codes[~((positions >= targets[:, None]) & inside).any(axis=1)] = MISSED
+    codes[((positions <= 0) & (columns < last[:, None])).any(axis=1)] = GROUNDED
+    codes[((padded < 0) | (padded > 2 * gravity)).any(axis=1)] = BAD_ACCELERATION
+    codes[lengths > time_limit] = TOO_LONG
+    codes[lengths == 0] = EMPTY
+    return codes
+
+
+def _iter_targets(in_path: PathLike, chunk_bytes: int) -> Tuple[int, int, Iterator[int]]:
+    """
+    Reads the header of the input file and streams its target positions.
+    :param in_path: The input file.
+    :param chunk_bytes: The approximate number of bytes parsed at once.
+    :return: The flight count, the time limit and a generator over the
+    target position of every flight.
+    """
+    tables = parser.iter_int_tables(in_path, chunk_bytes=chunk_bytes)
+    first = next(tables)
+    flight_count, time_limit = int(first.row(0)[0]), int(first.row(1)[0])
+
+    def targets() -> Iterator[int]:
+        yield from (int(row[0]) for row in first.rows(2))
+        for table in tables:
+            yield from (int(row[0]) for row in table.rows())
+
+    return flight_count, time_limit, targets()
+
+
+def validate(
+        in_path: PathLike,
+        out_path: PathLike,
+        gravity: int = GRAVITY,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES
+) -> Report:
+    """
+    Validates every flight of an output file.
+    :param in_path: The input file with the target positions.
+    :param out_path: The output file with the accelerations.
+    :param gravity: The gravity subtracted from every acceleration.
+    :param chunk_bytes: The approximate number of bytes parsed at once.
+    :return: The report of the invalid flights.
+    """
+    report = Report()
+    flight_count, time_limit, targets = _iter_targets(in_path, chunk_bytes)
+    # Index of the next output line, which is the index of its flight
+    line: int = 0
+
+    # Every output line is a flight, the empty ones included
+    for table in parser.iter_int_tables(out_path, chunk_bytes=chunk_bytes, keep_empty=True):
+        if len(table) == 0:
+            continue
+
+        chunk_targets: List[int] = []
+        for target in targets:
+            chunk_targets.append(target)
+            if len(chunk_targets) == len(table):
+                break
+
+        first: int = line
+        line += len(table)
+        report.checked += len(chunk_targets)
+        lengths = table.lengths()
+        for index in range(len(chunk_targets), len(table)):
+            if lengths[index]:
+                report.add(first + index, -1, EXTRA)
+                report.checked += 1
+        table = parser.IntTable(table.values, table.offsets[:len(chunk_targets) + 1])
+        if len(table) == 0:
+            continue
+
+        if np is None:
+            for index, (row, target) in enumerate(zip(table.rows(), chunk_targets)):
+                reason = check_flight(row, target, time_limit, gravity)
+                if reason != VALID:
+                    report.add(first + index, target, reason)
+            continue
+
+        padded, lengths = table.padded()
+        target_array = np.asarray(chunk_targets, dtype=np.int64)
+        for start in range(0, len(chunk_targets), DEFAULT_CHUNK_ROWS):
+            stop = min(start + DEFAULT_CHUNK_ROWS, len(chunk_targets))
+            # Trim the padding to the longest flight of the block
+            width = int(lengths[start:stop].max())
+            codes = check_batch(
+                padded[start:stop, :width], lengths[start:stop], target_array[start:stop], time_limit, gravity
+            )
+            for index in np.flatnonzero(codes):
+                report.add(first + start + int(index), chunk_targets[start + index], int(codes[index]))
+
+    for target in targets:
+        report.add(line, target, MISSING)
+        report.checked += 1
+        line += 1
+
+    if report.checked != flight_count:
+        print(f"-- The input declares {flight_count} flights, but has {report.checked}", file=sys.stderr)
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Entry function for the validator
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("in_file")
+    arg_parser.add_argument("out_file")
+    arg_parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES >> 20)
+    args = arg_parser.parse_args(argv)
+
+    report = validate(args.in_file, args.out_file, chunk_bytes=args.chunk_mb << 20)
+    print(report)
+    if not report.ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
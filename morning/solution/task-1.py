@@ -9,11 +9,19 @@ from __future__ import annotations
 
 import math
 import pathlib
+import sys
 from os import PathLike
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 
-DATA_PATH: pathlib.Path = pathlib.Path("../data/").resolve()
-OUT_PATH: pathlib.Path = pathlib.Path("../output/").resolve()
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from ccc import instrument, integrator, lazy, parser, sharding, streaming  # noqa: E402
+
+# The directories of the day, independent of the working directory
+DAY_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+DATA_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "data")
+OUT_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "output")
 
 
 def cartesian_distance(
@@ -37,40 +45,73 @@ class FlightManager:
     """
     Class representing a flight manager object.
     """
-    velocities_per_flight: List[List[int]]
+    _velocities_per_flight: Optional[List[parser.Row]]
     flight_count: int
     _final_pos: List[int]
+    _file: PathLike
+    _stream: bool
+    _table: parser.IntTable
 
-    def __init__(self, file: PathLike):
-        self.velocities_per_flight = []
+    def __init__(self, file: PathLike, stream: bool = False):
+        self._velocities_per_flight = None
         self._final_pos = []
-        self._read_in_velocities(file)
+        self._file = file
+        self._stream = stream
+        if not stream:
+            self._read_in_velocities(file)
 
+    @property
+    def velocities_per_flight(self) -> List[parser.Row]:
+        """
+        The velocities of every flight, as views into the parsed buffer, so the
+        records are not copied. Created on first access, only the scalar
+        loop needs an object per flight.
+        """
+        if self._velocities_per_flight is None:
+            self._velocities_per_flight = self._table.rows(1) if not self._stream else []
+        return self._velocities_per_flight
+
+    @instrument.phase("read")
     def _read_in_velocities(self, file: PathLike) -> None:
         """
         Reads in the locations from the specified file.
         :param file: The file to read from.
         :return: Every location
         """
-        with open(file, "r+") as f:
-            content: List[str] = f.readlines()
-
-            # Parse the last line
-            line_info = content[0].strip("\n").split(" ")
-            self.flight_count = int(line_info[0])
-
-            for line in content[1:]:
-                items = line.strip("\n").split(" ")
-                int_items = [int(item) for item in items]
+        self._table = parser.parse_int_table(file)
+        self.flight_count = int(self._table.row(0)[0])
 
-                self.velocities_per_flight.append(int_items)
-
-    def calculate(self, out_path: PathLike) -> None:
+    @instrument.phase("calculate", records="flight_count")
+    def calculate(self, out_path: PathLike, vectorized: bool = True, workers: int = 1) -> None:
         """
 
         :param out_path:
+        :param vectorized: Integrate all flights at once with the batch
+        engine, falls back to the scalar loop if the file was not parsed with
+        numpy, see parser.NUMPY_MIN_BYTES.
+        :param workers: If more than one, the flights are split into shards
+        which are integrated in that many worker processes.
         :return:
         """
+        if self._stream:
+            self._calculate_streaming(out_path)
+            return
+
+        if workers > 1:
+            # The header row is skipped, the offsets stay absolute
+            self._final_pos = sharding.map_rows(
+                integrator.table_final_positions, self._table.values, self._table.offsets[1:],
+                workers, (None,)
+            )
+            self._write_out_final_distance(out_path)
+            return
+
+        if vectorized and lazy.is_ndarray(self._table.values):
+            padded, lengths = self._table.padded(1)
+            self._final_pos = integrator.batch_final_positions(padded, lengths).tolist()
+            self._write_out_final_distance(out_path)
+            return
+
         for flight in self.velocities_per_flight:
             pos: int = 0
             for velocity in flight:
@@ -80,17 +121,29 @@ class FlightManager:
 
         self._write_out_final_distance(out_path)
 
+    def _calculate_streaming(self, out_path: PathLike) -> None:
+        """
+        Calculates every flight as soon as it is read and writes its result
+        straight away, without keeping the flights in memory.
+        :param out_path: The file to write to.
+        :return:
+        """
+        with open(self._file, "r") as f_in, open(out_path, "w+") as f_out:
+            self.flight_count = streaming.read_header(f_in, 1)[0][0]
+
+            with streaming.SeparatedWriter(f_out) as out:
+                for flight in streaming.iter_records(f_in):
+                    out.write(f"{integrator.final_position(flight)}")
+
+    @instrument.phase("write")
     def _write_out_final_distance(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
-        with open(out_path, "w+") as f:
-            for pos in self._final_pos:
-                f.write(f"{pos}")
-                if pos != self._final_pos[-1]:
-                    f.write("\n")
+        with open(out_path, "w+") as f, streaming.SeparatedWriter(f) as out:
+            out.write_all(map(str, self._final_pos))
 
 
 def first_task() -> None:
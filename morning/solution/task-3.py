@@ -9,12 +9,21 @@ from __future__ import annotations
 
 import math
 import pathlib
+import sys
 from os import PathLike
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 
-DATA_PATH: pathlib.Path = pathlib.Path("../data/").resolve()
-OUT_PATH: pathlib.Path = pathlib.Path("../output/").resolve()
-EXAMPLE_PATH: pathlib.Path = pathlib.Path("../example/").resolve()
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from ccc import instrument, parser, sharding, streaming, trajectory  # noqa: E402
+from ccc.trajectory_cache import TrajectoryCache  # noqa: E402
+
+# The directories of the day, independent of the working directory
+DAY_PATH: pathlib.Path = pathlib.Path(__file__).resolve().parents[1]
+DATA_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "data")
+OUT_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "output")
+EXAMPLE_PATH: pathlib.Path = pathlib.Path(DAY_PATH, "example")
 
 GRAVITY: int = 10
 
@@ -43,98 +52,127 @@ class FlightManager:
     flight_count: int
     time_limit: int
     positions_to_reach: List[int]
-
-    def __init__(self, file: PathLike):
+    _file: PathLike
+    _stream: bool
+    _planner: str
+    _cache: Optional[TrajectoryCache]
+
+    def __init__(
+            self,
+            file: PathLike,
+            stream: bool = False,
+            planner: str = "optimal",
+            cache: Optional[TrajectoryCache] = None
+    ):
         self._acceleration_per_flight = []
         self.positions_to_reach = []
-        self._read_in_velocities(file)
-
+        self._file = file
+        self._stream = stream
+        self._planner = planner
+        self._cache = cache
+        if not stream:
+            self._read_in_velocities(file)
+
+    @instrument.phase("read")
     def _read_in_velocities(self, file: PathLike) -> None:
         """
         Reads in the locations from the specified file.
         :param file: The file to read from.
         :return: Every location
         """
-        with open(file, "r+") as f:
-            content: List[str] = f.readlines()
-
-            line_info = content[0].strip("\n").split(" ")
-            self.flight_count = int(line_info[0])
-
-            line_info = content[1].strip("\n").split(" ")
-            self.time_limit = int(line_info[0])
+        table = parser.parse_int_table(file)
+        self.flight_count = int(table.row(0)[0])
+        self.time_limit = int(table.row(1)[0])
 
-            for line in content[2:]:
-                items = line.strip("\n").split(" ")
-                pos = int(items[0])
+        for row in table.rows(2):
+            self.positions_to_reach.append(int(row[0]))
 
-                self.positions_to_reach.append(pos)
-
-    def calculate(self, out_path: PathLike) -> None:
+    @instrument.phase("calculate", records="flight_count")
+    def calculate(self, out_path: PathLike, workers: int = 1) -> None:
         """
 
         :param out_path:
+        :param workers: If more than one, the flights are split into shards
+        which are planned in that many worker processes. The workers do not
+        use the cache.
         :return:
         """
+        if self._stream:
+            self._calculate_streaming(out_path)
+            return
+
+        # Reject the whole file before planning anything, if a single flight
+        # can not make it within the time limit
+        infeasible = trajectory.find_infeasible(self.positions_to_reach, self.time_limit)
+        if infeasible:
+            raise trajectory.InfeasibleTargetError(infeasible, self.time_limit)
+
+        if workers > 1:
+            self._acceleration_per_flight = sharding.map_rows(
+                trajectory.plan_table, self.positions_to_reach,
+                range(len(self.positions_to_reach) + 1), workers, (self._planner, self.time_limit, True)
+            )
+            instrument.count("ticks", sum(map(len, self._acceleration_per_flight)))
+            self._write_out_final_distance(out_path)
+            return
+
         for pos_to_reach in self.positions_to_reach:
-            print(f"Trying to reach {pos_to_reach}")
-
-            pos: int = 0
-            velocity: int = 0
-            acc_list: List[int] = []
-            while pos < pos_to_reach:
-                if velocity >= 10:
-                    acc = GRAVITY - 5
-                else:
-                    acc = GRAVITY + 5
-
-                if velocity + (acc - GRAVITY) + pos > pos_to_reach:
-                    acc = GRAVITY - velocity + 1
-                elif velocity + (acc - GRAVITY) + pos == pos_to_reach:
-                    acc = GRAVITY - velocity + 1
-
-                velocity = velocity + (acc - GRAVITY)
-                pos = pos + velocity if pos + velocity >= 0 else 0
-                acc_list.append(acc)
-
-            if pos > pos_to_reach:
-                raise Exception("Doesn't work")
-
-            while pos > 0:
-                if velocity > 10:
-                    acc = GRAVITY - 10
-                elif velocity < -10:
-                    acc = GRAVITY + 10
-                elif pos > 50:
-                    acc = GRAVITY - 10
-                elif velocity > 5:
-                    acc = GRAVITY - 4
-                elif velocity == -1:
-                    acc = GRAVITY
-                else:
-                    acc = GRAVITY - 1
-                velocity = velocity + (acc - GRAVITY)
-                pos = pos + velocity
-                acc_list.append(acc)
-
-            if pos != 0 or velocity != -1:
-                raise Exception("Doesn't work")
-
-            self._acceleration_per_flight.append(acc_list)
+            self._acceleration_per_flight.append(self._plan(pos_to_reach, checked=True))
 
         self._write_out_final_distance(out_path)
 
+    def _plan(self, pos_to_reach: int, checked: bool = False) -> List[int]:
+        """
+        Plans the accelerations to reach the passed position and land again.
+        :param pos_to_reach: The position that should be reached.
+        :param checked: Whether calculate already checked the position.
+        :return: The acceleration for every tick.
+        :raises trajectory.InfeasibleTargetError: If the position can not be
+        reached within the time limit.
+        """
+        if self._cache is not None:
+            acc_list = self._cache.get(pos_to_reach, self.time_limit, self._planner, checked)
+        else:
+            acc_list = trajectory.plan_within(pos_to_reach, self.time_limit, self._planner, checked)
+
+        # Per flight, the plans taken from the cache included
+        instrument.count("ticks", len(acc_list))
+        return acc_list
+
+    def _calculate_streaming(self, out_path: PathLike) -> None:
+        """
+        Plans every flight as soon as it is read and writes its result
+        straight away, without keeping the flights in memory.
+        :param out_path: The file to write to.
+        :return:
+        """
+        with open(self._file, "r") as f_in, open(out_path, "w+") as f_out:
+            header = streaming.read_header(f_in, 2)
+            self.flight_count = header[0][0]
+            self.time_limit = header[1][0]
+
+            with streaming.SeparatedWriter(f_out, "") as out:
+                for record in streaming.iter_records(f_in):
+                    out.write(self._format_flight(self._plan(record[0])))
+
+    @instrument.phase("write")
     def _write_out_final_distance(self, out_path: PathLike) -> None:
         """
 
         :param out_path:
         :return:
         """
-        with open(out_path, "w+") as f:
-            for pos in self._acceleration_per_flight:
-                for acc in pos:
-                    f.write(f"{acc} ")
-                f.write("\n")
+        with open(out_path, "w+") as f, streaming.SeparatedWriter(f, "") as out:
+            out.write_all(map(self._format_flight, self._acceleration_per_flight))
+
+    @staticmethod
+    def _format_flight(acc_list: List[int]) -> str:
+        """
+        Formats the accelerations of a single flight as an output line.
+        :param acc_list: The acceleration for every tick.
+        :return: The line, every acceleration followed by a space.
+        """
+        return f"{' '.join(map(str, acc_list))} \n" if acc_list else "\n"
 
 
 def first_task() -> None:
@@ -147,6 +185,9 @@ def first_task() -> None:
 
     print(f"-- Writing to {task_out}")
 
+    # The files share their plans, many target positions repeat
+    cache = TrajectoryCache()
+
     # mng = FlightManager(pathlib.Path(example, "level3_example.in"))
     # mng.calculate(pathlib.Path(task_out, "level3_example.out"))
 
@@ -155,21 +196,23 @@ def first_task() -> None:
     # mng.calculate(pathlib.Path(task_out, "level3_1.out"))
 
     # Process the second file
-    mng = FlightManager(pathlib.Path(task_data, "level3_2.in"))
+    mng = FlightManager(pathlib.Path(task_data, "level3_2.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level3_2.out"))
 
     # Process the third file
-    mng = FlightManager(pathlib.Path(task_data, "level3_3.in"))
+    mng = FlightManager(pathlib.Path(task_data, "level3_3.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level3_3.out"))
 
     # Process the fourth file
-    mng = FlightManager(pathlib.Path(task_data, "level3_4.in"))
+    mng = FlightManager(pathlib.Path(task_data, "level3_4.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level3_4.out"))
 
     # Process the fifth file
-    mng = FlightManager(pathlib.Path(task_data, "level3_5.in"))
+    mng = FlightManager(pathlib.Path(task_data, "level3_5.in"), cache=cache)
     mng.calculate(pathlib.Path(task_out, "level3_5.out"))
 
+    print(f"-- Trajectory cache: {cache.stats()}")
+
 
 def main() -> None:
     """
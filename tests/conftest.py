@@ -0,0 +1,9 @@
+# coding=utf-8
+"""
+Shared setup of the tests, run with python -m pytest from the repository root.
+"""
+import pathlib
+import sys
+
+# Allow importing the shared engines from the repository root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
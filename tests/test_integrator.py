@@ -0,0 +1,115 @@
+# coding=utf-8
+"""
+Tests of the flight integrators of the morning levels 1 and 2, the batch
+engine and the scalar fallback against the scalar reference loop.
+"""
+import random
+from array import array
+from typing import List, Optional
+
+import pytest
+
+from ccc import integrator, parser
+from ccc.integrator import GRAVITY
+
+
+def random_flights(seed: int, gravity: Optional[int], count: int = 200) -> List[List[int]]:
+    """
+    Creates flights of ragged lengths, biased downwards, so many of them hit
+    the ground and are clamped at 0.
+    :param seed: The seed of the random numbers.
+    :param gravity: If None velocities are created, otherwise accelerations.
+    :param count: The number of flights.
+    :return: The values of every flight.
+    """
+    rng = random.Random(seed)
+    flights: List[List[int]] = [[], [0], [-5], [5, -10, 3]]
+    for _ in range(count):
+        length = rng.choice([1, 2, 7, rng.randint(0, 60)])
+        if gravity is None:
+            flights.append([rng.randint(-12, 10) for _ in range(length)])
+        else:
+            flights.append([rng.randint(0, 20) for _ in range(length)])
+    return flights
+
+
+def expected(flights: List[List[int]], gravity: Optional[int]) -> List[int]:
+    """
+    Integrates the flights with the scalar reference loop.
+    """
+    if gravity is None:
+        return [integrator.final_position(flight) for flight in flights]
+    return [integrator.final_position_from_accelerations(flight, gravity) for flight in flights]
+
+
+@pytest.fixture(params=["numpy", "scalar"])
+def engine(request, monkeypatch):
+    if request.param == "numpy" and not integrator.has_numpy():
+        pytest.skip("numpy is not installed")
+    if request.param == "scalar":
+        monkeypatch.setattr(integrator, "np", None)
+        monkeypatch.setattr(parser, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("velocities, position", [
+    ([], 0),
+    ([3, 4], 7),
+    ([-3, 4], 4),
+    ([5, -10, 3], 3),
+    ([2, -2, -1, 6], 6),
+])
+def test_final_position(velocities: List[int], position: int):
+    assert integrator.final_position(velocities) == position
+
+
+def test_final_position_from_accelerations():
+    # The velocity is not reset while the position is clamped at 0
+    assert integrator.final_position_from_accelerations([0, 0, 25]) == 0
+    assert integrator.final_position_from_accelerations([0, 0, 40]) == 10
+    assert integrator.final_position_from_accelerations([GRAVITY + 2, GRAVITY + 1]) == 5
+    assert integrator.final_position_from_accelerations([GRAVITY + 2, GRAVITY - 3], 10) == 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("gravity", [None, GRAVITY])
+def test_final_positions(engine, seed: int, gravity: Optional[int]):
+    flights = random_flights(seed, gravity)
+    assert integrator.final_positions(flights, gravity) == expected(flights, gravity)
+    assert any(position == 0 for position in expected(flights, gravity))
+
+
+@pytest.mark.parametrize("gravity", [None, GRAVITY])
+def test_table_final_positions(engine, gravity: Optional[int]):
+    flights = random_flights(7, gravity)
+    offsets = array("q", [0])
+    for flight in flights:
+        offsets.append(offsets[-1] + len(flight))
+    values = array("q", [value for flight in flights for value in flight])
+    table = parser.IntTable(values, offsets)
+    assert integrator.table_final_positions(table, gravity) == expected(flights, gravity)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 3, 64, integrator.DEFAULT_CHUNK_ROWS])
+@pytest.mark.parametrize("gravity", [None, GRAVITY])
+def test_batch_final_positions(chunk_rows: int, gravity: Optional[int]):
+    pytest.importorskip("numpy")
+    flights = random_flights(11, gravity)
+    padded, lengths = integrator.pad_flights(flights)
+    assert padded.shape == (len(flights), max(map(len, flights)))
+    result = integrator.batch_final_positions(padded, lengths, gravity, chunk_rows)
+    assert result.tolist() == expected(flights, gravity)
+
+
+def test_batch_final_positions_without_ticks():
+    pytest.importorskip("numpy")
+    padded, lengths = integrator.pad_flights([[], []])
+    assert integrator.batch_final_positions(padded, lengths).tolist() == [0, 0]
+    assert integrator.batch_final_positions(padded, lengths, GRAVITY).tolist() == [0, 0]
+
+
+def test_batch_final_positions_requires_numpy(monkeypatch):
+    monkeypatch.setattr(integrator, "np", None)
+    assert not integrator.has_numpy()
+    with pytest.raises(RuntimeError):
+        integrator.batch_final_positions([[1]], [1])
@@ -0,0 +1,111 @@
+# coding=utf-8
+"""
+Tests of the validator for the room layouts of the afternoon levels 3 to 5.
+"""
+from typing import List
+
+import pytest
+
+from ccc import layout_check
+
+
+def check(rows: List[str], tables: int, length: int = 3, diagonal: bool = True) -> int:
+    """
+    Checks a room of X and . cells with the dimensions of its rows.
+    :param rows: The rows of the room.
+    :param tables: The number of requested tables.
+    :param length: The length of the tables.
+    :param diagonal: Whether tables touching only at a corner are rejected.
+    :return: The reason code.
+    """
+    return layout_check.check_grid(rows, len(rows[0]), len(rows), tables, length, diagonal)[0]
+
+
+def test_accepts_separate_tables():
+    rows = [
+        "X.X.X.X",
+        "X.X.X.X",
+        "X.X.X.X",
+        ".......",
+        "XXX.XXX",
+    ]
+
+    assert layout_check.check_grid(rows, 7, 5, 6) == (layout_check.VALID, 6)
+
+
+def test_accepts_an_empty_room():
+    assert layout_check.check_grid(["...", "..."], 3, 2, 0) == (layout_check.VALID, 0)
+
+
+@pytest.mark.parametrize("rows, width, height", [
+    (["XXX.", "...."], 4, 3),
+    (["XXX.", "....", "...."], 5, 3),
+    (["XXX..", "....."], 4, 2),
+])
+def test_rejects_wrong_dimensions(rows: List[str], width: int, height: int):
+    assert layout_check.check_grid(rows, width, height, 1)[0] == layout_check.BAD_SIZE
+
+
+def test_rejects_unknown_cells():
+    assert check(["XXX.", "..o."], 1) == layout_check.BAD_CELL
+
+
+@pytest.mark.parametrize("rows", [
+    ["XX..", "...."],
+    ["XXXX", "...."],
+    ["X...", "X...", "X...", "X..."],
+])
+def test_rejects_runs_which_are_no_table(rows: List[str]):
+    assert check(rows, 0) == layout_check.BAD_SHAPE
+
+
+@pytest.mark.parametrize("rows", [
+    ["XXX.", "XXX."],
+    ["XXX.", "X...", "X..."],
+])
+def test_rejects_tables_touching_along_a_side(rows: List[str]):
+    assert check(rows, 0) == layout_check.TOUCHING
+
+
+def test_rejects_tables_touching_at_a_corner():
+    rows = ["XX..", "..XX"]
+
+    assert check(rows, 2, length=2) == layout_check.TOUCHING
+    assert check(rows, 2, length=2, diagonal=False) == layout_check.VALID
+
+
+def test_rejects_too_few_tables():
+    assert layout_check.check_grid(["XXX.", "...."], 4, 2, 2) == (layout_check.TOO_FEW, 1)
+
+
+def test_checks_table_ids():
+    rows = ["1 1 1 0", "2 2 2 3", "0 0 0 3", "0 0 0 3"]
+    assert layout_check.check_ids(rows, 4, 4, 3) == (layout_check.VALID, 3)
+
+    assert layout_check.check_ids(["1 1 0", "0 1 0"], 3, 2, 0)[0] == layout_check.BAD_SHAPE
+    assert layout_check.check_ids(["1 1 1", "0 0 0"], 3, 2, 2)[0] == layout_check.TOO_FEW
+    assert layout_check.check_ids(["1 1 1", "0 0"], 3, 2, 1)[0] == layout_check.BAD_SIZE
+
+
+def test_validate_reports_every_room(tmp_path):
+    in_path = tmp_path / "level4_1.in"
+    out_path = tmp_path / "level4_1.out"
+    in_path.write_text("3\n4 2 1\n4 2 1\n3 1 1\n")
+    out_path.write_text("XXX.\n....\n\nXX..\n....\n")
+
+    report = layout_check.validate(in_path, out_path)
+    assert report.checked == 3
+    assert report.tables == 1
+    assert [(index, reason) for index, _, _, _, reason in report.failures] == [
+        (1, layout_check.BAD_SHAPE), (2, layout_check.MISSING)
+    ]
+
+    out_path.write_text("XXX.\n....\n\nXXX.\n....\n\nXXX\n\nX..\n")
+    report = layout_check.validate(in_path, out_path)
+    assert [(index, reason) for index, _, _, _, reason in report.failures] == [(3, layout_check.EXTRA)]
+
+
+def test_level_of_reads_the_file_name():
+    assert layout_check.level_of("output/level5/level5_2.out") == 5
+    with pytest.raises(ValueError):
+        layout_check.level_of("rooms.out")
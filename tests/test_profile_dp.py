@@ -0,0 +1,105 @@
+# coding=utf-8
+"""
+Tests of the row profile DP against an exhaustive search of small rooms.
+"""
+import itertools
+from typing import List, Set, Tuple
+
+import pytest
+
+from ccc import packing, profile_dp
+
+# Rooms small enough to try every layout of, (width, height)
+SMALL_ROOMS: List[Tuple[int, int]] = [
+    (width, height) for width, height in itertools.product(range(1, 6), repeat=2)
+]
+
+Cell = Tuple[int, int]
+
+
+def most_tables(width: int, height: int, length: int) -> int:
+    """
+    Tries every layout of a room, no two tables may touch, not even at a
+    corner. Every cell in row major order is left free or starts a table.
+    :param width: The width of the room.
+    :param height: The height of the room.
+    :param length: The length of the tables.
+    :return: The most tables of any layout.
+    """
+    def fits(cells: List[Cell], blocked: Set[Cell]) -> bool:
+        return all(0 <= x < width and 0 <= y < height and (x, y) not in blocked for x, y in cells)
+
+    def search(index: int, blocked: Set[Cell]) -> int:
+        if index == width * height:
+            return 0
+
+        y, x = divmod(index, width)
+        best = search(index + 1, blocked)
+        for cells in ([(x + i, y) for i in range(length)], [(x, y + i) for i in range(length)]):
+            if not fits(cells, blocked):
+                continue
+            # The table and its neighbourhood are blocked for the others
+            around = {(cx + dx, cy + dy) for cx, cy in cells for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+            best = max(best, 1 + search(index + 1, blocked | around))
+        return best
+
+    return search(0, set())
+
+
+def count_tables(rows: List[int], width: int, length: int) -> int:
+    """
+    Checks that the occupied cells form separate tables, which touch no other
+    table, not even at a corner.
+    :param rows: The occupied cells of every row, the lowest bit is the
+    first column.
+    :param width: The width of the room.
+    :param length: The length of the tables.
+    :return: The number of tables.
+    """
+    cells = {(x, y) for y, bits in enumerate(rows) for x in range(width) if bits >> x & 1}
+    tables: int = 0
+    while cells:
+        # The 8-connected component of a cell has to be a single table
+        component = {cells.pop()}
+        stack = list(component)
+        while stack:
+            x, y = stack.pop()
+            for neighbour in ((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                if neighbour in cells:
+                    cells.remove(neighbour)
+                    component.add(neighbour)
+                    stack.append(neighbour)
+
+        xs = {x for x, _ in component}
+        ys = {y for _, y in component}
+        assert len(component) == length and (len(xs) == 1 or len(ys) == 1)
+        tables += 1
+    return tables
+
+
+@pytest.mark.parametrize("length", [2, 3])
+@pytest.mark.parametrize("width, height", SMALL_ROOMS)
+def test_solve_matches_exhaustive_search(width: int, height: int, length: int):
+    rows = profile_dp.solve(width, height, length)
+    assert rows is not None and len(rows) == height
+
+    assert count_tables(rows, width, length) == most_tables(width, height, length)
+
+
+@pytest.mark.parametrize("width, height", [(7, 3), (3, 7), (14, 2)])
+def test_pack_profile_packs_along_the_narrow_side(width: int, height: int):
+    cells = packing.pack_profile(width, height, 0, 2, deadline=float("inf"))
+    assert cells is not None
+
+    rows = [cells.row_bits(i) for i in range(height)]
+    assert count_tables(rows, width, 2) == most_tables(width, height, 2)
+
+
+def test_solve_gives_up_below_at_least():
+    assert profile_dp.solve(4, 4, 2, at_least=most_tables(4, 4, 2) + 1) is None
+    assert profile_dp.solve(4, 4, 2, at_least=most_tables(4, 4, 2)) is not None
+
+
+def test_solve_rejects_wide_rooms():
+    with pytest.raises(ValueError):
+        profile_dp.solve(profile_dp.DP_MAX_WIDTH + 1, 2)
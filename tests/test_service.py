@@ -0,0 +1,148 @@
+# coding=utf-8
+"""
+Tests of the solver service, spawned over stdin and stdout, against the
+committed outputs of the levels.
+"""
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from ccc import runner, service
+
+# Small input files whose committed outputs the current managers reproduce
+FILES: List[Dict[str, str]] = [
+    {"level": "morning/1", "in": "morning/data/level1/level1_1.in"},
+    {"level": "morning/2", "in": "morning/data/level2/level2_1.in"},
+    {"level": "afternoon/4", "in": "afternoon/example/level4/level4_example.in"},
+    {"level": "afternoon/5", "in": "afternoon/example/level5/level5_example.in"},
+]
+
+
+def expected_output(in_file: str) -> str:
+    """
+    Returns the committed output of an input file.
+    :param in_file: The input file, relative to the root of the repository.
+    :return: The content of the output file.
+    """
+    in_path = pathlib.Path(in_file)
+    out_path = runner.ROOT_PATH / in_path.parts[0] / "output" / in_path.parent.name / f"{in_path.stem}.out"
+    return out_path.read_text()
+
+
+@pytest.fixture(scope="module")
+def client():
+    with service.Client.spawn(2) as client:
+        yield client
+
+
+def test_ping(client):
+    response = client.request(op="ping")
+    assert response["ok"]
+    assert response["pid"] != os.getpid()
+
+
+@pytest.mark.parametrize("file", FILES, ids=[file["level"] for file in FILES])
+def test_solve_input(client, file: Dict[str, str]):
+    content = (runner.ROOT_PATH / file["in"]).read_text()
+    response = client.request(level=file["level"], input=content)
+    assert response["ok"], response.get("error")
+    assert response["seconds"] >= 0
+    assert response["output"] == expected_output(file["in"])
+
+
+def test_solve_paths(client, tmp_path):
+    file = FILES[0]
+    out_path = tmp_path / "level1_1.out"
+    response = client.request(level=file["level"], out=str(out_path), **{"in": str(runner.ROOT_PATH / file["in"])})
+    assert response["ok"], response.get("error")
+    assert "output" not in response
+    assert out_path.read_text() == expected_output(file["in"])
+
+
+def test_solve_stream(client):
+    file = FILES[2]
+    content = (runner.ROOT_PATH / file["in"]).read_text()
+    response = client.request(level=file["level"], input=content, stream=True)
+    assert response["ok"], response.get("error")
+    assert response["output"] == expected_output(file["in"])
+
+
+def test_solve_many(client):
+    requests = [
+        {"level": file["level"], "input": (runner.ROOT_PATH / file["in"]).read_text()}
+        for file in FILES * 3
+    ]
+    responses = client.solve_many(requests)
+    assert [response["ok"] for response in responses] == [True] * len(requests)
+    assert [response["output"] for response in responses] == [expected_output(file["in"]) for file in FILES * 3]
+
+
+@pytest.mark.parametrize("request_fields, error", [
+    ({"level": "morning/9", "input": "1\n"}, "ValueError"),
+    ({"level": "morning/1", "in": "/does/not/exist.in"}, "FileNotFoundError"),
+    ({"level": "morning/1"}, "ValueError"),
+    ({"op": "restart"}, "ValueError"),
+])
+def test_errors(client, request_fields: Dict[str, Any], error: str):
+    response = client.request(**request_fields)
+    assert not response["ok"]
+    assert response["error"].startswith(f"{error}: ")
+    # The worker survives the error
+    assert client.request(op="ping")["ok"]
+
+
+def test_stats_caches_are_reused():
+    file = FILES[2]
+    content = (runner.ROOT_PATH / file["in"]).read_text()
+    # A single worker answers every request, so its caches see both solves
+    with service.Client.spawn(1) as client:
+        before = client.request(op="stats")
+        assert before["ok"]
+        assert set(before["caches"]) == {"morning/3", "afternoon/4", "afternoon/5"}
+        assert before["caches"]["afternoon/4"]["hits"] == 0
+
+        for _ in range(2):
+            assert client.request(level=file["level"], input=content)["ok"]
+        after = client.request(op="stats")["caches"]["afternoon/4"]
+        assert after["misses"] > 0
+        assert after["hits"] >= after["misses"]
+        assert after["entries"] == after["misses"]
+
+
+def test_serve_invalid_lines():
+    lines = ["not json\n", "\n", "[1, 2]\n", json.dumps({"id": "a", "op": "ping"}) + "\n"]
+    written: List[str] = []
+    with service.Service(1) as pool:
+        pool.serve(lines, written.append)
+    responses = {response["id"]: response for response in map(json.loads, written)}
+    assert len(written) == 3
+    assert responses["a"]["ok"]
+    assert [json.loads(line)["ok"] for line in written if json.loads(line)["id"] is None] == [False, False]
+
+
+def test_socket(tmp_path):
+    path = tmp_path / "ccc.sock"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ccc.service", "serve", "--socket", str(path), "--workers", "1"],
+        cwd=runner.ROOT_PATH, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not path.exists():
+            assert process.poll() is None
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        file = FILES[0]
+        with service.Client.connect(path) as client:
+            response = client.request(level=file["level"], input=(runner.ROOT_PATH / file["in"]).read_text())
+        assert response["output"] == expected_output(file["in"])
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
@@ -0,0 +1,113 @@
+# coding=utf-8
+"""
+Tests of the trajectory planners of the morning level 3.
+"""
+from typing import List, Optional, Set, Tuple
+
+import pytest
+
+from ccc import parser, trajectory, trajectory_check
+from ccc.integrator import GRAVITY
+
+# Targets small enough to search every flight of
+BFS_TARGETS: range = range(1, 121)
+
+
+def fewest_ticks(pos_to_reach: int) -> Optional[int]:
+    """
+    Searches the fewest ticks of any valid flight breadth first, over the
+    states (position, velocity, target reached) of the flights in the air.
+    :param pos_to_reach: The position that should be reached.
+    :return: The number of ticks, None if no flight is valid.
+    """
+    # Flights far above the target or faster than it is high only get longer
+    max_pos: int = 3 * pos_to_reach + 100
+    max_velocity: int = 3 * GRAVITY + pos_to_reach
+
+    frontier: List[Tuple[int, int, bool]] = [(0, 0, False)]
+    seen: Set[Tuple[int, int, bool]] = set(frontier)
+    ticks: int = 0
+    while frontier:
+        ticks += 1
+        following: List[Tuple[int, int, bool]] = []
+        for pos, velocity, reached in frontier:
+            for acc in range(0, 2 * GRAVITY + 1):
+                next_velocity = velocity + (acc - GRAVITY)
+                next_pos = pos + next_velocity if pos + next_velocity >= 0 else 0
+                next_reached = reached or next_pos >= pos_to_reach
+                if next_reached and next_pos == 0 and next_velocity == -1:
+                    return ticks
+                if next_pos <= 0 or next_pos > max_pos or abs(next_velocity) > max_velocity:
+                    continue
+
+                state = (next_pos, next_velocity, next_reached)
+                if state not in seen:
+                    seen.add(state)
+                    following.append(state)
+        frontier = following
+    return None
+
+
+@pytest.mark.parametrize("pos_to_reach", BFS_TARGETS)
+def test_optimal_matches_breadth_first_search(pos_to_reach: int):
+    ticks = fewest_ticks(pos_to_reach)
+    acc_list = trajectory.plan_optimal(pos_to_reach)
+
+    assert len(acc_list) == ticks
+    assert trajectory.minimum_ticks(pos_to_reach) == ticks
+    assert trajectory_check.check_flight(acc_list, pos_to_reach, ticks) == trajectory_check.VALID
+
+
+@pytest.mark.parametrize("pos_to_reach", [1, 7, 50, 999, 123_456, 10 ** 9])
+def test_runs_expand_to_valid_flights(pos_to_reach: int):
+    runs = trajectory.plan_runs(pos_to_reach)
+    acc_list = trajectory.expand_runs(runs)
+
+    assert len(runs) <= 16
+    assert sum(repeat for _, repeat in runs) == trajectory.minimum_ticks(pos_to_reach)
+    assert trajectory_check.check_flight(acc_list, pos_to_reach, len(acc_list)) == trajectory_check.VALID
+
+
+@pytest.mark.parametrize("pos_to_reach", [15, 200, 3000])
+def test_greedy_is_valid_but_not_shorter(pos_to_reach: int):
+    acc_list = trajectory.plan_greedy(pos_to_reach)
+
+    assert len(acc_list) >= trajectory.minimum_ticks(pos_to_reach)
+    assert trajectory_check.check_flight(acc_list, pos_to_reach, len(acc_list)) == trajectory_check.VALID
+
+
+def test_plan_within_falls_back_to_optimal():
+    pos_to_reach: int = 3000
+    limit: int = trajectory.minimum_ticks(pos_to_reach)
+    assert len(trajectory.plan_greedy(pos_to_reach)) > limit
+
+    assert trajectory.plan_within(pos_to_reach, limit, "greedy") == trajectory.plan_optimal(pos_to_reach)
+
+
+def test_plan_within_rejects_infeasible_targets():
+    ticks = trajectory.minimum_ticks(500)
+
+    with pytest.raises(trajectory.InfeasibleTargetError) as error:
+        trajectory.plan_within(500, ticks - 1)
+    assert error.value.targets == [(500, ticks)]
+
+    with pytest.raises(trajectory.InfeasibleTargetError):
+        trajectory.plan_within(0, None)
+
+
+def test_find_infeasible_reports_every_target_once():
+    limit = trajectory.minimum_ticks(100)
+    positions = [100, 5000, 0, 5000, 20]
+
+    assert trajectory.find_infeasible(positions, limit) == [
+        (5000, trajectory.minimum_ticks(5000)), (0, 0)
+    ]
+    assert trajectory.find_infeasible(positions[:1], None) == []
+
+
+def test_plan_table_plans_every_row(tmp_path):
+    path = tmp_path / "targets.in"
+    path.write_text("10\n250\n\n77\n")
+    table = parser.parse_int_table(path, use_numpy=False)
+
+    assert trajectory.plan_table(table) == [trajectory.plan_optimal(pos) for pos in (10, 250, 77)]
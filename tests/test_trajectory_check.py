@@ -0,0 +1,132 @@
+# coding=utf-8
+"""
+Tests of the validator for the outputs of the morning level 3.
+"""
+import random
+from typing import List, Sequence
+
+import pytest
+
+from ccc import trajectory, trajectory_check
+from ccc.integrator import GRAVITY
+
+# The target positions and the time limit of the input file
+TARGETS: List[int] = [50, 120, 300, 77]
+
+TIME_LIMIT: int = 1000
+
+
+def flight_line(acc_list: Sequence[int]) -> str:
+    """
+    Formats a flight like the level 3 manager.
+    :param acc_list: The acceleration for every tick.
+    :return: The output line.
+    """
+    return f"{' '.join(map(str, acc_list))} \n" if acc_list else "\n"
+
+
+@pytest.fixture
+def files(tmp_path):
+    in_path = tmp_path / "level3_1.in"
+    in_path.write_text(f"{len(TARGETS)}\n{TIME_LIMIT}\n" + "".join(f"{pos}\n" for pos in TARGETS))
+    return in_path, tmp_path / "level3_1.out"
+
+
+@pytest.fixture(params=["numpy", "scalar"])
+def engine(request, monkeypatch):
+    if request.param == "numpy" and trajectory_check.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "scalar":
+        monkeypatch.setattr(trajectory_check, "np", None)
+    return request.param
+
+
+def validate(files, lines: List[str], chunk_bytes: int = trajectory_check.DEFAULT_CHUNK_BYTES):
+    """
+    Writes the output lines and validates them against the input file.
+    :param files: The input and output file, see the files fixture.
+    :param lines: The lines of the output file.
+    :param chunk_bytes: The approximate number of bytes parsed at once.
+    :return: The number of checked flights and (index, reason) per failure.
+    """
+    in_path, out_path = files
+    out_path.write_text("".join(lines))
+    report = trajectory_check.validate(in_path, out_path, chunk_bytes=chunk_bytes)
+    return report.checked, [(index, reason) for index, _, reason in report.failures]
+
+
+def planned() -> List[str]:
+    """
+    Returns the output lines of the optimal plans of TARGETS.
+    """
+    return [flight_line(trajectory.plan_optimal(pos)) for pos in TARGETS]
+
+
+@pytest.mark.parametrize("acc_list, pos_to_reach, time_limit, reason", [
+    (trajectory.plan_optimal(40), 40, 100, trajectory_check.VALID),
+    ([], 40, 100, trajectory_check.EMPTY),
+    (trajectory.plan_optimal(40), 40, 3, trajectory_check.TOO_LONG),
+    ([25] + trajectory.plan_optimal(40)[1:], 40, 100, trajectory_check.BAD_ACCELERATION),
+    ([GRAVITY + 1, GRAVITY - 1, GRAVITY - 1, GRAVITY + 1, GRAVITY], 1, 100, trajectory_check.GROUNDED),
+    (trajectory.plan_optimal(40), 41, 100, trajectory_check.MISSED),
+    (trajectory.plan_optimal(40)[:-1], 40, 100, trajectory_check.BAD_LANDING),
+])
+def test_check_flight(acc_list: List[int], pos_to_reach: int, time_limit: int, reason: int):
+    assert trajectory_check.check_flight(acc_list, pos_to_reach, time_limit) == reason
+
+
+def test_check_batch_matches_check_flight():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(3)
+    flights: List[List[int]] = []
+    targets: List[int] = []
+    for _ in range(300):
+        pos = rng.randint(1, 400)
+        acc_list = list(trajectory.plan_optimal(pos))
+        for _ in range(rng.randint(0, 2)):
+            acc_list[rng.randrange(len(acc_list))] = rng.randint(-2, 2 * GRAVITY + 2)
+        if rng.random() < 0.1:
+            acc_list = acc_list[:rng.randint(0, len(acc_list))]
+        flights.append(acc_list)
+        targets.append(pos + rng.choice([0, 0, 1]))
+
+    lengths = np.array([len(acc_list) for acc_list in flights], dtype=np.int64)
+    padded = np.zeros((len(flights), int(lengths.max())), dtype=np.int64)
+    for row, acc_list in enumerate(flights):
+        padded[row, :len(acc_list)] = acc_list
+
+    codes = trajectory_check.check_batch(padded, lengths, np.array(targets, dtype=np.int64), 60)
+    assert codes.tolist() == [
+        trajectory_check.check_flight(acc_list, pos, 60) for acc_list, pos in zip(flights, targets)
+    ]
+
+
+def test_accepts_planned_flights(files, engine):
+    assert validate(files, planned()) == (len(TARGETS), [])
+    # Empty lines after the last flight are no flights
+    assert validate(files, planned() + ["\n", "\n"]) == (len(TARGETS), [])
+
+
+@pytest.mark.parametrize("chunk_bytes", [16, trajectory_check.DEFAULT_CHUNK_BYTES])
+def test_reports_empty_lines_at_their_flight(files, engine, chunk_bytes: int):
+    lines = planned()
+    lines[1] = "\n"
+
+    assert validate(files, lines, chunk_bytes) == (len(TARGETS), [(1, trajectory_check.EMPTY)])
+
+
+def test_checks_flights_against_their_own_line(files, engine):
+    lines = planned()
+    lines[0], lines[2] = lines[2], lines[0]
+
+    # The plan for 300 reaches 50 as well, the one for 50 misses 300
+    assert validate(files, lines) == (len(TARGETS), [(2, trajectory_check.MISSED)])
+
+
+def test_reports_missing_and_extra_flights(files, engine):
+    assert validate(files, planned()[:2]) == (len(TARGETS), [
+        (2, trajectory_check.MISSING), (3, trajectory_check.MISSING)
+    ])
+    assert validate(files, planned() + [flight_line([GRAVITY, GRAVITY - 1])]) == (len(TARGETS) + 1, [
+        (4, trajectory_check.EXTRA)
+    ])